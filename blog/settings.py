@@ -13,7 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -48,6 +48,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "blogapp.middleware.RequestMetricsMiddleware",
+    "blogapp.middleware.DatabaseRoutingMiddleware",
+    "blogapp.middleware.SamplingProfilerMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -80,13 +83,52 @@ WSGI_APPLICATION = "blog.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite tuned for concurrent readers and writers: WAL journal (readers don't
+# block on writers), NORMAL sync (safe with WAL), memory-mapped reads, a busy
+# timeout instead of instant "database is locked", and BEGIN IMMEDIATE so
+# writers queue on the lock instead of failing when they upgrade to it.
+SQLITE_OPTIONS = {
+    "timeout": 20,
+    "transaction_mode": "IMMEDIATE",
+    "init_command": (
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA mmap_size=268435456;"
+        "PRAGMA temp_store=MEMORY"
+    ),
+}
+
+# Seconds a connection is kept for reuse between requests (0: close after each).
+CONN_MAX_AGE = config("CONN_MAX_AGE", default=60, cast=int)
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": SQLITE_OPTIONS,
+        "CONN_MAX_AGE": CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Read replicas: comma-separated SQLite files (e.g. copies refreshed by
+# `manage.py sync_replicas`), served as aliases replica1, replica2, ...
+# Tests mirror them onto the default database.
+BLOG_READ_REPLICAS = []
+for number, path in enumerate(config("BLOG_DB_REPLICAS", default="", cast=Csv()), start=1):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "NAME": path,
+        "TEST": {"MIRROR": "default"},
+    }
+    BLOG_READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["blogapp.routers.PrimaryReplicaRouter"]
+
+# Seconds a client reads from the primary after a write (read-your-writes).
+BLOG_DB_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -123,7 +165,143 @@ REST_FRAMEWORK = {
     ),
 }
 
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # One JSON line per request from RequestMetricsMiddleware (when not DEBUG).
+        "blogapp.metrics": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
+# Sampling profiler (SamplingProfilerMiddleware): fraction of requests profiled
+# per URL name, "*" for the others, e.g. BLOG_PROFILE_SAMPLE_RATES=
+# "blog_list=0.01,post-list=0.01". Empty turns it off. Mode "cprofile" writes
+# pstats files, "stack" samples the stack every BLOG_PROFILE_STACK_INTERVAL
+# seconds and writes collapsed stacks (lower overhead). Profiles and SQL timings
+# are aggregated per view, process and BLOG_PROFILE_BUCKET_SECONDS under
+# BLOG_PROFILE_DIR; `manage.py profile_report` summarizes them.
+BLOG_PROFILE_SAMPLE_RATES = {
+    name: float(rate)
+    for name, _, rate in (
+        item.partition("=")
+        for item in config("BLOG_PROFILE_SAMPLE_RATES", default="", cast=Csv())
+    )
+}
+BLOG_PROFILE_MODE = config("BLOG_PROFILE_MODE", default="cprofile")
+BLOG_PROFILE_STACK_INTERVAL = 0.005
+BLOG_PROFILE_BUCKET_SECONDS = 10 * 60
+BLOG_PROFILE_DIR = config("BLOG_PROFILE_DIR", default=str(BASE_DIR / "profiles"))
+
 LOGIN_URL = "/login/"
 
+# Serve the read paths (list pages, post detail, API list/retrieve) with async
+# views. Enable under an ASGI server; WSGI deployments keep the sync views.
+BLOG_ASYNC_VIEWS = config("BLOG_ASYNC_VIEWS", default=False, cast=bool)
+
+# Post list pagination. "offset" shows page numbers; "cursor" uses keyset
+# pagination on (publication_date, id), which costs the same on every page.
+BLOG_LIST_PAGINATION = config("BLOG_LIST_PAGINATION", default="offset")
+BLOG_LIST_PAGE_SIZE = 10
+# Default and maximum ?page_size= for the API endpoints.
+BLOG_API_PAGE_SIZE = 10
+BLOG_API_MAX_PAGE_SIZE = 100
+BLOGS_PAGINATED_PAGE_SIZE = 1
+# Page counts come from cached counters; search results and admin changelists
+# count at most this many rows (shown as "about N").
+BLOG_SEARCH_COUNT_CAP = 1000
+BLOG_ADMIN_COUNT_CAP = 10000
+# Maximum number of items in one batch write request (/comments/batch/ etc.).
+BLOG_BATCH_MAX_ITEMS = 500
+# Number of newest comments rendered inline on each post card.
+BLOG_LIST_LATEST_COMMENTS = 3
+# Trending scores: an event's weight halves every half-life; per-kind weights.
+BLOG_TRENDING_HALF_LIFE_HOURS = 24
+BLOG_TRENDING_WEIGHTS = {"post": 1.0, "like": 1.0, "comment": 2.0}
+
+# Shared between worker processes without memcached/redis: one file per entry.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config("BLOG_CACHE_DIR", default=str(BASE_DIR / "cache")),
+    }
+}
+
+# Reference data cache (categories, per-category post counts): shared cache alias,
+# soft timeout, seconds a per-process copy is used before re-checking its version,
+# per-process LRU size, and how long a reload may hold the stampede lock.
+BLOG_REFCACHE_ALIAS = "default"
+BLOG_REFCACHE_TIMEOUT = 60 * 60
+BLOG_REFCACHE_LOCAL_TTL = 5
+BLOG_REFCACHE_LOCAL_SIZE = 128
+BLOG_REFCACHE_LOCK_TIMEOUT = 10
+
+# Search-box typeahead: an in-memory prefix index per process. Prefixes up to
+# DEPTH characters keep their TOP_K best suggestions ready; longer ones rank at
+# most SCAN_LIMIT keys. Other processes' writes are picked up within
+# CHECK_SECONDS; popularity is refreshed by a full rebuild every MAX_AGE seconds.
+BLOG_TYPEAHEAD_LIMIT = 8
+BLOG_TYPEAHEAD_DEPTH = 3
+BLOG_TYPEAHEAD_TOP_K = 10
+BLOG_TYPEAHEAD_SCAN_LIMIT = 2000
+BLOG_TYPEAHEAD_CHECK_SECONDS = 5
+BLOG_TYPEAHEAD_MAX_AGE = 60 * 60
+
+# Following feeds: authors with this many followers stop being copied into
+# timelines (fan-out on write) and are merged in when a feed is read instead.
+# Posts copied into a timeline on follow; default page size.
+BLOG_TIMELINE_FANOUT_LIMIT = 1000
+BLOG_TIMELINE_BACKFILL = 100
+BLOG_TIMELINE_PAGE_SIZE = 10
+
+# Deleted posts/categories are hidden at once and purged later: "thread" purges in
+# a background thread after commit, "sync" inline after commit, "queue" in a
+# run_worker job, "off" leaves it to the purge_deleted command. Rows per DELETE, and seconds to pause between them.
+BLOG_PURGE_MODE = config("BLOG_PURGE_MODE", default="thread")
+BLOG_PURGE_BATCH_SIZE = 1000
+BLOG_PURGE_PAUSE = 0
+
+# Background jobs (blogapp.jobs), run by `manage.py run_worker`: extra task
+# names -> dotted paths, jobs run at once per worker on a "thread" or "process"
+# pool, seconds between polls of an idle queue, attempts before a job is
+# dead-lettered, retry backoff (base seconds doubled per attempt, capped) and
+# seconds after which a running job is presumed lost and retried.
+BLOG_JOB_TASKS = {}
+BLOG_JOB_CONCURRENCY = 4
+BLOG_JOB_POOL = config("BLOG_JOB_POOL", default="thread")
+BLOG_JOB_POLL_SECONDS = 1
+BLOG_JOB_MAX_ATTEMPTS = 5
+BLOG_JOB_BACKOFF_BASE = 5
+BLOG_JOB_BACKOFF_MAX = 60 * 60
+BLOG_JOB_TIMEOUT = 10 * 60
+
+# Cache alias and timeout (seconds) for the shared post-card HTML fragments.
+BLOG_FRAGMENT_CACHE_ALIAS = "default"
+BLOG_FRAGMENT_TIMEOUT = 60 * 60
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Serve MEDIA_URL from Django (blogapp.media). Hashed image variants are cached
+# for a year; other files for BLOG_MEDIA_MAX_AGE seconds. BLOG_MEDIA_OFFLOAD
+# ("x-accel-redirect" for nginx, "x-sendfile" for Apache/lighttpd) leaves the
+# transfer to the front proxy; nginx needs an internal location at
+# BLOG_MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT.
+BLOG_SERVE_MEDIA = config("BLOG_SERVE_MEDIA", default=True, cast=bool)
+BLOG_MEDIA_MAX_AGE = 60 * 60
+BLOG_MEDIA_OFFLOAD = config("BLOG_MEDIA_OFFLOAD", default="")
+BLOG_MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+# Post image processing: "thread" runs it in a background pool after commit,
+# "sync" runs it inline after commit (tests, management commands), "queue" in a
+# run_worker job.
+BLOG_IMAGE_PROCESSING = config("BLOG_IMAGE_PROCESSING", default="thread")
+BLOG_IMAGE_WORKERS = 2
+# Originals are re-encoded without EXIF and capped to this size.
+BLOG_IMAGE_MAX_SIZE = (2048, 2048)
+BLOG_IMAGE_THUMBNAIL_WIDTH = 400
+BLOG_IMAGE_MEDIUM_WIDTH = 1024
+BLOG_IMAGE_VARIANT_FORMAT = "WEBP"
+BLOG_IMAGE_QUALITY = 80
@@ -16,13 +16,26 @@ Including another URLconf
 """
 
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from blogapp.media import serve_media
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("", include("blogapp.urls")),
+    # Async read views need an ASGI server to pay off (BLOG_ASYNC_VIEWS).
+    path(
+        "",
+        include(
+            "blogapp.async_urls"
+            if getattr(settings, "BLOG_ASYNC_VIEWS", False)
+            else "blogapp.urls"
+        ),
+    ),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if getattr(settings, "BLOG_SERVE_MEDIA", True):
+    # Uploaded images, with ETags, byte ranges and optional proxy offload.
+    urlpatterns.append(
+        path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", serve_media, name="media")
+    )
@@ -1,11 +1,105 @@
 # Register Category, Comment, and Post models with the Django admin site.
+from django.conf import settings
 from django.contrib import admin
 
-from .models import Category, Comment, Post
+from .deletion import soft_delete_categories, soft_delete_posts
+from .jobs import retry_dead
+from .models import Category, Comment, Job, Post, PostLike
+from .pagination import EstimatedCountPaginator
 
-# Register the Category model.
-admin.site.register(Category)
-# Register the Comment model.
-admin.site.register(Comment)
-# Register the Post model.
-admin.site.register(Post)
+
+# Changelist paginator counting at most BLOG_ADMIN_COUNT_CAP rows.
+class CappedCountPaginator(EstimatedCountPaginator):
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True):
+        super().__init__(
+            object_list,
+            per_page,
+            orphans,
+            allow_empty_first_page,
+            cap=getattr(settings, "BLOG_ADMIN_COUNT_CAP", 10000),
+        )
+
+
+# Delete confirmation with row counts instead of a list of every related object.
+class SoftDeleteAdmin(admin.ModelAdmin):
+    """The default confirmation collects the whole subtree (every post, comment
+    and like) to list it. Deletes are soft and purged later, so this one lists
+    the selected objects and counts what goes with them.
+    """
+
+    def related_posts(self, pks):
+        raise NotImplementedError
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        opts = self.model._meta
+        posts = self.related_posts([obj.pk for obj in objs])
+        model_count = {opts.verbose_name_plural: len(objs)}
+        for model, queryset in (
+            (Post, posts),
+            (Comment, Comment.objects.filter(post__in=posts)),
+            (PostLike, PostLike.objects.filter(post__in=posts)),
+        ):
+            if model is not self.model:
+                model_count[model._meta.verbose_name_plural] = queryset.count()
+        perms_needed = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        deleted_objects = [f"{opts.verbose_name.capitalize()}: {obj}" for obj in objs]
+        return deleted_objects, model_count, perms_needed, []
+
+
+# Admin for categories: deleting hides the category and its posts, the purge does the rest.
+@admin.register(Category)
+class CategoryAdmin(SoftDeleteAdmin):
+    def related_posts(self, pks):
+        return Post.objects.filter(category__in=pks)
+
+    def delete_model(self, request, obj):
+        soft_delete_categories([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_categories(queryset.values_list("pk", flat=True))
+
+
+# Admin for posts: one query per changelist page, no full-table counts.
+@admin.register(Post)
+class PostAdmin(SoftDeleteAdmin):
+    list_display = ["title", "category", "user", "publication_date", "like_count", "comment_count"]
+    list_filter = ["category"]
+    list_select_related = ["category", "user"]
+    raw_id_fields = ["user"]
+    paginator = CappedCountPaginator
+    # Skip the unfiltered COUNT(*) shown next to filtered result counts.
+    show_full_result_count = False
+
+    def related_posts(self, pks):
+        return Post.objects.filter(pk__in=pks)
+
+    def delete_model(self, request, obj):
+        soft_delete_posts([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_posts(queryset.values_list("pk", flat=True))
+
+
+# Admin for comments: the post is an id input, not a <select> of every post.
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ["author", "post", "created_at"]
+    list_select_related = ["post"]
+    raw_id_fields = ["post"]
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+
+# Admin for background jobs: inspect the queue and retry dead-lettered jobs.
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ["name", "status", "priority", "attempts", "run_at", "created_at"]
+    list_filter = ["status", "name"]
+    actions = ["retry"]
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+
+    @admin.action(description="Retry selected dead jobs")
+    def retry(self, request, queryset):
+        self.message_user(request, f"{retry_dead(queryset)} jobs queued again.")
@@ -5,3 +5,7 @@ from django.apps import AppConfig
 class BlogappConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "blogapp"
+
+    def ready(self):
+        # Connect the model signal handlers.
+        from . import signals  # noqa: F401
@@ -0,0 +1,30 @@
+# Same routes as blogapp.urls, with the read paths served by blogapp.async_views.
+from django.urls import URLPattern
+from rest_framework.routers import DefaultRouter
+
+from . import async_views, urls
+
+router = DefaultRouter()
+router.register(r"posts", async_views.PostViewSet)
+router.register(r"categories", async_views.CategoryViewSet)
+router.register(r"comments", async_views.CommentViewSet)
+
+# URL name -> async replacement of its view.
+ASYNC_VIEWS = {
+    "blog_list": async_views.blog_list,
+    "post_detail": async_views.PostDetailView.as_view(),
+    "get_blogs_paginated": async_views.BlogsPaginatedView.as_view(),
+}
+
+
+def _swap(pattern):
+    view = ASYNC_VIEWS.get(pattern.name)
+    if view is None:
+        return pattern
+    return URLPattern(pattern.pattern, view, pattern.default_args, pattern.name)
+
+
+urlpatterns = [
+    _swap(pattern) for pattern in urls.urlpatterns if pattern not in urls.router.urls
+]
+urlpatterns += router.urls
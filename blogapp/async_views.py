@@ -0,0 +1,220 @@
+# Async read paths for ASGI deployments (routed by blogapp.async_urls).
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.template.response import TemplateResponse
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import views
+from .conditional import not_modified, post_page_validators, set_validators
+from .fragments import attach_post_fragments
+from .forms import CommentForm
+from .likes import liked_post_ids
+from .models import Comment
+from .pagination import (
+    POST_ORDERING,
+    InvalidCursor,
+    KeysetPaginator,
+    aget_offset_page,
+    alist,
+)
+from .refcache import categories_with_counts
+from .rows import RowSerializer
+from .serializers import BlogSerializer
+
+
+# Async dispatch for DRF views: DRF itself only dispatches synchronously.
+class AsyncAPIViewMixin:
+    """Run authentication, permissions and throttling in the request's DB thread,
+    then await the handler. Sync handlers (writes) still work via sync_to_async.
+    """
+
+    view_is_async = True
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        # ViewSetMixin.as_view doesn't mark its view function as a coroutine.
+        return markcoroutinefunction(super().as_view(*args, **kwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), handler)
+            if not iscoroutinefunction(handler):
+                handler = sync_to_async(handler)
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def aget_object(self):
+        """Async ``get_object()``: lookup, 404 and object permissions."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            ).afirst()
+        except (TypeError, ValueError, ValidationError):
+            obj = None
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+# Async list/retrieve for the API viewsets (same responses as the sync mixins).
+class AsyncReadMixin(AsyncAPIViewMixin):
+    async def list(self, request, *args, **kwargs):
+        validators = await sync_to_async(self.get_collection_validators)(request)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        rows = RowSerializer(self.get_serializer())
+        queryset = rows.rows(
+            self.filter_queryset(self.get_queryset()), getattr(self.paginator, "ordering", ())
+        )
+        if hasattr(self.paginator, "apaginate_queryset"):
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        else:
+            page = await sync_to_async(self.paginate_queryset)(queryset)
+        if page is not None:
+            response = self.get_paginated_response(await rows.aserialize(page))
+        else:
+            response = Response(await rows.aserialize(queryset))
+        return set_validators(response, *validators)
+
+    async def retrieve(self, request, *args, **kwargs):
+        validators = await sync_to_async(self.get_object_validators)(request)
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        instance = await self.aget_object()
+        data = await sync_to_async(lambda: self.get_serializer(instance).data)()
+        return set_validators(Response(data), *validators)
+
+
+class PostViewSet(AsyncReadMixin, views.PostViewSet):
+    pass
+
+
+class CategoryViewSet(AsyncReadMixin, views.CategoryViewSet):
+    pass
+
+
+class CommentViewSet(AsyncReadMixin, views.CommentViewSet):
+    pass
+
+
+# Async blog list: categories, the page (and its count) are queried concurrently.
+@login_required
+async def blog_list(request):
+    """GET of ``views.blog_list``; comment submissions (POST) go to the sync view."""
+    if request.method == "POST":
+        return await sync_to_async(views.blog_list)(request)
+    posts, category_id, search_query = views.filtered_posts(request)
+    per_page = getattr(settings, "BLOG_LIST_PAGE_SIZE", 10)
+    cursor_pagination = views.uses_cursor_pagination(request)
+
+    async def get_page():
+        if not cursor_pagination:
+            return await aget_offset_page(
+                views.post_list_paginator(request, posts, per_page), request.GET.get("page")
+            )
+        keyset = KeysetPaginator(posts, per_page)
+        try:
+            return await keyset.aget_page(request.GET.get("cursor") or None)
+        except InvalidCursor:
+            return await keyset.aget_page()
+
+    user, page_obj, categories = await asyncio.gather(
+        request.auser(), get_page(), sync_to_async(categories_with_counts)()
+    )
+    page_posts, liked = await asyncio.gather(
+        sync_to_async(attach_post_fragments)(page_obj.object_list),
+        sync_to_async(liked_post_ids)(user, page_obj.object_list),
+    )
+    return TemplateResponse(
+        request,
+        "blogapp/blog_list.html",
+        {
+            "posts": page_posts,
+            "liked_post_ids": liked,
+            "page_obj": page_obj,
+            "cursor_pagination": cursor_pagination,
+            "comment_form": CommentForm(),
+            "categories": categories,
+            "selected_category": category_id,
+            "search_query": search_query,
+            "sort": request.GET.get("sort", ""),
+        },
+    )
+
+
+# Async post detail page: the post and its comments are queried concurrently.
+class PostDetailView(AsyncAPIViewMixin, views.PostDetailView):
+    async def get(self, request, *args, **kwargs):
+        validators = await sync_to_async(post_page_validators)(request, kwargs["pk"])
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
+        post, comments = await asyncio.gather(
+            self.aget_object(),
+            alist(Comment.objects.filter(post_id=kwargs["pk"]).order_by("-created_at")),
+        )
+        return set_validators(
+            Response(
+                {"post": post, "comments": comments, "form": CommentForm()},
+                template_name=self.template_name,
+            ),
+            *validators,
+        )
+
+
+# Async /get-blogs-paginated/: the page and its total are queried concurrently.
+class BlogsPaginatedView(AsyncAPIViewMixin, views.BlogsPaginatedView):
+    async def get(self, request):
+        page_size = self.get_page_size(request)
+        all_blogs = self.get_queryset(request)
+        rows = RowSerializer(BlogSerializer())
+
+        if "cursor" in request.GET:
+            try:
+                page_blogs = await KeysetPaginator(
+                    rows.rows(all_blogs, POST_ORDERING), page_size
+                ).aget_page(request.GET.get("cursor") or None)
+            except InvalidCursor:
+                return Response(
+                    {"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response({
+                'blogs': await rows.aserialize(page_blogs.object_list),
+                'next': page_blogs.next_cursor,
+                'previous': page_blogs.previous_cursor,
+                'page_size': page_size,
+            })
+
+        page_blogs = await aget_offset_page(
+            views.post_list_paginator(request, rows.rows(all_blogs), page_size),
+            request.GET.get("page"),
+        )
+        return Response({
+            'total': page_blogs.paginator.count,
+            'total_exact': page_blogs.paginator.exact,
+            'blogs': await rows.aserialize(page_blogs),
+            'current_page': page_blogs.number,
+            'page_size': page_size,
+        })
@@ -0,0 +1,162 @@
+# Batch writes: many comments, likes or posts per request, one transaction each.
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .comments import refresh_comment_counts
+from .conditional import COMMENTS, POSTS, bump_collections
+from .fragments import bump_post_versions
+from .likes import refresh_like_counts
+from .models import Category, Comment, Post, PostLike
+from .refcache import CATEGORY_COUNT_CACHE, cached_category_map
+from .search import get_search_backend
+from .timeline import fan_out
+from . import typeahead
+from .trending import forget_likes, record_comments, record_likes, track_posts
+from .serializers import (
+    CommentBatchItemSerializer,
+    CommentSerializer,
+    LikeOperationSerializer,
+    PostBatchItemSerializer,
+    PostListSerializer,
+)
+
+DOES_NOT_EXIST = serializers.PrimaryKeyRelatedField.default_error_messages["does_not_exist"]
+
+
+# Reject anything but a non-empty list of at most BLOG_BATCH_MAX_ITEMS items.
+def check_batch(data):
+    max_items = getattr(settings, "BLOG_BATCH_MAX_ITEMS", 500)
+    if not isinstance(data, list) or not data:
+        raise ValidationError({"detail": "Expected a non-empty list of items."})
+    if len(data) > max_items:
+        raise ValidationError({"detail": f"At most {max_items} items per batch."})
+    return data
+
+
+def _validate(serializer_class, items):
+    # Per-item field validation; failures become their item's result.
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        serializer = serializer_class(data=item)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {"status": 400, "errors": serializer.errors}
+    return valid, results
+
+
+def _check_references(valid, results, field, existing):
+    # Drop items whose ``field`` id is not in ``existing`` (looked up once per batch).
+    kept = []
+    for index, data in valid:
+        if data[field] in existing:
+            kept.append((index, data))
+        else:
+            error = DOES_NOT_EXIST.format(pk_value=data[field])
+            results[index] = {"status": 400, "errors": {field: [error]}}
+    return kept
+
+
+def _existing_post_ids(valid):
+    ids = {data["post"] for _, data in valid}
+    return set(Post.objects.filter(pk__in=ids).values_list("pk", flat=True))
+
+
+# Create the valid comments of a batch with one INSERT and one counter UPDATE.
+def create_comments(items):
+    """Return one result per item: ``{"status": 201, "comment": {...}}`` or errors."""
+    valid, results = _validate(CommentBatchItemSerializer, items)
+    valid = _check_references(valid, results, "post", _existing_post_ids(valid))
+    with transaction.atomic():
+        comments = Comment.objects.bulk_create(
+            [
+                Comment(post_id=data["post"], author=data["author"], content=data["content"])
+                for _, data in valid
+            ]
+        )
+        post_ids = {comment.post_id for comment in comments}
+        refresh_comment_counts(post_ids)
+        record_comments((comment.post_id, comment.created_at) for comment in comments)
+        bump_post_versions(post_ids)
+        if comments:
+            bump_collections(POSTS, COMMENTS)
+    for (index, _), comment in zip(valid, comments):
+        results[index] = {"status": 201, "comment": CommentSerializer(comment).data}
+    return results
+
+
+# Apply like/unlike operations of ``user`` with one INSERT, one DELETE and one UPDATE.
+def apply_likes(user, items):
+    """Return one result per item with the post's final ``liked`` state and count.
+
+    Operations on the same post are applied in order, so the last one wins.
+    """
+    valid, results = _validate(LikeOperationSerializer, items)
+    valid = _check_references(valid, results, "post", _existing_post_ids(valid))
+    wanted = {data["post"]: data["action"] == "like" for _, data in valid}
+    with transaction.atomic():
+        liked = dict(
+            PostLike.objects.filter(user_id=user.pk, post_id__in=wanted).values_list(
+                "post_id", "created_at"
+            )
+        )
+        added = [post_id for post_id, like in wanted.items() if like and post_id not in liked]
+        removed = [post_id for post_id, like in wanted.items() if not like and post_id in liked]
+        PostLike.objects.bulk_create(
+            [PostLike(post_id=post_id, user_id=user.pk) for post_id in added],
+            ignore_conflicts=True,
+        )
+        if removed:
+            PostLike.objects.filter(user_id=user.pk, post_id__in=removed).delete()
+        record_likes(added)
+        forget_likes([(post_id, liked[post_id]) for post_id in removed])
+        refresh_like_counts(added + removed)
+        if added or removed:
+            bump_collections(POSTS)
+        counts = dict(Post.objects.filter(pk__in=wanted).values_list("pk", "like_count"))
+    for index, data in valid:
+        post_id = data["post"]
+        results[index] = {
+            "status": 200,
+            "post": post_id,
+            "liked": wanted[post_id],
+            "like_count": counts[post_id],
+        }
+    return results
+
+
+# Create the valid posts of a batch (no images) with one INSERT and a bulk index update.
+def create_posts(user, items, context=None):
+    """Return one result per item: ``{"status": 201, "post": {...}}`` or errors."""
+    valid, results = _validate(PostBatchItemSerializer, items)
+    wanted = {data["category_id"] for _, data in valid}
+    categories = {pk: category for pk, category in cached_category_map().items() if pk in wanted}
+    if wanted - categories.keys():
+        categories.update(Category.objects.in_bulk(wanted - categories.keys()))
+    valid = _check_references(valid, results, "category_id", categories)
+    posts = [
+        Post(
+            user=user,
+            category=categories[data["category_id"]],
+            title=data["title"],
+            content=data["content"],
+        )
+        for _, data in valid
+    ]
+    for post in posts:
+        post.refresh_excerpt()
+    with transaction.atomic():
+        posts = Post.objects.bulk_create(posts)
+        get_search_backend().update_many(posts)
+        track_posts(posts)
+        fan_out(posts)
+        typeahead.index_posts(posts)
+        if posts:
+            bump_collections(POSTS)
+            CATEGORY_COUNT_CACHE.invalidate()
+    for (index, _), post in zip(valid, posts):
+        results[index] = {"status": 201, "post": PostListSerializer(post, context=context).data}
+    return results
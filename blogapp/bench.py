@@ -0,0 +1,78 @@
+# Helpers shared by the benchmark management commands.
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Category, Post
+
+
+# Raised to roll back the data a benchmark seeded.
+class Rollback(Exception):
+    pass
+
+
+# Run a block in a transaction that is always rolled back.
+@contextmanager
+def throwaway_data():
+    """Seed and measure inside this block; nothing is left in the database."""
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+# Deterministic vocabulary so runs are comparable.
+def vocabulary(size=5000, seed=0):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return sorted(words)
+
+
+# Bulk-insert synthetic posts (with their categories and authors).
+def seed_posts(count, words_per_post=120, batch_size=5000, seed=0):
+    """Create ``count`` posts spread over 10 categories and 20 users."""
+    rng = random.Random(seed)
+    words = vocabulary()
+    # Zipf-like weights so some words are common and most are rare.
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    categories = [
+        Category.objects.get_or_create(name=f"bench-category-{i}")[0] for i in range(10)
+    ]
+    users = [
+        User.objects.get_or_create(username=f"bench-user-{i}")[0] for i in range(20)
+    ]
+    created = 0
+    while created < count:
+        batch = []
+        for _ in range(min(batch_size, count - created)):
+            body = rng.choices(words, weights, k=words_per_post)
+            post = Post(
+                title=" ".join(rng.choices(words, weights, k=6)).capitalize(),
+                content=" ".join(body),
+                category=rng.choice(categories),
+                user=rng.choice(users),
+            )
+            post.refresh_excerpt()
+            batch.append(post)
+        Post.objects.bulk_create(batch)
+        created += len(batch)
+    return words
+
+
+# Median wall time of ``func`` over ``repeat`` runs, in milliseconds.
+def measure(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
@@ -0,0 +1,56 @@
+# Comment bookkeeping: stored counters and bounded per-page comment loading.
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Post
+
+# Newest first; id breaks ties between comments created in the same instant.
+COMMENT_ORDERING = ("-created_at", "-id")
+
+
+# Subquery counting the comments of the outer post.
+def comment_count_subquery():
+    counts = (
+        Comment.objects.filter(post_id=OuterRef("pk"))
+        .order_by()
+        .values("post_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+# Bump the stored comment_count (and updated_at) of a post after a comment is created.
+def increment_comment_count(post_id, amount=1):
+    return Post.objects.filter(pk=post_id).update(
+        comment_count=F("comment_count") + amount, updated_at=timezone.now()
+    )
+
+
+# Touch updated_at of a post whose comment was edited (its validators change).
+def touch_post(post_id):
+    return Post.objects.filter(pk=post_id).update(updated_at=timezone.now())
+
+
+# Recompute the stored comment_count of the given posts in a single UPDATE.
+def refresh_comment_counts(post_ids):
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+    return Post.objects.filter(pk__in=post_ids).update(
+        comment_count=comment_count_subquery(), updated_at=timezone.now()
+    )
+
+
+# Prefetch only the newest N comments of every post on a page, in one query.
+def latest_comments_prefetch(limit=None):
+    """Attach ``post.latest_comments`` (newest first, at most ``limit``)."""
+    if limit is None:
+        limit = getattr(settings, "BLOG_LIST_LATEST_COMMENTS", 3)
+    return Prefetch(
+        "comments",
+        queryset=Comment.objects.order_by(*COMMENT_ORDERING)[:limit],
+        to_attr="latest_comments",
+    )
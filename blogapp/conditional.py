@@ -0,0 +1,165 @@
+# Cheap ETag / Last-Modified validators for the posts API and post detail page.
+import hashlib
+import threading
+
+from django.db import transaction
+from django.db.models import F, Subquery
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import CollectionVersion, Post
+
+POSTS = "posts"
+COMMENTS = "comments"
+CATEGORIES = "categories"
+
+# Collections changed by the current thread's transaction, not yet written.
+_pending = threading.local()
+
+
+# Record a change to one or more collections (bumps their version stamps).
+def bump_collections(*names):
+    """The stamps are written once per transaction, after it commits.
+
+    A transaction touching many rows (imports, bulk deletes) then costs one
+    UPDATE of the shared CollectionVersion rows instead of one per change.
+    Outside a transaction the write happens at once.
+    """
+    if not hasattr(_pending, "names"):
+        _pending.names = set()
+    _pending.names.update(names)
+    # Registered on every call: a rolled back transaction drops its callback,
+    # and its names are then written with the next commit (an extra bump).
+    transaction.on_commit(_write_pending)
+
+
+def _write_pending():
+    names, _pending.names = _pending.names, set()
+    if names:
+        _write_bumps(sorted(names))
+
+
+def _write_bumps(names):
+    now = timezone.now()
+    updated = CollectionVersion.objects.filter(name__in=names).update(
+        version=F("version") + 1, updated_at=now
+    )
+    if updated < len(names):
+        for name in names:
+            CollectionVersion.objects.get_or_create(name=name, defaults={"version": 1})
+
+
+# Return ``{name: (version, updated_at)}`` for the given collections in one query.
+def collection_versions(*names):
+    rows = CollectionVersion.objects.filter(name__in=names).values_list(
+        "name", "version", "updated_at"
+    )
+    versions = {name: (0, None) for name in names}
+    versions.update({name: (version, updated) for name, version, updated in rows})
+    return versions
+
+
+# Validators of a single post: its updated_at plus the categories stamp (nested name).
+def post_validators(pk, *extra):
+    """Return ``(etag, last_modified)`` for post ``pk`` or ``(None, None)`` if missing.
+
+    One indexed query; nothing is serialized. ``extra`` values (e.g. the viewer
+    or the representation) are folded into the ETag.
+    """
+    categories = CollectionVersion.objects.filter(name=CATEGORIES)
+    try:
+        post = Post.objects.filter(pk=pk)
+    except (TypeError, ValueError):
+        return None, None
+    row = (
+        post.annotate(
+            categories_version=Subquery(categories.values("version")[:1]),
+            categories_updated=Subquery(categories.values("updated_at")[:1]),
+        )
+        .values_list("updated_at", "categories_version", "categories_updated")
+        .first()
+    )
+    if row is None:
+        return None, None
+    updated_at, categories_version, categories_updated = row
+    last_modified = max(filter(None, [updated_at, categories_updated]))
+    etag = _etag("post", pk, updated_at.timestamp(), categories_version, *extra)
+    return etag, last_modified
+
+
+# Validators of the post detail page, which embeds the viewer's CSRF token.
+def post_page_validators(request, pk):
+    """Fold the viewer and their CSRF secret into the post's validators.
+
+    A 304 keeps the cached page, token included, so a new CSRF secret (new
+    cookie, login) must produce a new ETag.
+    """
+    get_token(request)
+    return post_validators(pk, "html", request.user.pk, request.META["CSRF_COOKIE"])
+
+
+# Validators of a whole collection request (query string and format included).
+def collection_validators(request, names, *extra):
+    versions = collection_versions(*names)
+    stamps = [f"{name}.{versions[name][0]}" for name in names]
+    changed = [updated for _, updated in versions.values() if updated]
+    last_modified = max(changed) if changed else None
+    etag = _etag(*stamps, request.get_full_path(), *extra)
+    return etag, last_modified
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest())
+
+
+# Return a 304 response if the request's validators match, else None.
+def not_modified(request, etag, last_modified):
+    if request.method not in ("GET", "HEAD") or etag is None:
+        return None
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+# Set ETag / Last-Modified on a full response.
+def set_validators(response, etag, last_modified):
+    if etag and response.status_code == 200:
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
+
+
+# DRF viewset mixin answering list/retrieve with 304 when nothing changed.
+class ConditionalGetMixin:
+    """Compute validators from version stamps before touching the queryset.
+
+    ``collections`` names the stamps a representation depends on. Posts
+    override ``get_object_validators`` to use the row's ``updated_at``.
+    """
+
+    collections = ()
+
+    def get_collection_validators(self, request):
+        return collection_validators(
+            request, self.collections, request.accepted_media_type
+        )
+
+    def get_object_validators(self, request):
+        return self.get_collection_validators(request)
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_collection_validators(request)
+        return not_modified(request, *validators) or set_validators(
+            super().list(request, *args, **kwargs), *validators
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_object_validators(request)
+        return not_modified(request, *validators) or set_validators(
+            super().retrieve(request, *args, **kwargs), *validators
+        )
@@ -0,0 +1,163 @@
+# Soft delete (hide at once) and a batched background purge of deleted rows.
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .conditional import CATEGORIES, COMMENTS, POSTS, bump_collections
+from .models import Category, Comment, Post, PostLike, TimelineEntry, TrendingScore
+from .refcache import CATEGORY_CACHE, CATEGORY_COUNT_CACHE
+from .search import get_search_backend
+from . import jobs, typeahead
+
+logger = logging.getLogger(__name__)
+
+# Rows that reference a post, deleted before it: (model, field pointing at the post).
+POST_DEPENDENTS = [
+    (Comment, "post_id"),
+    (PostLike, "post_id"),
+    (TrendingScore, "post_id"),
+    (TimelineEntry, "post_id"),
+]
+
+IMAGE_FIELDS = ("image", "image_thumbnail", "image_medium")
+
+_executor = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Hide posts now: one UPDATE; their comments and likes go with them.
+def soft_delete_posts(post_ids):
+    """Mark posts deleted and schedule the purge; return how many were marked."""
+    post_ids = list(post_ids)
+    deleted = Post.objects.filter(pk__in=post_ids).update(deleted_at=timezone.now())
+    if deleted:
+        typeahead.remove_posts(post_ids)
+        bump_collections(POSTS, COMMENTS)
+        CATEGORY_COUNT_CACHE.invalidate()
+        queue_purge()
+    return deleted
+
+
+# Hide categories and all their posts now: two UPDATEs, however big they are.
+def soft_delete_categories(category_ids):
+    """Mark categories and their posts deleted and schedule the purge."""
+    category_ids = list(category_ids)
+    now = timezone.now()
+    with transaction.atomic():
+        deleted = Category.objects.filter(pk__in=category_ids).update(deleted_at=now)
+        Post.objects.filter(category_id__in=category_ids).update(deleted_at=now)
+        if deleted:
+            typeahead.remove_categories(category_ids)
+            bump_collections(CATEGORIES, POSTS, COMMENTS)
+            CATEGORY_CACHE.invalidate()
+            CATEGORY_COUNT_CACHE.invalidate()
+            queue_purge()
+    return deleted
+
+
+def get_executor():
+    """One purge at a time per process (created on first use)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="purge")
+    return _executor
+
+
+# Run the purge after the current transaction commits (BLOG_PURGE_MODE).
+def queue_purge():
+    mode = _setting("BLOG_PURGE_MODE", "thread")
+    if mode == "sync":
+        transaction.on_commit(purge_deleted)
+    elif mode == "thread":
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker))
+    elif mode == "queue":
+        # Below user-facing jobs; one queued purge covers every delete before it.
+        jobs.enqueue("purge_deleted", priority=-1, unique=True)
+
+
+def _run_in_worker():
+    try:
+        purge_deleted()
+    except Exception:
+        logger.exception("Purging deleted posts failed")
+    finally:
+        close_old_connections()
+
+
+# Remove soft-deleted posts and categories for good, in bounded batches.
+def purge_deleted(batch_size=None, pause=None):
+    """Return ``Counter({model_name: rows deleted})``.
+
+    Every statement deletes at most ``batch_size`` rows by primary key with a
+    raw DELETE (no collector, no signals, nothing loaded into memory) and
+    commits on its own, so writers wait at most one short batch; ``pause``
+    seconds between batches leave them room. Safe to run concurrently with
+    requests and to interrupt: it picks up where it stopped.
+    """
+    batch_size = batch_size or _setting("BLOG_PURGE_BATCH_SIZE", 1000)
+    pause = _setting("BLOG_PURGE_PAUSE", 0) if pause is None else pause
+    deleted = Counter()
+    # Posts created in a category while it was being deleted.
+    Post.objects.filter(category__deleted_at__isnull=False).update(deleted_at=timezone.now())
+    while True:
+        post_ids = list(
+            Post.all_objects.filter(deleted_at__isnull=False).values_list("pk", flat=True)[
+                :batch_size
+            ]
+        )
+        if not post_ids:
+            break
+        for model, field in POST_DEPENDENTS:
+            rows = model._base_manager.filter(**{f"{field}__in": post_ids})
+            deleted[model._meta.model_name] += _delete_in_batches(rows, batch_size, pause)
+        get_search_backend().remove_many(post_ids)
+        images = _image_names(post_ids)
+        deleted["post"] += _raw_delete(Post.all_objects.filter(pk__in=post_ids))
+        _delete_unused_images(images)
+        time.sleep(pause)
+    empty = Category.all_objects.filter(deleted_at__isnull=False).exclude(
+        Exists(Post.all_objects.filter(category_id=OuterRef("pk")))
+    )
+    deleted["category"] += _delete_in_batches(empty, batch_size, pause)
+    return deleted
+
+
+def _delete_in_batches(queryset, batch_size, pause):
+    total = 0
+    while True:
+        ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += _raw_delete(queryset.model._base_manager.filter(pk__in=ids))
+        time.sleep(pause)
+
+
+def _raw_delete(queryset):
+    # DELETE ... WHERE pk IN (...) without Django's cascade collector.
+    return queryset._raw_delete(router.db_for_write(queryset.model))
+
+
+def _image_names(post_ids):
+    rows = Post.all_objects.filter(pk__in=post_ids).exclude(image="").exclude(image=None)
+    return {name for row in rows.values_list(*IMAGE_FIELDS) for name in row if name}
+
+
+def _delete_unused_images(names):
+    # Image files are content-addressed: another post may share one.
+    if not names:
+        return
+    storage = Post._meta.get_field("image").storage
+    for name in names:
+        if not any(
+            Post.all_objects.filter(**{field: name}).exists() for field in IMAGE_FIELDS
+        ):
+            storage.delete(name)
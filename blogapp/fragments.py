@@ -0,0 +1,148 @@
+# Shared, versioned HTML fragments for post cards on the list and profile pages.
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .comments import latest_comments_prefetch
+
+# Bump when the fragment templates change so old entries are never served.
+FRAGMENT_SCHEMA = 4
+
+# Fragment name -> template; all are viewer-independent (no user, no CSRF).
+FRAGMENT_TEMPLATES = {
+    "card_html": "blogapp/_post_card.html",
+    "comments_html": "blogapp/_post_comments.html",
+}
+
+STATS_KEYS = {"hits": "fragments:stats:hits", "misses": "fragments:stats:misses"}
+
+
+def get_cache():
+    return caches[getattr(settings, "BLOG_FRAGMENT_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "BLOG_FRAGMENT_TIMEOUT", 60 * 60)
+
+
+def _new_version():
+    return uuid.uuid4().hex[:12]
+
+
+def _bump(key):
+    # After commit, so a concurrent request can't cache pre-commit data under
+    # the new version.
+    transaction.on_commit(lambda: get_cache().set(key, _new_version(), None))
+
+
+# Invalidate every fragment of a post.
+def bump_post_version(post_id):
+    _bump(f"fragments:post:{post_id}")
+
+
+# Invalidate the fragments of many posts with one cache round trip (bulk writes).
+def bump_post_versions(post_ids):
+    keys = [f"fragments:post:{post_id}" for post_id in post_ids]
+    if keys:
+        transaction.on_commit(
+            lambda: get_cache().set_many({key: _new_version() for key in keys}, None)
+        )
+
+
+# Invalidate the fragments of every post in a category (e.g. after a rename).
+def bump_category_version(category_id):
+    _bump(f"fragments:category:{category_id}")
+
+
+def _versions(cache, keys):
+    # Missing versions get a fresh random token, never a reused counter value,
+    # so an evicted version can't resurrect a stale fragment.
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return found
+
+
+def _count(cache, name, amount):
+    if not amount:
+        return
+    key = STATS_KEYS[name]
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        # First use (or evicted): start the counter.
+        cache.add(key, 0, None)
+        cache.incr(key, amount)
+
+
+# Attach cached ``card_html`` / ``comments_html`` to every post on a page.
+def attach_post_fragments(posts):
+    """Render (or fetch) the shared fragments of ``posts`` with one cache round trip.
+
+    Cache keys are ``post id + post version + category version``; versions are
+    bumped by model signals. Only posts that miss get their latest comments
+    prefetched and their fragments rendered.
+    """
+    posts = list(posts)
+    if not posts:
+        return posts
+    cache = get_cache()
+    versions = _versions(
+        cache,
+        [f"fragments:post:{post.pk}" for post in posts]
+        + [f"fragments:category:{post.category_id}" for post in posts],
+    )
+    keys = {}
+    for post in posts:
+        stamp = "%s:%s:%s:%s" % (
+            post.pk,
+            versions[f"fragments:post:{post.pk}"],
+            post.category_id,
+            versions[f"fragments:category:{post.category_id}"],
+        )
+        for name in FRAGMENT_TEMPLATES:
+            keys[(post.pk, name)] = f"fragments:v{FRAGMENT_SCHEMA}:{name}:{stamp}"
+    cached = cache.get_many(list(keys.values()))
+
+    misses = [
+        post
+        for post in posts
+        if any(keys[(post.pk, name)] not in cached for name in FRAGMENT_TEMPLATES)
+    ]
+    if misses:
+        prefetch_related_objects(misses, latest_comments_prefetch())
+        rendered = {}
+        for post in misses:
+            for name, template in FRAGMENT_TEMPLATES.items():
+                rendered[keys[(post.pk, name)]] = render_to_string(template, {"post": post})
+        cache.set_many(rendered, _timeout())
+        cached.update(rendered)
+
+    for post in posts:
+        for name in FRAGMENT_TEMPLATES:
+            setattr(post, name, mark_safe(cached[keys[(post.pk, name)]]))
+    _count(cache, "hits", len(posts) - len(misses))
+    _count(cache, "misses", len(misses))
+    return posts
+
+
+# Hit/miss counters shared by every process using the fragment cache.
+def fragment_cache_stats():
+    cache = get_cache()
+    values = cache.get_many(list(STATS_KEYS.values()))
+    stats = {name: values.get(key, 0) for name, key in STATS_KEYS.items()}
+    total = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / total if total else 0.0
+    return stats
+
+
+# Reset the shared hit/miss counters.
+def reset_fragment_cache_stats():
+    get_cache().delete_many(list(STATS_KEYS.values()))
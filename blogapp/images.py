@@ -0,0 +1,143 @@
+# Post image pipeline: strip EXIF, cap dimensions and build WebP variants off-request.
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import jobs
+from .conditional import POSTS, bump_collections
+from .fragments import bump_post_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Pillow format -> file extension for the sanitized original.
+ORIGINAL_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+_executor = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_executor():
+    """Process-wide worker pool for image jobs (created on first use)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_setting("BLOG_IMAGE_WORKERS", 2), thread_name_prefix="post-images"
+        )
+    return _executor
+
+
+# Mark a post's new image as pending and process it after the transaction commits.
+def queue_image_processing(post):
+    """Call after saving a post whose image was added, replaced or cleared."""
+    if not post.image:
+        Post.objects.filter(pk=post.pk).update(
+            image_status="", image_thumbnail=None, image_medium=None
+        )
+        return
+    Post.objects.filter(pk=post.pk).update(image_status="pending")
+    post.image_status = "pending"
+    mode = _setting("BLOG_IMAGE_PROCESSING", "thread")
+    if mode == "sync":
+        transaction.on_commit(lambda: process_post_image(post.pk))
+    elif mode == "queue":
+        jobs.enqueue("process_post_image", {"post_id": post.pk})
+    else:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_worker, post.pk))
+
+
+def _run_in_worker(post_id):
+    # Worker threads own their DB connections; release them when done.
+    try:
+        process_post_image(post_id)
+    finally:
+        close_old_connections()
+
+
+# Variant field -> maximum width in pixels.
+def variant_widths():
+    return {
+        "image_thumbnail": _setting("BLOG_IMAGE_THUMBNAIL_WIDTH", 400),
+        "image_medium": _setting("BLOG_IMAGE_MEDIUM_WIDTH", 1024),
+    }
+
+
+def _encode(image, fmt, **options):
+    buffer = io.BytesIO()
+    # No exif/icc arguments: the re-encoded file carries no metadata.
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def _save(storage, name, data):
+    # Names are content hashes, so an existing file already has these bytes.
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(data))
+
+
+# Sanitize a post's image and write its thumbnail and medium variants.
+def process_post_image(post_id):
+    """Return True on success. Failures are logged and leave status "failed".
+
+    Results are only written while the post still has the image this job
+    read; a job overtaken by a newer upload is discarded.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return False
+    source_name = post.image.name
+    current = Post.objects.filter(pk=post_id, image=source_name)
+    try:
+        with post.image.open("rb") as file:
+            source = Image.open(file)
+            source.load()
+        fmt = source.format if source.format in ORIGINAL_FORMATS else "PNG"
+        image = ImageOps.exif_transpose(source)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        if fmt == "JPEG" and has_alpha:
+            fmt = "PNG"
+        image.thumbnail(_setting("BLOG_IMAGE_MAX_SIZE", (2048, 2048)), Image.LANCZOS)
+
+        original = _encode(image, fmt, **({"quality": 90} if fmt == "JPEG" else {}))
+        digest = hashlib.sha256(original).hexdigest()[:16]
+        storage = post.image.storage
+        names = {
+            "image": _save(storage, f"post_images/{digest}.{ORIGINAL_FORMATS[fmt]}", original)
+        }
+
+        variant_format = _setting("BLOG_IMAGE_VARIANT_FORMAT", "WEBP")
+        extension = variant_format.lower()
+        for field, width in variant_widths().items():
+            variant = image.copy()
+            variant.thumbnail((width, width * 4), Image.LANCZOS)
+            data = _encode(variant, variant_format, quality=_setting("BLOG_IMAGE_QUALITY", 80))
+            name = f"post_images/variants/{digest}-{width}w.{extension}"
+            names[field] = _save(storage, name, data)
+
+        # Content-addressed files may be shared with an identical newer upload,
+        # so a discarded result leaves them in place.
+        if not current.update(**names, image_status="ready", updated_at=timezone.now()):
+            logger.info("Discarding stale image result for post %s", post_id)
+            return False
+        # A queryset update sends no post_save: invalidate cards and ETags here.
+        bump_post_version(post_id)
+        bump_collections(POSTS)
+        if source_name != names["image"] and not Post.objects.filter(image=source_name).exists():
+            storage.delete(source_name)
+        return True
+    except Exception:
+        logger.exception("Processing image of post %s failed", post_id)
+        current.update(image_status="failed")
+        return False
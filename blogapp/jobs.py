@@ -0,0 +1,257 @@
+# Database-backed job queue: enqueue after commit, run by `manage.py run_worker`.
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Task name -> dotted path of the function run with the job payload as kwargs;
+# BLOG_JOB_TASKS adds more.
+TASKS = {
+    "process_post_image": "blogapp.images.process_post_image",
+    "purge_deleted": "blogapp.deletion.purge_deleted",
+}
+DUE_ORDERING = ["-priority", "run_at", "pk"]
+# Seconds between looks for running jobs whose worker died.
+REAP_INTERVAL = 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_tasks():
+    return {**TASKS, **_setting("BLOG_JOB_TASKS", {})}
+
+
+def get_task(name):
+    return import_string(get_tasks()[name])
+
+
+# Queue ``name(**payload)`` for a worker once the current transaction commits.
+def enqueue(name, payload=None, *, priority=0, delay=0, max_attempts=None, unique=False):
+    """Insert the job row after commit, so workers never see jobs of rolled back
+    writes nor run before the rows they need are visible. Higher ``priority``
+    runs first; ``delay`` seconds postpone it; ``unique`` skips the insert when
+    the same job is already queued. Unknown names and payloads that are not
+    JSON raise here, in the caller.
+    """
+    if name not in get_tasks():
+        raise ValueError(f"Unknown job task {name!r}.")
+    payload = payload or {}
+    json.dumps(payload)
+    max_attempts = max_attempts or _setting("BLOG_JOB_MAX_ATTEMPTS", 5)
+
+    def insert():
+        if unique and Job.objects.filter(name=name, payload=payload, status=Job.QUEUED).exists():
+            return
+        Job.objects.create(
+            name=name,
+            payload=payload,
+            priority=priority,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            max_attempts=max_attempts,
+        )
+
+    transaction.on_commit(insert)
+
+
+# Take up to ``limit`` due jobs for one worker.
+def claim(limit=1, worker="worker"):
+    """Mark the best due jobs running under a fresh claim token and return them.
+
+    The UPDATE only takes rows that are still queued, so two workers never
+    run the same job: on SQLite writers are serialized (BEGIN IMMEDIATE), on
+    databases with row locks the SELECT skips rows another worker is taking.
+    """
+    token = f"{worker[:50]}:{uuid.uuid4().hex[:12]}"
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by(*DUE_ORDERING)
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:limit]
+        )
+        claimed = Job.objects.filter(pk__in=list(due), status=Job.QUEUED).update(
+            status=Job.RUNNING, claimed_by=token, claimed_at=now, attempts=F("attempts") + 1
+        )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(status=Job.RUNNING, claimed_by=token).order_by(*DUE_ORDERING))
+
+
+# Run one claimed job and record the outcome: "done", "retry" or "dead".
+def run_job(job_id):
+    """Finished jobs are deleted; failed ones are retried with backoff until
+    they run out of attempts, then kept as "dead" with their traceback.
+    """
+    job = Job.objects.filter(pk=job_id, status=Job.RUNNING).first()
+    if job is None:
+        return None
+    try:
+        get_task(job.name)(**job.payload)
+    except Exception:
+        logger.exception("Job %s failed", job)
+        return _failed(job, traceback.format_exc())
+    # Only the current claim: a job presumed lost may be running elsewhere again.
+    Job.objects.filter(pk=job.pk, claimed_by=job.claimed_by).delete()
+    return "done"
+
+
+def _run_in_worker(job_id):
+    # Pool threads and processes own their DB connections; release them when done.
+    try:
+        return run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+# Seconds before retry number ``attempts``: doubled each time, capped, jittered.
+def backoff(attempts):
+    delay = min(
+        _setting("BLOG_JOB_BACKOFF_BASE", 5) * 2 ** (attempts - 1),
+        _setting("BLOG_JOB_BACKOFF_MAX", 60 * 60),
+    )
+    # Spread retries of jobs that failed together (e.g. during an outage).
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _failed(job, error):
+    current = Job.objects.filter(pk=job.pk, claimed_by=job.claimed_by)
+    if job.attempts >= job.max_attempts:
+        current.update(status=Job.DEAD, claimed_by="", last_error=error)
+        logger.error("Job %s is dead after %d attempts", job, job.attempts)
+        return "dead"
+    current.update(
+        status=Job.QUEUED,
+        claimed_by="",
+        claimed_at=None,
+        last_error=error,
+        run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+    )
+    return "retry"
+
+
+# Count running jobs claimed over BLOG_JOB_TIMEOUT seconds ago as failed attempts.
+def requeue_stale(timeout=None):
+    """Their worker died or hung; return how many were requeued or dead-lettered."""
+    timeout = timeout or _setting("BLOG_JOB_TIMEOUT", 10 * 60)
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    stale = list(Job.objects.filter(status=Job.RUNNING, claimed_at__lt=cutoff))
+    for job in stale:
+        _failed(job, f"No result {timeout}s after {job.claimed_by} claimed it.")
+    return len(stale)
+
+
+# Give dead jobs a fresh set of attempts.
+def retry_dead(queryset=None):
+    queryset = Job.objects.all() if queryset is None else queryset
+    return queryset.filter(status=Job.DEAD).update(
+        status=Job.QUEUED, attempts=0, run_at=timezone.now(), claimed_at=None
+    )
+
+
+# Runs jobs in the calling thread (tests, debugging).
+class InlineExecutor:
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+# Claim due jobs and run them on a pool until stopped.
+class Worker:
+    """Keep up to ``concurrency`` jobs running on a ``pool`` of threads,
+    processes (CPU-bound tasks; forked) or "inline" in this thread, and poll
+    every ``poll`` seconds while the queue is idle. ``stop()`` (SIGTERM) lets
+    running jobs finish and claims no more.
+    """
+
+    def __init__(self, concurrency=None, pool=None, poll=None, name=None):
+        self.concurrency = concurrency or _setting("BLOG_JOB_CONCURRENCY", 4)
+        self.pool = pool or _setting("BLOG_JOB_POOL", "thread")
+        self.poll = _setting("BLOG_JOB_POLL_SECONDS", 1) if poll is None else poll
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.outcomes = Counter()
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self, burst=False):
+        """Process jobs; with ``burst`` return once no job is due or running."""
+        executor, target = self._executor()
+        running = set()
+        next_reap = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_reap:
+                    requeue_stale()
+                    next_reap = time.monotonic() + REAP_INTERVAL
+                free = self.concurrency - len(running)
+                for job in claim(free, self.name) if free > 0 else []:
+                    running.add(executor.submit(target, job.pk))
+                if running:
+                    done, running = wait(running, self.poll, return_when=FIRST_COMPLETED)
+                    self._record(done)
+                elif burst:
+                    break
+                else:
+                    self._stop.wait(self.poll)
+            done, _ = wait(running)
+            self._record(done)
+        finally:
+            executor.shutdown(wait=True)
+        return self.outcomes
+
+    def _record(self, futures):
+        for future in futures:
+            try:
+                outcome = future.result()
+            except Exception:
+                # run_job() records task errors; this is the queue itself failing.
+                logger.exception("Running a job failed")
+                outcome = "error"
+            if outcome:  # None: the job was gone (requeued as lost, deleted).
+                self.outcomes[outcome] += 1
+
+    def _executor(self):
+        if self.pool == "inline":
+            return InlineExecutor(), run_job
+        if self.pool == "process":
+            # Children must not inherit an open connection: close it, then start
+            # every process now, before this one reconnects.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                self.concurrency, mp_context=multiprocessing.get_context("fork")
+            )
+            executor.submit(int).result()
+            return executor, _run_in_worker
+        executor = ThreadPoolExecutor(self.concurrency, thread_name_prefix="job-worker")
+        return executor, _run_in_worker
@@ -0,0 +1,67 @@
+# Like bookkeeping: stored counters, batched per-viewer state and toggling.
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .conditional import POSTS, bump_collections
+from .models import Post, PostLike
+from .trending import forget_likes, record_likes
+
+
+# Subquery counting the like rows of the outer post.
+def like_count_subquery():
+    counts = (
+        PostLike.objects.filter(post_id=OuterRef("pk"))
+        .order_by()
+        .values("post_id")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+# Recompute the stored like_count of the given posts in a single UPDATE.
+def refresh_like_counts(post_ids):
+    """Set ``like_count`` from the through table (and touch ``updated_at``)."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return 0
+    return Post.objects.filter(pk__in=post_ids).update(
+        like_count=like_count_subquery(), updated_at=timezone.now()
+    )
+
+
+# Return the ids of ``posts`` that ``user`` has liked, in one query.
+def liked_post_ids(user, posts):
+    if not user.is_authenticated:
+        return set()
+    post_ids = [post.pk for post in posts]
+    if not post_ids:
+        return set()
+    return set(
+        PostLike.objects.filter(user_id=user.pk, post_id__in=post_ids).values_list(
+            "post_id", flat=True
+        )
+    )
+
+
+# Like or unlike ``post`` for ``user``; returns True if the post is now liked.
+def toggle_like(post, user):
+    """Delete the (post, user) row if there is one, else insert it; then recount.
+
+    Works on the through table directly (no m2m_changed round trips): one
+    lookup, a DELETE or an INSERT, and the counter and trending UPDATEs.
+    ``get_or_create`` absorbs a concurrent insert of the same like, and only
+    the toggle whose DELETE removed the row forgets it, so two racing
+    toggles act like two sequential ones.
+    """
+    with transaction.atomic():
+        like, created = PostLike.objects.get_or_create(post_id=post.pk, user_id=user.pk)
+        if created:
+            record_likes([post.pk])
+        elif PostLike.objects.filter(pk=like.pk).delete()[0]:
+            forget_likes([(post.pk, like.created_at)])
+        refresh_like_counts([post.pk])
+        bump_collections(POSTS)
+    return created
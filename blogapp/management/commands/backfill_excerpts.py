@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.models import Post, backfill_excerpts
+
+
+# Management command: (re)compute stored post excerpts and word counts.
+class Command(BaseCommand):
+    help = (
+        "Store the excerpt and word count of posts that have none (e.g. rows "
+        "written with queryset.update()); --all recomputes every post."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Recompute every post.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000, help="Posts read and written per batch."
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if not options["all"]:
+            posts = posts.filter(word_count=0).exclude(content="")
+        total = backfill_excerpts(posts, options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"Stored excerpts of {total} posts."))
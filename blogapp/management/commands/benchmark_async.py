@@ -0,0 +1,148 @@
+import asyncio
+import io
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from blogapp.bench import seed_posts
+from blogapp.models import Category, Post
+
+HOST = "localhost"
+
+# Server flavour -> URLconf it serves.
+MODES = {"sync (WSGI)": "blogapp.urls", "async (ASGI)": "blogapp.async_urls"}
+
+
+# Management command: requests/sec and p99 latency of sync vs async read views.
+class Command(BaseCommand):
+    help = (
+        "Load-test the read paths in process: sync views behind a threaded WSGI "
+        "handler vs async views behind the ASGI handler, at increasing concurrency. "
+        "Seeds bench-* rows and deletes them afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+        parser.add_argument(
+            "--paths",
+            nargs="+",
+            default=["/home/", "/posts/?page_size=20", "/get-blogs-paginated/?page_size=20"],
+        )
+
+    def handle(self, *args, **options):
+        seed_posts(options["posts"], words_per_post=100)
+        user, _ = User.objects.get_or_create(username="bench-user-0")
+        client = Client()
+        client.force_login(user)
+        cookie = f"sessionid={client.cookies['sessionid'].value}"
+        try:
+            with override_settings(ALLOWED_HOSTS=[HOST], BLOG_METRICS_HEADERS=True):
+                self.run_all(options, cookie)
+        finally:
+            client.logout()
+            Post.objects.filter(category__name__startswith="bench-category-").delete()
+            Category.objects.filter(name__startswith="bench-category-").delete()
+            User.objects.filter(username__startswith="bench-user-").delete()
+
+    def run_all(self, options, cookie):
+        self.stdout.write(f"{'path':<38}{'server':<14}{'conc':>5}{'req/s':>9}{'p99 ms':>9}")
+        for path in options["paths"]:
+            for mode, urlconf in MODES.items():
+                with override_settings(ROOT_URLCONF=urlconf):
+                    for concurrency in options["concurrency"]:
+                        if mode.startswith("sync"):
+                            rate, p99 = run_wsgi(path, cookie, options["requests"], concurrency)
+                        else:
+                            rate, p99 = asyncio.run(
+                                run_asgi(path, cookie, options["requests"], concurrency)
+                            )
+                        self.stdout.write(
+                            f"{path:<38}{mode:<14}{concurrency:>5}{rate:>9.0f}{p99:>9.1f}"
+                        )
+
+
+def _summary(latencies, elapsed):
+    p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+    return len(latencies) / elapsed, p99 * 1000
+
+
+# ``count`` GETs through the WSGI handler from ``concurrency`` threads.
+def run_wsgi(path, cookie, count, concurrency):
+    handler = WSGIHandler()
+    path_info, _, query = path.partition("?")
+
+    def request(_):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path_info,
+            "QUERY_STRING": query,
+            "SERVER_NAME": HOST,
+            "SERVER_PORT": "80",
+            "HTTP_HOST": HOST,
+            "HTTP_COOKIE": cookie,
+            "wsgi.input": io.BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+        }
+        start = time.perf_counter()
+        response = handler(environ, lambda status, headers: None)
+        b"".join(response)
+        response.close()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(request, range(count)))
+    return _summary(latencies, time.perf_counter() - start)
+
+
+# ``count`` GETs through the ASGI handler, ``concurrency`` in flight at a time.
+async def run_asgi(path, cookie, count, concurrency):
+    handler = ASGIHandler()
+    path_info, _, query = path.partition("?")
+    slots = asyncio.Semaphore(concurrency)
+
+    async def request():
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path_info,
+            "raw_path": path_info.encode(),
+            "query_string": query.encode(),
+            "headers": [(b"host", HOST.encode()), (b"cookie", cookie.encode())],
+            "client": ("127.0.0.1", 50000),
+            "server": (HOST, 80),
+        }
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # No disconnect: wait until the handler cancels its listener.
+            await asyncio.Event().wait()
+
+        async def send(message):
+            pass
+
+        async with slots:
+            start = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - start
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(request() for _ in range(count)))
+    return _summary(latencies, time.perf_counter() - start)
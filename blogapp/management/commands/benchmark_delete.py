@@ -0,0 +1,99 @@
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blogapp.bench import throwaway_data
+from blogapp.deletion import purge_deleted, soft_delete_categories
+from blogapp.models import Category, Comment, Post, PostLike
+from blogapp.search import get_search_backend
+from blogapp.trending import track_posts
+
+
+# Management command: time deleting a big category, cascade vs soft delete + purge.
+class Command(BaseCommand):
+    help = (
+        "Delete a category with ~100k descendant rows (posts, comments, likes) with "
+        "Django's cascading delete() and with soft delete + batched purge. Reports "
+        "wall time, statements, the longest statement (how long writers wait) and "
+        "peak Python memory. Rolled back. The cascade runs every delete signal "
+        "per row and takes minutes at full size; --skip-cascade leaves it out."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=2000)
+        parser.add_argument("--comments-per-post", type=int, default=40)
+        parser.add_argument("--likes-per-post", type=int, default=10)
+        parser.add_argument(
+            "--batch-size", type=int, default=getattr(settings, "BLOG_PURGE_BATCH_SIZE", 1000)
+        )
+        parser.add_argument("--skip-cascade", action="store_true")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'step':<20}{'ms':>10}{'queries':>9}{'longest ms':>12}{'peak MB':>9}"
+        )
+        with throwaway_data():
+            category, rows = self.seed(options)
+            self.stdout.write(f"category with {rows} descendant rows")
+            if not options["skip_cascade"]:
+                self.measure("cascade delete()", category.delete)
+        with throwaway_data():
+            category, _ = self.seed(options)
+            self.measure("soft delete", lambda: soft_delete_categories([category.pk]))
+            self.measure("purge", lambda: purge_deleted(options["batch_size"], pause=0))
+
+    def seed(self, options):
+        category = Category.objects.create(name="bench-delete")
+        users = [
+            User.objects.get_or_create(username=f"bench-user-{i}")[0]
+            for i in range(options["likes_per_post"])
+        ]
+        posts = [
+            Post(title=f"Post {i}", content="Benchmark body " * 50, category=category, user=users[0])
+            for i in range(options["posts"])
+        ]
+        for post in posts:
+            post.refresh_excerpt()
+        posts = Post.objects.bulk_create(posts, batch_size=5000)
+        track_posts(posts)
+        get_search_backend().update_many(posts)
+        Comment.objects.bulk_create(
+            (
+                Comment(post=post, author="bench", content="A benchmark comment")
+                for post in posts
+                for _ in range(options["comments_per_post"])
+            ),
+            batch_size=5000,
+        )
+        PostLike.objects.bulk_create(
+            (PostLike(post=post, user=user) for post in posts for user in users),
+            batch_size=5000,
+        )
+        rows = len(posts) * (1 + options["comments_per_post"] + len(users))
+        return category, rows
+
+    def measure(self, name, func):
+        timings = []
+
+        def timed(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timed):
+            func()
+        elapsed = (time.perf_counter() - start) * 1000
+        peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{name:<20}{elapsed:>10.0f}{len(timings):>9}"
+            f"{max(timings, default=0) * 1000:>12.1f}{peak:>9.1f}"
+        )
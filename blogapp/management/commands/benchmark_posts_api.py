@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blogapp.bench import seed_posts, throwaway_data
+from blogapp.models import Comment, Post
+from blogapp.serializers import PostListSerializer, PostSerializer
+
+
+# Management command: queries, bytes and time per page of the posts list API.
+class Command(BaseCommand):
+    help = (
+        "Compare one page of /posts/ before (nested PostSerializer, no joins) and "
+        "after (compact list serializer with optimized queryset). Rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--comments-per-post", type=int, default=10)
+        parser.add_argument("--page-size", type=int, default=100)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        with throwaway_data():
+            seed_posts(options["posts"], words_per_post=300)
+            comments = [
+                Comment(post_id=post_id, author="bench", content="A benchmark comment " * 5)
+                for post_id in Post.objects.values_list("pk", flat=True)
+                for _ in range(options["comments_per_post"])
+            ]
+            Comment.objects.bulk_create(comments, batch_size=5000)
+
+            factory = APIRequestFactory()
+            ordered = Post.objects.order_by("-publication_date", "-id")
+            cases = {
+                "before": (PostSerializer, lambda request: ordered),
+                "after": (
+                    PostListSerializer,
+                    lambda request: PostListSerializer.optimize_queryset(ordered, request),
+                ),
+                "after ?fields=id,title": (
+                    PostListSerializer,
+                    lambda request: PostListSerializer.optimize_queryset(ordered, request),
+                ),
+            }
+            self.stdout.write(f"{'case':<24}{'queries':>9}{'bytes':>12}{'ms':>9}")
+            for name, (serializer_class, get_queryset) in cases.items():
+                query = "?fields=id,title" if "fields" in name else ""
+                request = Request(factory.get("/posts/" + query))
+                start = time.perf_counter()
+                with CaptureQueriesContext(connection) as queries:
+                    page = list(get_queryset(request)[:page_size])
+                    data = serializer_class(page, many=True, context={"request": request}).data
+                    body = JSONRenderer().render(data)
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(
+                    f"{name:<24}{len(queries.captured_queries):>9}{len(body):>12}{elapsed:>9.1f}"
+                )
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.bench import measure, seed_posts, throwaway_data
+from blogapp.models import Post
+from blogapp.search import DatabaseSearchBackend, SQLiteFTSBackend
+
+
+# Management command: compare icontains search with the FTS5 index.
+class Command(BaseCommand):
+    help = (
+        "Benchmark blog_list search (count + first page) with icontains and FTS5. "
+        "Data is seeded in a transaction and rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000]
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        backends = {"icontains": DatabaseSearchBackend(), "fts5": SQLiteFTSBackend()}
+        self.stdout.write(
+            f"{'posts':>9}  {'query':<24}{'icontains ms':>14}{'fts5 ms':>10}{'speedup':>9}"
+        )
+        with throwaway_data():
+            seeded = 0
+            for size in sorted(options["sizes"]):
+                words = seed_posts(size - seeded, seed=size)
+                seeded = size
+                backends["fts5"].rebuild()
+                # A common word, a rare word, a two-word phrase and a prefix.
+                queries = [words[0], words[-1], f'"{words[0]} {words[1]}"', words[2][:3] + "*"]
+                for query in queries:
+                    timings = {}
+                    for name, backend in backends.items():
+                        if name == "icontains":
+                            # icontains has no phrase/prefix syntax; search the bare text.
+                            query_text = query.strip('"').rstrip("*")
+                        else:
+                            query_text = query
+
+                        def run():
+                            posts = backend.search(
+                                Post.objects.order_by("-publication_date"), query_text
+                            )
+                            posts.count()
+                            list(posts[:10])
+
+                        timings[name] = measure(run, options["repeat"])
+                    self.stdout.write(
+                        f"{size:>9}  {query:<24}{timings['icontains']:>14.1f}"
+                        f"{timings['fts5']:>10.1f}"
+                        f"{timings['icontains'] / max(timings['fts5'], 0.001):>8.1f}x"
+                    )
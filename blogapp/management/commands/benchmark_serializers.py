@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blogapp.bench import measure, seed_posts, throwaway_data
+from blogapp.models import Comment, Post
+from blogapp.rows import RowSerializer
+from blogapp.serializers import BlogSerializer, CommentSerializer, PostListSerializer
+
+
+# Management command: DRF serializers vs the values() read path, one page each.
+class Command(BaseCommand):
+    help = (
+        "Time one page of each list endpoint serialized by DRF (model instances) and "
+        "by blogapp.rows (values() rows), checking the bytes match. Rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=1000)
+        parser.add_argument("--comments-per-post", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        with throwaway_data():
+            seed_posts(page_size, words_per_post=100)
+            Comment.objects.bulk_create(
+                (
+                    Comment(post_id=post_id, author="bench", content="A benchmark comment")
+                    for post_id in Post.objects.values_list("pk", flat=True)
+                    for _ in range(options["comments_per_post"])
+                ),
+                batch_size=5000,
+            )
+            request = Request(APIRequestFactory().get("/posts/"))
+            context = {"request": request}
+            posts = PostListSerializer.optimize_queryset(
+                Post.objects.order_by("-publication_date", "-id"), request
+            )
+            cases = {
+                "posts": (PostListSerializer, posts),
+                "comments": (CommentSerializer, Comment.objects.order_by("-created_at")),
+                "blogs": (
+                    BlogSerializer,
+                    Post.objects.prefetch_related("comments").order_by("-publication_date"),
+                ),
+            }
+            self.stdout.write(
+                f"{'endpoint':<10}{'drf ms':>10}{'rows ms':>10}{'drf rows/s':>13}"
+                f"{'rows rows/s':>13}{'speedup':>9}"
+            )
+            for name, (serializer_class, queryset) in cases.items():
+
+                def drf():
+                    page = list(queryset[:page_size])
+                    data = serializer_class(page, many=True, context=context).data
+                    return JSONRenderer().render(data)
+
+                def rows():
+                    engine = RowSerializer(serializer_class(context=context))
+                    data = engine.serialize(engine.rows(queryset)[:page_size])
+                    return JSONRenderer().render(data)
+
+                if drf() != rows():
+                    self.stderr.write(f"{name}: output differs between the two paths")
+                drf_ms = measure(drf, options["repeat"])
+                rows_ms = measure(rows, options["repeat"])
+                self.stdout.write(
+                    f"{name:<10}{drf_ms:>10.1f}{rows_ms:>10.1f}"
+                    f"{page_size / drf_ms * 1000:>13.0f}{page_size / rows_ms * 1000:>13.0f}"
+                    f"{drf_ms / rows_ms:>8.1f}x"
+                )
@@ -0,0 +1,178 @@
+import random
+import statistics
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from blogapp.bench import throwaway_data
+from blogapp.models import AuthorStats, Category, Follow, Post
+from blogapp.pagination import POST_ORDERING
+from blogapp.timeline import fan_out, feed_page
+
+
+# Management command: following feeds, materialized timelines vs fan-out on read.
+class Command(BaseCommand):
+    help = (
+        "Seed users following authors with a Zipf-skewed follower distribution, "
+        "then report the fan-out cost of a new post per author tier and feed read "
+        "latency (p50/p99) of the timeline against a pure fan-out-on-read query. "
+        "Data is seeded in a transaction and rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--authors", type=int, default=200)
+        parser.add_argument("--follows-per-user", type=int, default=20)
+        parser.add_argument("--posts-per-author", type=int, default=20)
+        parser.add_argument(
+            "--other-posts",
+            type=int,
+            default=100_000,
+            help="Posts by authors nobody follows (the rest of the site).",
+        )
+        parser.add_argument("--zipf", type=float, default=1.1, help="Skew exponent.")
+        parser.add_argument(
+            "--fanout-limit",
+            type=int,
+            default=getattr(settings, "BLOG_TIMELINE_FANOUT_LIMIT", 1000),
+        )
+        parser.add_argument("--samples", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with override_settings(BLOG_TIMELINE_FANOUT_LIMIT=options["fanout_limit"]):
+            with throwaway_data():
+                authors, readers = self.seed(options)
+                self.report_writes(authors)
+                self.report_reads(readers, options["samples"])
+
+    def seed(self, options):
+        rng = random.Random(0)
+        users = User.objects.bulk_create(
+            [User(username=f"bench-timeline-{i}") for i in range(options["users"])],
+            batch_size=5000,
+        )
+        authors = users[: options["authors"]]
+        weights = [1.0 / (rank + 1) ** options["zipf"] for rank in range(len(authors))]
+        follows = set()
+        for user in users:
+            wanted = min(options["follows_per_user"], len(authors) - 1)
+            followees = set()
+            while len(followees) < wanted:
+                author = rng.choices(authors, weights)[0]
+                if author.pk != user.pk:
+                    followees.add(author.pk)
+            follows.update((user.pk, author_id) for author_id in followees)
+        Follow.objects.bulk_create(
+            [Follow(follower_id=a, followee_id=b) for a, b in follows], batch_size=5000
+        )
+        followers = Counter(followee for _, followee in follows)
+        AuthorStats.objects.bulk_create(
+            [
+                AuthorStats(
+                    user_id=author.pk,
+                    follower_count=followers[author.pk],
+                    fanout_on_read=followers[author.pk] >= options["fanout_limit"],
+                )
+                for author in authors
+            ]
+        )
+        category = Category.objects.create(name="bench-timeline")
+        others = User.objects.bulk_create(
+            [User(username=f"bench-timeline-other-{i}") for i in range(100)]
+        )
+        posts = [
+            Post(title=f"Post {i}", content="Benchmark body", category=category, user=author)
+            for author in authors
+            for i in range(options["posts_per_author"])
+        ]
+        # Posts by authors nobody follows, interleaved in time; never fanned out.
+        other_posts = [
+            Post(
+                title=f"Other {i}",
+                content="Benchmark body",
+                category=category,
+                user=others[i % len(others)],
+            )
+            for i in range(options["other_posts"])
+        ]
+        every_post = posts + other_posts
+        rng.shuffle(every_post)
+        for post in every_post:
+            post.refresh_excerpt()
+        Post.objects.bulk_create(every_post, batch_size=5000)
+        fan_out(posts)
+        on_read = sum(1 for count in followers.values() if count >= options["fanout_limit"])
+        self.stdout.write(
+            f"{len(users)} users, {len(follows)} follows, {len(posts)} followed and "
+            f"{len(other_posts)} other posts; "
+            f"most followed author has {max(followers.values())} followers, "
+            f"{on_read} authors are fanned out on read"
+        )
+        authors = sorted(authors, key=lambda author: -followers[author.pk])
+        return [(author, followers[author.pk]) for author in authors], users[len(authors):]
+
+    def report_writes(self, authors):
+        self.stdout.write(f"\n{'new post by':<24}{'followers':>10}{'rows':>8}{'ms':>10}")
+        category = Category.objects.get(name="bench-timeline")
+        tiers = {"top author": 0, "median author": len(authors) // 2, "tail author": -1}
+        for name, index in tiers.items():
+            author, follower_count = authors[index]
+            post = Post(title="New", content="New post", category=category, user=author)
+            post.refresh_excerpt()
+            Post.objects.bulk_create([post])
+            start = time.perf_counter()
+            written = fan_out([post])
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stdout.write(f"{name:<24}{follower_count:>10}{written:>8}{elapsed:>10.1f}")
+
+    def report_reads(self, readers, samples):
+        readers = random.Random(1).sample(readers, min(samples, len(readers)))
+        per_page = getattr(settings, "BLOG_TIMELINE_PAGE_SIZE", 10)
+
+        def timeline(user):
+            page = feed_page(user.pk)
+            feed_page(user.pk, page.next_cursor)
+
+        def on_read(user):
+            followees = Follow.objects.filter(follower_id=user.pk).values("followee_id")
+            posts = Post.objects.filter(user_id__in=followees).order_by(*POST_ORDERING)
+            list(posts.values_list("pk", flat=True)[:per_page])
+            list(posts.values_list("pk", flat=True)[per_page : 2 * per_page])
+
+        # Wall time includes building the queries; SQL time is the database's share.
+        self.stdout.write(
+            f"\n{'two feed pages':<24}{'p50 ms':>10}{'p99 ms':>10}"
+            f"{'sql p50':>10}{'sql p99':>10}{'queries':>9}"
+        )
+        for name, read in (("timeline", timeline), ("fan-out on read", on_read)):
+            timings, sql_timings, queries = [], [], []
+
+            def timed(execute, sql, params, many, context):
+                start = time.perf_counter()
+                try:
+                    return execute(sql, params, many, context)
+                finally:
+                    sql_timings[-1] += (time.perf_counter() - start) * 1000
+                    queries[-1] += 1
+
+            with connection.execute_wrapper(timed):
+                for user in readers:
+                    sql_timings.append(0)
+                    queries.append(0)
+                    start = time.perf_counter()
+                    read(user)
+                    timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f"{name:<24}{statistics.median(timings):>10.2f}{p99(timings):>10.2f}"
+                f"{statistics.median(sql_timings):>10.2f}{p99(sql_timings):>10.2f}"
+                f"{statistics.median(queries):>9.0f}"
+            )
+
+
+def p99(timings):
+    return statistics.quantiles(timings, n=100)[98] if len(timings) > 1 else timings[0]
@@ -0,0 +1,68 @@
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from blogapp.bench import seed_posts, throwaway_data
+from blogapp.models import Post
+from blogapp.typeahead import build_index
+
+
+# Management command: typeahead from the prefix index vs an icontains query.
+class Command(BaseCommand):
+    help = (
+        "Build the typeahead index over seeded posts and report build time, memory "
+        "and suggestion latency (p50/p99 per prefix length) against a title "
+        "icontains query. Data is seeded in a transaction and rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with throwaway_data():
+            words = seed_posts(options["posts"], words_per_post=20)
+            tracemalloc.start()
+            start = time.perf_counter()
+            index = build_index()
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            self.stdout.write(
+                f"{len(index.entries)} entries, {len(index.keys)} keys, "
+                f"{len(index.top)} ready prefixes: built in {elapsed:.2f}s, "
+                f"peak {peak:.0f} MB"
+            )
+            self.stdout.write(
+                f"\n{'prefix':<8}{'index p50 us':>14}{'p99 us':>10}{'icontains p50 us':>18}"
+            )
+            rng = random.Random(0)
+            for length in (1, 2, 3, 5, 8):
+                prefixes = [
+                    word[:length] for word in rng.choices(words, k=options["queries"])
+                ]
+                index_timings = self.time_each(lambda prefix: index.suggest(prefix, 8), prefixes)
+                query_timings = self.time_each(
+                    lambda prefix: list(
+                        Post.objects.filter(title__icontains=prefix)
+                        .order_by("-like_count")
+                        .values_list("pk", "title")[:8]
+                    ),
+                    prefixes[:50],
+                )
+                self.stdout.write(
+                    f"{length:<8}{statistics.median(index_timings):>14.1f}"
+                    f"{statistics.quantiles(index_timings, n=100)[98]:>10.1f}"
+                    f"{statistics.median(query_timings):>18.0f}"
+                )
+
+    def time_each(self, func, prefixes):
+        timings = []
+        for prefix in prefixes:
+            start = time.perf_counter()
+            func(prefix)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+        return timings
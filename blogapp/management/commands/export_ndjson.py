@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blogapp.transfer import RECORD_TYPES, export_lines
+
+
+# Management command: stream categories, posts, comments and likes as NDJSON.
+class Command(BaseCommand):
+    help = "Export blog data as NDJSON (one record per line), in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", help="File to write (default: stdout).")
+        parser.add_argument("--types", nargs="+", choices=RECORD_TYPES, default=RECORD_TYPES)
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        lines = export_lines(options["types"], options["chunk_size"])
+        if not options["output"]:
+            for line in lines:
+                sys.stdout.buffer.write(line)
+            return
+        count = 0
+        with open(options["output"], "wb") as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stderr.write(self.style.SUCCESS(f"Exported {count} records."))
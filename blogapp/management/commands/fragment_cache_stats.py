@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.fragments import fragment_cache_stats, reset_fragment_cache_stats
+
+
+# Management command: show (or reset) post-card fragment cache hit/miss counters.
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the post-card fragment cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="Reset the counters.")
+
+    def handle(self, *args, **options):
+        stats = fragment_cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_ratio={stats['hit_ratio']:.1%}"
+        )
+        if options["reset"]:
+            reset_fragment_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp.transfer import RECORD_TYPES, ImportConflict, Importer
+
+
+# Management command: bulk-load an NDJSON export, resumable after interruption.
+class Command(BaseCommand):
+    help = (
+        "Import an NDJSON export (see export_ndjson) with batched bulk_create. "
+        "Progress is checkpointed after every batch; rerun with --resume to continue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="NDJSON file, or - for stdin (not resumable).")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint.")
+        parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint).")
+
+    def handle(self, *args, **options):
+        importer = Importer(batch_size=options["batch_size"])
+        start = time.perf_counter()
+        try:
+            if options["path"] == "-":
+                if options["resume"]:
+                    raise CommandError("--resume needs a file, not stdin.")
+                counts = importer.load(sys.stdin.buffer)
+            else:
+                counts = self.load_file(importer, options)
+        except ImportConflict as exc:
+            raise CommandError(str(exc)) from exc
+        indexed = importer.finish()
+        elapsed = time.perf_counter() - start
+        total = sum(counts[name] for name in RECORD_TYPES)
+        summary = ", ".join(f"{name}: {counts[name]}" for name in RECORD_TYPES)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {total} records ({summary}) in {elapsed:.1f}s, "
+                f"{total / max(elapsed, 1e-9):.0f} records/s; {counts['skipped']} already "
+                f"present were skipped; {indexed} posts indexed."
+            )
+        )
+
+    def load_file(self, importer, options):
+        path = options["path"]
+        checkpoint_path = options["checkpoint"] or f"{path}.checkpoint"
+        offset = 0
+        if options["resume"] and os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as file:
+                offset = json.load(file)["offset"]
+            self.stdout.write(f"Resuming at byte {offset}.")
+
+        def checkpoint(position):
+            # Write then rename, so a crash never leaves a torn checkpoint.
+            with open(f"{checkpoint_path}.tmp", "w") as file:
+                json.dump({"offset": position}, file)
+            os.replace(f"{checkpoint_path}.tmp", checkpoint_path)
+
+        with open(path, "rb") as file:
+            file.seek(offset)
+            counts = importer.load(file, offset=offset, checkpoint=checkpoint)
+        os.remove(checkpoint_path)
+        return counts
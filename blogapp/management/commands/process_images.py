@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.images import process_post_image
+from blogapp.models import Post
+
+
+# Management command: sanitize existing post images and build their variants.
+class Command(BaseCommand):
+    help = "Strip EXIF, cap dimensions and build WebP variants for existing post images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true", help="Reprocess images that are already ready."
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["all"]:
+            posts = posts.exclude(image_status="ready")
+        done = failed = 0
+        for post_id in posts.values_list("pk", flat=True).iterator():
+            if process_post_image(post_id):
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} images, {failed} failed."))
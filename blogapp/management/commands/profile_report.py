@@ -0,0 +1,132 @@
+import os
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blogapp.profiling import load_aggregates
+
+DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+UNITS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+SQL_WIDTH = 100
+
+
+# Management command: top functions and queries per view from the sampled profiles.
+class Command(BaseCommand):
+    help = (
+        "Summarize the request profiles written by SamplingProfilerMiddleware: per "
+        "view, the sampled requests' mean time, the functions with the most time "
+        "and the queries with the most total time, over a recent time window."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", default="1h", help="Window, e.g. 30m, 6h, 2d.")
+        parser.add_argument("--view", action="append", help="Only this URL name (repeatable).")
+        parser.add_argument("--limit", type=int, default=10, help="Rows per table.")
+        parser.add_argument(
+            "--sort",
+            choices=["cumulative", "tottime"],
+            default="cumulative",
+            help="Rank functions by time including or excluding callees.",
+        )
+        parser.add_argument(
+            "--output",
+            help="Also write each view's merged <view>.prof / <view>.folded here.",
+        )
+
+    def handle(self, *args, **options):
+        match = DURATION_RE.match(options["since"])
+        if not match:
+            raise CommandError(f"Invalid --since {options['since']!r}: use e.g. 30m or 6h.")
+        window = float(match[1]) * UNITS[match[2]]
+        aggregates = load_aggregates(time.time() - window, options["view"])
+        if not aggregates:
+            self.stdout.write(f"No profiles in the last {options['since']}.")
+            return
+        for view, aggregate in sorted(aggregates.items()):
+            samples = aggregate.samples
+            queries = sum(count for count, _, _ in aggregate.queries.values())
+            sql_ms = sum(total for _, total, _ in aggregate.queries.values())
+            self.stdout.write(
+                f"\n{view}: {samples} sampled requests, "
+                f"{aggregate.total_ms / samples:.1f} ms, {queries / samples:.1f} queries "
+                f"({sql_ms / samples:.1f} ms) per request"
+            )
+            if aggregate.stats is not None:
+                self.write_functions(aggregate, options["sort"], options["limit"])
+            if aggregate.stacks:
+                self.write_stacks(aggregate, options["limit"])
+            self.write_queries(aggregate, options["limit"])
+            if options["output"]:
+                self.write_merged(view, aggregate, Path(options["output"]))
+
+    def write_functions(self, aggregate, sort, limit):
+        # pstats rows: (primitive calls, calls, own time, cumulative time, callers).
+        rows = sorted(
+            aggregate.stats.stats.items(),
+            key=lambda item: item[1][3 if sort == "cumulative" else 2],
+            reverse=True,
+        )
+        samples = aggregate.samples
+        self.stdout.write(f"{'calls/req':>10}{'own ms/req':>12}{'cum ms/req':>12}  function")
+        for key, (_, calls, own, cumulative, _) in rows[:limit]:
+            self.stdout.write(
+                f"{calls / samples:>10.1f}{own * 1000 / samples:>12.2f}"
+                f"{cumulative * 1000 / samples:>12.2f}  {function_label(key)}"
+            )
+
+    def write_stacks(self, aggregate, limit):
+        # Share of the stack samples a function was running (own) or on the stack.
+        own, total = Counter(), Counter()
+        for stack, count in aggregate.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = sum(aggregate.stacks.values())
+        self.stdout.write(f"{'own %':>8}{'total %':>9}  function ({samples} stack samples)")
+        for frame, count in own.most_common(limit):
+            self.stdout.write(
+                f"{count / samples:>8.1%}{total[frame] / samples:>9.1%}  {frame}"
+            )
+
+    def write_queries(self, aggregate, limit):
+        rows = sorted(aggregate.queries.items(), key=lambda item: item[1][1], reverse=True)
+        samples = aggregate.samples
+        self.stdout.write(f"{'runs/req':>10}{'ms/req':>10}{'max ms':>9}  query")
+        for sql, (count, total, slowest) in rows[:limit]:
+            if len(sql) > SQL_WIDTH:
+                sql = sql[: SQL_WIDTH - 1] + "…"
+            self.stdout.write(
+                f"{count / samples:>10.1f}{total / samples:>10.2f}{slowest:>9.2f}  {sql}"
+            )
+
+    def write_merged(self, view, aggregate, directory):
+        directory.mkdir(parents=True, exist_ok=True)
+        if aggregate.stats is not None:
+            aggregate.stats.dump_stats(directory / f"{view}.prof")
+        if aggregate.stacks:
+            (directory / f"{view}.folded").write_text(
+                "".join(f"{stack} {count}\n" for stack, count in aggregate.stacks.items())
+            )
+        self.stdout.write(f"Wrote the merged profile of {view} to {directory}.")
+
+
+# "blogapp/views.py:42(blog_list)": paths relative to the project or site-packages.
+def function_label(key):
+    filename, line, name = key
+    if filename == "~":
+        return name  # Built-in functions: "<built-in method ...>".
+    base = str(settings.BASE_DIR) + os.sep
+    if filename.startswith(base):
+        filename = filename[len(base) :]
+    else:
+        for path in sorted(sys.path, key=len, reverse=True):
+            if path and filename.startswith(path + os.sep):
+                filename = filename[len(path) + 1 :]
+                break
+    return f"{filename}:{line}({name})"
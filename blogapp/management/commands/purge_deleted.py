@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blogapp.deletion import purge_deleted
+
+
+# Management command: remove soft-deleted posts and categories for good.
+class Command(BaseCommand):
+    help = (
+        "Delete soft-deleted posts (with their comments, likes, scores, index rows "
+        "and image files) and categories in bounded batches. Deletes normally "
+        "trigger this in the background; use it with BLOG_PURGE_MODE=off or to "
+        "finish an interrupted purge."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=getattr(settings, "BLOG_PURGE_BATCH_SIZE", 1000),
+            help="Rows per DELETE statement.",
+        )
+        parser.add_argument(
+            "--pause", type=float, default=0, help="Seconds to sleep between batches."
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_deleted(options["batch_size"], options["pause"])
+        for model_name, count in sorted(deleted.items()):
+            self.stdout.write(f"{model_name}: {count} rows deleted")
+        self.stdout.write(self.style.SUCCESS(f"Purged {sum(deleted.values())} rows."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blogapp.search import get_search_backend
+
+
+# Management command: rebuild the post search index from scratch.
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from the posts table."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        count = backend.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {type(backend).__name__} index with {count} posts."
+            )
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from blogapp.comments import comment_count_subquery
+from blogapp.likes import like_count_subquery
+from blogapp.models import Post
+
+# Stored counter field -> subquery computing its true value.
+COUNTERS = {
+    "like_count": like_count_subquery,
+    "comment_count": comment_count_subquery,
+}
+
+
+# Management command: repair drift in the stored post counters.
+class Command(BaseCommand):
+    help = "Recompute stored like/comment counters and fix any that drifted."
+
+    def handle(self, *args, **options):
+        for field, subquery in COUNTERS.items():
+            drifted = Post.objects.alias(actual=subquery()).exclude(**{field: F("actual")})
+            fixed = Post.objects.filter(pk__in=drifted.values("pk")).update(
+                **{field: subquery()}
+            )
+            self.stdout.write(self.style.SUCCESS(f"Fixed {field} on {fixed} posts."))
@@ -0,0 +1,45 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from blogapp.jobs import Worker, retry_dead
+
+
+# Management command: run queued background jobs (blogapp.jobs).
+class Command(BaseCommand):
+    help = (
+        "Claim due jobs from the job table and run them on a thread or process "
+        "pool, retrying failures with backoff and dead-lettering jobs out of "
+        "attempts. Several workers can run at once. SIGTERM/SIGINT let running "
+        "jobs finish before exiting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, help="Jobs run at once (BLOG_JOB_CONCURRENCY)."
+        )
+        parser.add_argument(
+            "--pool", choices=["thread", "process", "inline"], help="BLOG_JOB_POOL."
+        )
+        parser.add_argument("--poll", type=float, help="Seconds between polls when idle.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is due.")
+        parser.add_argument(
+            "--retry-dead", action="store_true", help="Queue dead jobs again first."
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_dead"]:
+            self.stdout.write(f"{retry_dead()} dead jobs queued again.")
+        worker = Worker(options["concurrency"], options["pool"], options["poll"])
+        previous = {
+            signum: signal.signal(signum, lambda *args: worker.stop())
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        self.stdout.write(f"Worker {worker.name}: {worker.concurrency} {worker.pool} slots.")
+        try:
+            outcomes = worker.run(burst=options["burst"])
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+        self.stdout.write(self.style.SUCCESS(f"Stopped: {summary or 'no jobs run'}."))
@@ -0,0 +1,45 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+# Management command: refresh SQLite file replicas from the primary database.
+class Command(BaseCommand):
+    help = (
+        "Copy the primary SQLite database into every BLOG_READ_REPLICAS file with "
+        "the online backup API (a consistent snapshot; writers are not blocked). "
+        "Stand-in for real replication in development and tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every", type=float, help="Keep running and resync every N seconds."
+        )
+
+    def handle(self, *args, **options):
+        aliases = getattr(settings, "BLOG_READ_REPLICAS", [])
+        if not aliases:
+            raise CommandError("No replicas configured (set BLOG_DB_REPLICAS).")
+        while True:
+            for alias in aliases:
+                start = time.perf_counter()
+                copy_database("default", alias)
+                elapsed = (time.perf_counter() - start) * 1000
+                self.stdout.write(f"{alias}: synced in {elapsed:.0f} ms")
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
+
+
+# Snapshot database ``source`` into the SQLite file of database ``target``.
+def copy_database(source, target):
+    primary = connections[source]
+    primary.ensure_connection()
+    # Close the replica's own connection so it reopens the fresh copy.
+    connections[target].close()
+    with sqlite3.connect(connections[target].settings_dict["NAME"]) as replica:
+        primary.connection.backup(replica)
+    replica.close()
@@ -0,0 +1,169 @@
+# Serve uploaded media: validators, cache headers, byte ranges and proxy offload.
+import io
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+# Content-addressed paths written by the image pipeline: "post_images/<sha256[:16]>.<ext>"
+# and "post_images/variants/<sha256[:16]>-<w>w.<ext>".
+HASHED_NAME_RE = re.compile(
+    r"^post_images/(?:(?P<original>[0-9a-f]{16})|variants/(?P<variant>[0-9a-f]{16}-\d+w))\.\w+$"
+)
+# A single "bytes=start-end", "bytes=start-" or "bytes=-suffix" range.
+RANGE_RE = re.compile(r"^bytes=(?P<start>\d*)-(?P<end>\d*)$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Read at most ``length`` bytes of ``file`` from its current position.
+class FileRange:
+    """File-like slice for FileResponse.
+
+    For whole files ``fileno()`` exposes the real file, so servers with
+    ``wsgi.file_wrapper`` (gunicorn) send it with ``sendfile()``. Not every
+    server bounds ``sendfile()`` by Content-Length, so byte ranges have no
+    file descriptor and are always sent through ``read()``.
+    """
+
+    def __init__(self, file, length, whole_file=True):
+        self.file = file
+        self.remaining = length
+        self.whole_file = whole_file
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        if not self.whole_file:
+            raise io.UnsupportedOperation("fileno")
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+# Validators of a media file: strong ETag for the pipeline's hashed files, weak otherwise.
+def file_validators(name, stats):
+    match = HASHED_NAME_RE.match(name)
+    if match:
+        return f'"{match["original"] or match["variant"]}"', True
+    return f'W/"{stats.st_mtime_ns:x}-{stats.st_size:x}"', False
+
+
+# ``(start, end)`` (inclusive) of a Range header, None for the whole file, or
+# "unsatisfiable".
+def parse_range(header, size):
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or not (match["start"] or match["end"]):
+        # Several ranges or another unit: answering with the whole file is allowed.
+        return None
+    if not size:
+        # An empty file has no byte to start a range at, suffix ranges included.
+        return "unsatisfiable"
+    if not match["start"]:
+        length = int(match["end"])
+        if not length:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+    start = int(match["start"])
+    end = min(int(match["end"]), size - 1) if match["end"] else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def _if_range_matches(request, etag, strong, last_modified):
+    # If-Range needs a strong validator; otherwise send the whole file.
+    value = request.headers.get("If-Range")
+    if value is None:
+        return True
+    if value.startswith('"'):
+        return strong and value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+# View serving MEDIA_ROOT files (GET/HEAD) under MEDIA_URL.
+def serve_media(request, path):
+    """Answer 304/412 from the validators, 206/416 for ranges, else the file.
+
+    The pipeline's hashed files never change, so they are cacheable for a year
+    (``immutable``); other names get ``BLOG_MEDIA_MAX_AGE``. With
+    ``BLOG_MEDIA_OFFLOAD`` set to ``"x-accel-redirect"`` or ``"x-sendfile"``
+    the body (and ranges) are left to the front proxy.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    try:
+        filename = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(filename)
+    except (OSError, SuspiciousFileOperation):
+        raise Http404("No such file.") from None
+    if not stat.S_ISREG(stats.st_mode) or os.path.basename(path).startswith("."):
+        raise Http404("No such file.")
+    etag, strong = file_validators(path, stats)
+    last_modified = int(stats.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, path, filename, stats, etag, strong, last_modified)
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = (
+        IMMUTABLE if strong else f"public, max-age={_setting('BLOG_MEDIA_MAX_AGE', 3600)}"
+    )
+    return response
+
+
+def _file_response(request, path, filename, stats, etag, strong, last_modified):
+    content_type, encoding = mimetypes.guess_type(filename)
+    content_type = content_type or "application/octet-stream"
+    offload = _setting("BLOG_MEDIA_OFFLOAD", "")
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload == "x-accel-redirect":
+            prefix = _setting("BLOG_MEDIA_ACCEL_PREFIX", "/protected-media/")
+            response.headers["X-Accel-Redirect"] = prefix + quote(path)
+        else:
+            response.headers["X-Sendfile"] = filename
+        return response
+    size = stats.st_size
+    byte_range = None
+    if "Range" in request.headers and _if_range_matches(request, etag, strong, last_modified):
+        byte_range = parse_range(request.headers["Range"], size)
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+    else:
+        file = open(filename, "rb")
+        file.seek(start)
+        response = FileResponse(
+            FileRange(file, length, whole_file=not byte_range), content_type=content_type
+        )
+    if byte_range:
+        response.status_code = 206
+        response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response.headers["Content-Length"] = str(length)
+    response.headers["Accept-Ranges"] = "bytes"
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
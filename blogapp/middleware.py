@@ -0,0 +1,220 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from . import profiling
+from .routers import replica_reads
+
+logger = logging.getLogger("blogapp.metrics")
+
+# Cookie that pins a client's reads to the primary for a while after it wrote.
+PRIMARY_PIN_COOKIE = "blog_primary"
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+# Per-request counters filled in by the database execute wrapper.
+class RequestMetrics:
+    """SQL query count, DB time and template render time for one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self._render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook: time every query.
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+    def start_render(self):
+        self._render_start = time.perf_counter()
+
+    def end_render(self, response):
+        if self._render_start is not None:
+            self.render_time += time.perf_counter() - self._render_start
+            self._render_start = None
+
+
+# Middleware recording query count, DB time and render time for every request.
+class RequestMetricsMiddleware:
+    """Expose request metrics as headers (DEBUG) or structured log lines.
+
+    Headers: ``X-DB-Queries`` plus a ``Server-Timing`` header with ``db``,
+    ``render`` and ``total`` durations. Set ``BLOG_METRICS_HEADERS`` to force
+    headers on or off regardless of ``DEBUG``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        with self.wrap_connections(metrics):
+            response = self.get_response(request)
+        return self.report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        start = time.perf_counter()
+        # Connections are per thread: install the wrappers on the thread that
+        # runs this request's (thread-sensitive) ORM calls, and remove them there.
+        wrappers = await sync_to_async(self.wrap_connections)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return self.report(request, response, metrics, time.perf_counter() - start)
+
+    def wrap_connections(self, metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+        return stack
+
+    def report(self, request, response, metrics, total):
+        if getattr(settings, "BLOG_METRICS_HEADERS", settings.DEBUG):
+            response["X-DB-Queries"] = str(metrics.queries)
+            response["Server-Timing"] = ", ".join(
+                [
+                    f"db;dur={metrics.db_time * 1000:.1f}",
+                    f"render;dur={metrics.render_time * 1000:.1f}",
+                    f"total;dur={total * 1000:.1f}",
+                ]
+            )
+        else:
+            match = getattr(request, "resolver_match", None)
+            logger.info(
+                json.dumps(
+                    {
+                        "event": "request_metrics",
+                        "method": request.method,
+                        "path": request.path,
+                        "view": match.view_name if match else None,
+                        "status": response.status_code,
+                        "queries": metrics.queries,
+                        "db_ms": round(metrics.db_time * 1000, 2),
+                        "render_ms": round(metrics.render_time * 1000, 2),
+                        "total_ms": round(total * 1000, 2),
+                    }
+                )
+            )
+        return response
+
+    def process_template_response(self, request, response):
+        # Template responses render after this hook; time them with a callback.
+        metrics = getattr(request, "metrics", None)
+        if metrics is not None:
+            metrics.start_render()
+            response.add_post_render_callback(metrics.end_render)
+        return response
+
+
+# Middleware profiling a sample of requests per URL name (see blogapp.profiling).
+class SamplingProfilerMiddleware:
+    """Profile ``BLOG_PROFILE_SAMPLE_RATES[url name]`` of the requests ("*" for
+    the other names) and aggregate the profiles per view under BLOG_PROFILE_DIR.
+
+    Without rates the middleware removes itself from the stack; requests that
+    are not sampled cost one ``random()`` call. Async requests pass through.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.rates = getattr(settings, "BLOG_PROFILE_SAMPLE_RATES", {})
+        self.max_rate = max(self.rates.values(), default=0)
+        if self.max_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.get_response(request)
+        # One draw against the highest rate keeps unsampled requests from
+        # resolving the URL; below it, the view's own rate decides.
+        draw = random.random()
+        if draw >= self.max_rate:
+            return self.get_response(request)
+        try:
+            view = resolve(request.path_info).view_name
+        except Resolver404:
+            return self.get_response(request)
+        if draw >= self.rates.get(view, self.rates.get("*", 0)):
+            return self.get_response(request)
+        sample = profiling.start_sample(view)
+        if sample is None:
+            return self.get_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            sample.stop()
+
+
+# Middleware allowing replica reads for safe requests, pinned to the primary after writes.
+class DatabaseRoutingMiddleware:
+    """Enable ``replica_reads()`` for GET/HEAD/OPTIONS requests.
+
+    A successful write sets the ``blog_primary`` cookie for
+    ``BLOG_DB_PIN_SECONDS``; while it is present the client reads from the
+    primary too, so it sees its own likes, comments and posts despite replica
+    lag. Clients that drop cookies (e.g. token API clients) are not pinned.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.may_use_replicas(request)):
+            response = self.get_response(request)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        with replica_reads(self.may_use_replicas(request)):
+            response = await self.get_response(request)
+        return self.pin(request, response)
+
+    def may_use_replicas(self, request):
+        return request.method in SAFE_METHODS and PRIMARY_PIN_COOKIE not in request.COOKIES
+
+    def pin(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PRIMARY_PIN_COOKIE,
+                "1",
+                max_age=getattr(settings, "BLOG_DB_PIN_SECONDS", 10),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import blogapp.models
+
+
+def create_fts_table(apps, schema_editor):
+    # The FTS5 index only exists on SQLite; other vendors use the icontains backend.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS blogapp_post_fts "
+        "USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO blogapp_post_fts (rowid, title, content) "
+        "SELECT id, title, content FROM blogapp_post"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS blogapp_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0003_post_likes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostSearchIndex",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        db_column="rowid",
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="search_index",
+                        serialize=False,
+                        to="blogapp.post",
+                    ),
+                ),
+                ("title", models.TextField()),
+                ("content", models.TextField()),
+                (
+                    "document",
+                    blogapp.models.FullTextField(db_column="blogapp_post_fts"),
+                ),
+                ("rank", models.FloatField()),
+            ],
+            options={
+                "db_table": "blogapp_post_fts",
+                "managed": False,
+            },
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
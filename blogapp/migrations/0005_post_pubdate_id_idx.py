@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0004_post_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["-publication_date", "-id"], name="post_pubdate_id_idx"
+            ),
+        ),
+    ]
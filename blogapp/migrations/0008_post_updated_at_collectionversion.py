@@ -0,0 +1,49 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:47
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    Post = apps.get_model("blogapp", "Post")
+    CollectionVersion = apps.get_model("blogapp", "CollectionVersion")
+    # Existing posts were last changed no later than now; start from publication.
+    Post.objects.update(updated_at=F("publication_date"))
+    for name in ("posts", "comments", "categories"):
+        CollectionVersion.objects.get_or_create(
+            name=name, defaults={"updated_at": timezone.now()}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0007_post_comment_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectionVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-18 08:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0008_post_updated_at_collectionversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_medium",
+            field=models.ImageField(
+                blank=True, null=True, upload_to="post_images/variants/"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_thumbnail",
+            field=models.ImageField(
+                blank=True, null=True, upload_to="post_images/variants/"
+            ),
+        ),
+    ]
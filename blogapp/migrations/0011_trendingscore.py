@@ -0,0 +1,95 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:27
+
+import datetime
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of the scoring in blogapp.trending as of this migration.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+CHUNK_SIZE = 1000
+
+
+def scores_for_existing_posts(apps, schema_editor):
+    # Score the posts published before scores were maintained, from their
+    # publication, likes and comments (ln of the sum of exp(event terms)).
+    Post = apps.get_model("blogapp", "Post")
+    PostLike = apps.get_model("blogapp", "PostLike")
+    Comment = apps.get_model("blogapp", "Comment")
+    TrendingScore = apps.get_model("blogapp", "TrendingScore")
+    tau = getattr(settings, "BLOG_TRENDING_HALF_LIFE_HOURS", 24) * 3600 / math.log(2)
+    weights = {"post": 1.0, "like": 1.0, "comment": 2.0}
+    weights.update(getattr(settings, "BLOG_TRENDING_WEIGHTS", {}))
+
+    def term(kind, when):
+        return math.log(weights[kind]) + (when - EPOCH).total_seconds() / tau
+
+    posts = Post.objects.order_by("pk").values_list("pk", "category_id", "publication_date")
+    chunk = []
+    for row in posts.iterator(CHUNK_SIZE):
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            _score_chunk(chunk, term, PostLike, Comment, TrendingScore)
+            chunk = []
+    if chunk:
+        _score_chunk(chunk, term, PostLike, Comment, TrendingScore)
+
+
+def _score_chunk(posts, term, PostLike, Comment, TrendingScore):
+    terms = {post_id: [term("post", published)] for post_id, _, published in posts}
+    for kind, model in (("like", PostLike), ("comment", Comment)):
+        events = model.objects.filter(post_id__in=terms).values_list("post_id", "created_at")
+        for post_id, when in events:
+            terms[post_id].append(term(kind, when))
+    scores = []
+    for post_id, category_id, _ in posts:
+        high = max(terms[post_id])
+        score = high + math.log(sum(math.exp(value - high) for value in terms[post_id]))
+        scores.append(TrendingScore(post_id=post_id, category_id=category_id, score=score))
+    TrendingScore.objects.bulk_create(scores, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0010_post_likes_through"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingScore",
+            fields=[
+                (
+                    "post",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending",
+                        serialize=False,
+                        to="blogapp.post",
+                    ),
+                ),
+                ("score", models.FloatField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="blogapp.category",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["-score"], name="trending_score_idx"),
+                    models.Index(
+                        fields=["category", "-score"],
+                        name="trending_category_score_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(scores_for_existing_posts, migrations.RunPython.noop),
+    ]
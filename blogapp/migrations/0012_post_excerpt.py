@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 09:32
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+# Frozen copies of blogapp.models.make_excerpt/count_words as of this migration.
+EXCERPT_WORDS = 40
+CHUNK_SIZE = 1000
+
+
+def excerpts_for_existing_posts(apps, schema_editor):
+    Post = apps.get_model("blogapp", "Post")
+    rows = Post.objects.order_by("pk").values_list("pk", "content")
+    batch = []
+    for pk, content in rows.iterator(CHUNK_SIZE):
+        excerpt = Truncator(content).words(EXCERPT_WORDS, truncate=" …")
+        batch.append(Post(pk=pk, excerpt=excerpt, word_count=len(content.split())))
+        if len(batch) >= CHUNK_SIZE:
+            Post.objects.bulk_update(batch, ["excerpt", "word_count"])
+            batch = []
+    if batch:
+        Post.objects.bulk_update(batch, ["excerpt", "word_count"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blogapp", "0011_trendingscore"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="excerpt",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(excerpts_for_existing_posts, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,64 @@
+import re
+
 from django.conf import settings
 from django.db import models
+from django.db.models import Lookup, Q
+from django.utils import timezone
+from django.utils.text import Truncator
 
 # Create your models here.
 
+# Words of a post kept in its stored excerpt (what the list cards show).
+EXCERPT_WORDS = 40
+
+
+# The list-card excerpt of a post body (same output as ``truncatewords:40``).
+def make_excerpt(content):
+    return Truncator(content).words(EXCERPT_WORDS, truncate=" …")
+
+
+def count_words(content):
+    return len(content.split())
+
+
+# Store excerpts of the posts in ``queryset`` in chunks; return how many were written.
+def backfill_excerpts(queryset, chunk_size=1000):
+    """Recompute ``excerpt``/``word_count`` for ``queryset`` (``backfill_excerpts`` command).
+
+    Reads only ``(pk, content)`` rows and writes them back with ``bulk_update``,
+    so memory is bounded by one chunk of post bodies.
+    """
+    model = queryset.model
+    total = 0
+    batch = []
+    for pk, content in queryset.order_by("pk").values_list("pk", "content").iterator(chunk_size):
+        batch.append(model(pk=pk, excerpt=make_excerpt(content), word_count=count_words(content)))
+        if len(batch) >= chunk_size:
+            total += model.objects.bulk_update(batch, ["excerpt", "word_count"])
+            batch = []
+    if batch:
+        total += model.objects.bulk_update(batch, ["excerpt", "word_count"])
+    return total
+
+
+# Default manager of soft-deletable models: rows with ``deleted_at`` set are gone.
+class LiveManager(models.Manager):
+    """Hide soft-deleted rows; ``all_objects`` still sees them (see blogapp.deletion)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 
 # Model representing a category for blog posts.
 class Category(models.Model):
     """Represents a post category for organizing blog posts."""
     # Name of the category (must be unique).
     name = models.CharField(max_length=100, unique=True)
+    # Set when the category was deleted; the purge removes it for good later.
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         # Add model metadata options here (ordering, verbose_name, etc.)
@@ -26,8 +76,14 @@ class Post(models.Model):
     title = models.CharField(max_length=200)
     # Content of the post.
     content = models.TextField()
+    # First EXCERPT_WORDS words of the content and its length, computed on save
+    # so list views never need to load the content column.
+    excerpt = models.TextField(blank=True, default="", editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
     # Date and time when the post was published.
     publication_date = models.DateTimeField(auto_now_add=True)
+    # Last change to the post or its comment/like activity (drives ETags).
+    updated_at = models.DateTimeField(auto_now=True)
     # Category to which the post belongs.
     category = models.ForeignKey(
         Category, related_name="posts", on_delete=models.CASCADE
@@ -38,19 +94,194 @@ class Post(models.Model):
     )
     # Optional image for the post.
     image = models.ImageField(upload_to="post_images/", blank=True, null=True)
+    # Processed variants of the image (WebP), written by blogapp.images.
+    image_thumbnail = models.ImageField(upload_to="post_images/variants/", blank=True, null=True)
+    image_medium = models.ImageField(upload_to="post_images/variants/", blank=True, null=True)
+    # Processing state of the image: "" (none/unprocessed), pending, ready or failed.
+    image_status = models.CharField(
+        max_length=10,
+        blank=True,
+        default="",
+        choices=[("pending", "Pending"), ("ready", "Ready"), ("failed", "Failed")],
+    )
     # Users who liked this post.
     likes = models.ManyToManyField(
-        settings.AUTH_USER_MODEL, related_name="liked_posts", blank=True
+        settings.AUTH_USER_MODEL, related_name="liked_posts", blank=True, through="PostLike"
     )
+    # Stored number of likes, kept in sync by the likes m2m_changed signal.
+    like_count = models.PositiveIntegerField(default=0)
+    # Stored number of comments, kept in sync by the Comment signals.
+    comment_count = models.PositiveIntegerField(default=0)
+    # Set when the post (or its category) was deleted; the purge removes it later.
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = LiveManager()
+    all_objects = models.Manager()
 
     class Meta:
         # Add model metadata options here (ordering, verbose_name, etc.)
-        pass
+        indexes = [
+            # Keyset pagination order for every post list. Not partial on purpose:
+            # deleted posts are few and short-lived, so "deleted_at IS NULL" is a
+            # cheap residual filter, and a partial index would be preferred over
+            # better ones (e.g. the trending score index).
+            models.Index(fields=["-publication_date", "-id"], name="post_pubdate_id_idx"),
+            # One author's posts, newest first (profile, timeline fan-out on read).
+            models.Index(
+                fields=["user", "-publication_date", "-id"], name="post_user_pubdate_id_idx"
+            ),
+            # The (few) deleted posts waiting for the purge.
+            models.Index(
+                fields=["deleted_at"],
+                condition=Q(deleted_at__isnull=False),
+                name="post_deleted_idx",
+            ),
+        ]
 
     def __str__(self):
         # Return the post title as its string representation.
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Keep excerpt/word_count in step with content whenever content is written.
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            if "content" not in self.get_deferred_fields():
+                self.refresh_excerpt()
+        elif "content" in update_fields:
+            self.refresh_excerpt()
+            kwargs["update_fields"] = {*update_fields, "excerpt", "word_count"}
+        super().save(*args, **kwargs)
+
+    def refresh_excerpt(self):
+        """Recompute ``excerpt`` and ``word_count`` from ``content`` (call before bulk_create)."""
+        self.excerpt = make_excerpt(self.content)
+        self.word_count = count_words(self.content)
+
+    @property
+    def image_srcset(self):
+        # "url 400w, url 1024w" built from the variant names (<hash>-<width>w.webp).
+        candidates = []
+        for variant in (self.image_thumbnail, self.image_medium):
+            match = re.search(r"-(\d+)w\.\w+$", variant.name or "")
+            if match:
+                candidates.append(f"{variant.url} {match.group(1)}w")
+        return ", ".join(candidates)
+
+
+# One user's like of a post (the Post.likes through table).
+class PostLike(models.Model):
+    """A like, with its time so trending scores can decay it."""
+    # The liked post.
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    # The user who liked it.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # When the like was given.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Same table and constraint as the former auto-created through table.
+        db_table = "blogapp_post_likes"
+        unique_together = [("post", "user")]
+
+    def __str__(self):
+        # Return who liked which post.
+        return f"{self.user_id} likes {self.post_id}"
+
+
+# Denormalized, incrementally maintained trending score of a post.
+class TrendingScore(models.Model):
+    """Log of the time-decayed engagement of a post (see blogapp.trending)."""
+    # The scored post.
+    post = models.OneToOneField(
+        Post, primary_key=True, related_name="trending", on_delete=models.CASCADE
+    )
+    # Copy of post.category, so per-category rankings are one index range.
+    category = models.ForeignKey(Category, related_name="+", on_delete=models.CASCADE)
+    # ln(sum of weight * exp((event time - epoch) / tau)) over the post's events.
+    score = models.FloatField(default=0)
+
+    class Meta:
+        indexes = [
+            # Top N overall and per category.
+            models.Index(fields=["-score"], name="trending_score_idx"),
+            models.Index(fields=["category", "-score"], name="trending_category_score_idx"),
+        ]
+
+    def __str__(self):
+        # Return the post id and its score.
+        return f"{self.post_id}: {self.score:.3f}"
+
+
+# One user following another.
+class Follow(models.Model):
+    """``follower`` sees ``followee``'s posts in their following feed."""
+    # The user who follows.
+    follower = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="following", on_delete=models.CASCADE
+    )
+    # The user being followed.
+    followee = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="followers", on_delete=models.CASCADE
+    )
+    # When the follow started.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = [("follower", "followee")]
+
+    def __str__(self):
+        # Return who follows whom.
+        return f"{self.follower_id} follows {self.followee_id}"
+
+
+# Per-author follower bookkeeping for the timeline fan-out.
+class AuthorStats(models.Model):
+    """Stored follower count of an author and how their posts reach followers."""
+    # The author.
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name="author_stats",
+        on_delete=models.CASCADE,
+    )
+    # Number of followers, kept in step by blogapp.timeline.
+    follower_count = models.PositiveIntegerField(default=0)
+    # Set once the author passes BLOG_TIMELINE_FANOUT_LIMIT followers: their posts
+    # are no longer copied into timelines but merged in when a feed is read.
+    fanout_on_read = models.BooleanField(default=False)
+
+    def __str__(self):
+        # Return the author id and follower count.
+        return f"{self.user_id}: {self.follower_count} followers"
+
+
+# One post in one user's materialized following feed (fan-out on write).
+class TimelineEntry(models.Model):
+    """Copy of the feed ordering key of ``post`` for ``user``'s timeline."""
+    # Whose timeline.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name="timeline", on_delete=models.CASCADE
+    )
+    # The post shown.
+    post = models.ForeignKey(Post, related_name="+", on_delete=models.CASCADE)
+    # Copies of post.user and post.publication_date (unfollow, keyset order).
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="+", on_delete=models.CASCADE)
+    publication_date = models.DateTimeField()
+
+    class Meta:
+        unique_together = [("user", "post")]
+        indexes = [
+            # Keyset pages of one timeline.
+            models.Index(
+                fields=["user", "-publication_date", "-post"], name="timeline_user_pubdate_idx"
+            ),
+        ]
+
+    def __str__(self):
+        # Return the timeline owner and post.
+        return f"{self.user_id}: post {self.post_id}"
+
 
 # Model representing a comment made by a user on a blog post.
 class Comment(models.Model):
@@ -66,8 +297,118 @@ class Comment(models.Model):
 
     class Meta:
         # Add model metadata options here (ordering, verbose_name, etc.)
-        pass
+        indexes = [
+            # Per-post thread order for latest-comment prefetches and paging.
+            models.Index(fields=["post", "created_at"], name="comment_post_created_idx"),
+        ]
 
     def __str__(self):
         # Return a string representation of the comment.
         return f"Comment by {self.author} on {self.post.title}"  # type: ignore
+
+
+# Model holding a version stamp per API collection (posts, comments, categories).
+class CollectionVersion(models.Model):
+    """Version counter bumped on every change to a collection; drives list ETags."""
+    # Collection name, e.g. "posts".
+    name = models.CharField(max_length=50, unique=True)
+    # Incremented on every change.
+    version = models.PositiveBigIntegerField(default=0)
+    # Date and time of the last change.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        # Return the collection name and version.
+        return f"{self.name} v{self.version}"
+
+
+# Model holding one queued background job (see blogapp.jobs).
+class Job(models.Model):
+    """A call of the registered task ``name`` with ``payload`` as keyword arguments."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DEAD = "dead"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DEAD, "Dead")]
+
+    # Registered task name (a key of blogapp.jobs.get_tasks()).
+    name = models.CharField(max_length=100)
+    # Keyword arguments of the task.
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher runs first among the jobs that are due.
+    priority = models.SmallIntegerField(default=0)
+    # "queued" until claimed, "running" while a worker has it, "dead" once out of
+    # attempts; finished jobs are deleted.
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Not run before this time (delayed jobs, retry backoff).
+    run_at = models.DateTimeField(default=timezone.now)
+    # Runs started so far, and the most allowed.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    # The worker claim holding the job, and when it was claimed.
+    claimed_by = models.CharField(max_length=64, blank=True, default="")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Traceback of the last failure.
+    last_error = models.TextField(blank=True, default="")
+    # Date and time the job was enqueued.
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Next due jobs: only queued rows are indexed, so the index stays small.
+            models.Index(
+                fields=["-priority", "run_at", "id"],
+                name="job_ready_idx",
+                condition=Q(status="queued"),
+            ),
+            # Running jobs: a worker's claim, and those past their timeout.
+            models.Index(
+                fields=["claimed_at"], name="job_running_idx", condition=Q(status="running")
+            ),
+        ]
+
+    def __str__(self):
+        # Return the task name, id and status.
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# Text column whose lookups compile to SQLite FTS5 syntax.
+class FullTextField(models.TextField):
+    """The hidden FTS5 column named after its table; supports ``__match``."""
+
+
+# Lookup rendering ``<table> MATCH <expression>`` for FTS5 virtual tables.
+@FullTextField.register_lookup
+class FullTextMatch(Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+# Unmanaged model over the blogapp_post_fts FTS5 virtual table (SQLite only).
+class PostSearchIndex(models.Model):
+    """Full-text index row for a post; the table is created by migration 0004."""
+    # The indexed post (FTS5 rowid == post id).
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        db_column="rowid",
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name="search_index",
+    )
+    # Indexed copy of the post title.
+    title = models.TextField()
+    # Indexed copy of the post content.
+    content = models.TextField()
+    # Hidden column used as the left-hand side of MATCH queries.
+    document = FullTextField(db_column="blogapp_post_fts")
+    # Hidden bm25 relevance column (lower is more relevant).
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "blogapp_post_fts"
@@ -0,0 +1,316 @@
+import asyncio
+import base64
+import json
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Keyset used by every post list: newest first, id breaks ties.
+POST_ORDERING = ("-publication_date", "-id")
+
+
+# Raised when a cursor token cannot be decoded.
+class InvalidCursor(ValueError):
+    pass
+
+
+# A single page produced by KeysetPaginator.
+class KeysetPage:
+    """Page of objects plus opaque cursors to its neighbours."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+# Keyset (seek) paginator: every page is a single indexed range query.
+class KeysetPaginator:
+    """Paginate ``queryset`` by ``ordering`` without COUNT(*) or OFFSET.
+
+    Cursors are opaque tokens encoding the ordering values of the last (or
+    first) row of a page, so page 1000 costs the same as page 1.
+    """
+
+    def __init__(self, queryset, per_page, ordering=POST_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def get_page(self, cursor=None):
+        """Return the page after (or before) ``cursor``; raise InvalidCursor if bad."""
+        position, backwards, queryset = self._page_queryset(cursor)
+        return self._make_page(list(queryset), position, backwards)
+
+    async def aget_page(self, cursor=None):
+        """Async ``get_page()`` using the async ORM."""
+        position, backwards, queryset = self._page_queryset(cursor)
+        return self._make_page([row async for row in queryset], position, backwards)
+
+    def _page_queryset(self, cursor):
+        position, backwards = self.decode_cursor(cursor) if cursor else (None, False)
+        ordering = self._reversed_ordering() if backwards else self.ordering
+        queryset = self.queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, ordering))
+        return position, backwards, queryset[: self.per_page + 1]
+
+    def _make_page(self, rows, position, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self.encode_cursor(rows[-1])
+        if rows and has_previous:
+            previous_cursor = self.encode_cursor(rows[0], backwards=True)
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+    def encode_cursor(self, obj, backwards=False):
+        values = []
+        for name in (field.lstrip("-") for field in self.ordering):
+            field = self._field(name)
+            row = obj
+            if isinstance(obj, dict):
+                # values() rows (see blogapp.rows) are keyed by field name.
+                row = SimpleNamespace(**{field.attname: obj[name]})
+            values.append(field.value_to_string(row))
+        payload = json.dumps({"v": values, "b": backwards}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            names = [field.lstrip("-") for field in self.ordering]
+            if len(payload["v"]) != len(names):
+                raise InvalidCursor(cursor)
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(names, payload["v"])
+            ]
+            return position, bool(payload.get("b"))
+        except (TypeError, KeyError, ValueError, ValidationError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+    def _field(self, name):
+        return self.queryset.model._meta.get_field(name)
+
+    def _reversed_ordering(self):
+        return tuple(
+            field[1:] if field.startswith("-") else f"-{field}" for field in self.ordering
+        )
+
+    def _after(self, position, ordering):
+        # Lexicographic "comes after" for (a, b, ...): a > x OR (a = x AND b > y) ...
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+# DRF pagination class: opt-in keyset pagination driven by ?cursor= / ?page_size=.
+class PostCursorPagination(BasePagination):
+    """Keyset pagination over ``POST_ORDERING`` with opaque next/previous links.
+
+    Requests without ``cursor`` or ``page_size`` stay unpaginated so existing
+    clients keep receiving a plain list. The keyset replaces the queryset's
+    ordering, so search results come newest first rather than by relevance.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    ordering = POST_ORDERING
+
+    def paginate_queryset(self, queryset, request, view=None):
+        paginator = self._get_paginator(queryset, request)
+        if paginator is None:
+            return None
+        try:
+            self.page = paginator.get_page(request.query_params.get(self.cursor_query_param) or None)
+        except InvalidCursor:
+            raise NotFound("Invalid cursor") from None
+        return list(self.page)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async ``paginate_queryset()`` for the async viewsets."""
+        paginator = self._get_paginator(queryset, request)
+        if paginator is None:
+            return None
+        try:
+            self.page = await paginator.aget_page(
+                request.query_params.get(self.cursor_query_param) or None
+            )
+        except InvalidCursor:
+            raise NotFound("Invalid cursor") from None
+        return list(self.page)
+
+    def _get_paginator(self, queryset, request):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        self.request = request
+        return KeysetPaginator(queryset, self.get_page_size(request), self.ordering)
+
+    def get_page_size(self, request):
+        return get_page_size(
+            request.query_params.get(self.page_size_query_param),
+            getattr(settings, "BLOG_API_PAGE_SIZE", 10),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self._link(self.page.next_cursor),
+                "previous": self._link(self.page.previous_cursor),
+                "results": data,
+            }
+        )
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+
+# Parse a requested page size, falling back to ``default`` and capping it.
+def get_page_size(value, default):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    if size < 1:
+        return default
+    return min(size, getattr(settings, "BLOG_API_MAX_PAGE_SIZE", 100))
+
+
+# Page-number paginator that avoids an exact COUNT(*) over the whole result.
+class EstimatedCountPaginator(Paginator):
+    """``Paginator`` whose ``count`` is an estimate or a capped count.
+
+    ``estimate`` (a number, or a callable returning one or None) is used as
+    the count when available, e.g. a cached per-category counter. Otherwise,
+    with ``cap``, at most ``cap + 1`` rows are counted (``SELECT COUNT(*) FROM
+    (... LIMIT cap + 1)``) and larger results count as ``cap``. With neither
+    it counts exactly, like ``Paginator``. ``exact`` says which one happened,
+    so templates can show "about N".
+    """
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        orphans=0,
+        allow_empty_first_page=True,
+        *,
+        estimate=None,
+        cap=None,
+    ):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.estimate = estimate
+        self.cap = cap
+        self._exact = True
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        if estimate is not None:
+            count, self._exact = estimate, False
+        elif self.cap is None:
+            count, self._exact = super().count, True
+        else:
+            count, self._exact = self._capped(self.object_list[: self.cap + 1].count())
+        return count
+
+    async def acount(self):
+        """Async ``count``: the estimate in a thread, counting on the async ORM."""
+        estimate = await sync_to_async(self._estimate)()
+        if estimate is not None:
+            count, self._exact = estimate, False
+        elif self.cap is None:
+            count, self._exact = await self.object_list.acount(), True
+        else:
+            count, self._exact = self._capped(await self.object_list[: self.cap + 1].acount())
+        self.count = count
+        return count
+
+    @property
+    def exact(self):
+        _ = self.count  # Counting is what decides it.
+        return self._exact
+
+    def page(self, number):
+        if self.exact:
+            return super().page(number)
+        # Never clip a page to an estimate: a stale one must not hide rows.
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom : bottom + self.per_page], number, self)
+
+    def _estimate(self):
+        return self.estimate() if callable(self.estimate) else self.estimate
+
+    def _capped(self, counted):
+        if counted > self.cap:
+            return self.cap, False
+        return counted, True
+
+
+# Async Paginator.get_page(): the COUNT and the page query run concurrently.
+async def aget_offset_page(paginator, number):
+    """Fetch page ``number`` of a Django ``Paginator`` with the async ORM.
+
+    The requested slice is fetched alongside the count; only an out-of-range
+    number (clamped to the last page, as ``get_page()`` does) costs a refetch.
+    """
+    try:
+        number = int(number)
+    except (TypeError, ValueError):
+        number = 1
+    queryset = paginator.object_list
+    bottom = max(number - 1, 0) * paginator.per_page
+    counting = paginator.acount() if hasattr(paginator, "acount") else queryset.acount()
+    paginator.count, rows = await asyncio.gather(
+        counting, alist(queryset[bottom : bottom + paginator.per_page])
+    )
+    page = paginator.get_page(number)
+    if page.number == number:
+        page.object_list = rows
+    else:
+        page.object_list = await alist(page.object_list)
+    return page
+
+
+# Evaluate a queryset with the async ORM.
+async def alist(queryset):
+    return [row async for row in queryset]
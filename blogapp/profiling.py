@@ -0,0 +1,267 @@
+# Sampled request profiles (cProfile or stack samples, SQL timings) aggregated per view.
+import cProfile
+import json
+import logging
+import marshal
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# "<bucket start>-<pid>.<ext>": one file per view, time bucket, process and kind.
+FILE_RE = re.compile(r"^(?P<bucket>\d{8}T\d{6})-(?P<pid>\d+)\.(?P<ext>prof|folded|json)$")
+BUCKET_FORMAT = "%Y%m%dT%H%M%S"
+# "IN (%s, %s, %s)" lists of any length are the same query.
+PLACEHOLDER_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+# One profiled request at a time per process: cProfile cannot nest, and a
+# sampled request must not slow down the profiles of the others.
+_active = threading.Lock()
+_aggregates = {}
+_executor = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def profile_dir():
+    return Path(_setting("BLOG_PROFILE_DIR", Path(settings.BASE_DIR) / "profiles"))
+
+
+def get_executor():
+    """Writes the profiles off the request path (created on first use)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiles")
+    return _executor
+
+
+# "module.qualname" of every frame from the outermost to ``frame``, ";"-joined.
+def collapse_stack(frame):
+    names = []
+    while frame is not None:
+        names.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+# Thread recording the stack of another thread every ``interval`` seconds.
+class StackSampler(threading.Thread):
+    def __init__(self, thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+# connection.execute_wrapper hook: count and time queries by their SQL text.
+class QueryTimings:
+    def __init__(self):
+        self.queries = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            key = PLACEHOLDER_LIST_RE.sub("(%s, ...)", sql)
+            count, total, slowest = self.queries.get(key, (0, 0.0, 0.0))
+            self.queries[key] = (count + 1, total + elapsed, max(slowest, elapsed))
+
+
+# Start profiling the current request of ``view``, unless another one is.
+def start_sample(view):
+    """Return a started Sample, or None; call ``stop()`` on it when the response is ready."""
+    if not _active.acquire(blocking=False):
+        return None
+    try:
+        return Sample(view).start()
+    except Exception:
+        _active.release()
+        raise
+
+
+# Profile of one request: cProfile stats or stack samples, plus SQL timings.
+class Sample:
+    def __init__(self, view):
+        self.view = view
+        self.mode = _setting("BLOG_PROFILE_MODE", "cprofile")
+        self.timings = QueryTimings()
+        self.profiler = None
+        self.sampler = None
+        self._wrappers = ExitStack()
+
+    def start(self):
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self.timings))
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        if self.mode == "stack":
+            self.sampler = StackSampler(
+                threading.get_ident(), _setting("BLOG_PROFILE_STACK_INTERVAL", 0.005)
+            )
+            self.sampler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        return self
+
+    def stop(self):
+        try:
+            if self.profiler is not None:
+                self.profiler.disable()
+            if self.sampler is not None:
+                self.sampler.stop()
+            self.elapsed = (time.perf_counter() - self._start) * 1000
+            self._wrappers.close()
+        finally:
+            _active.release()
+        get_executor().submit(_record, self)
+
+
+# Per-view totals: request count and time, merged profile, stacks and queries.
+class Aggregate:
+    def __init__(self):
+        self.samples = 0
+        self.total_ms = 0.0
+        self.stats = None
+        self.stacks = Counter()
+        self.queries = {}
+
+    def add_sample(self, sample):
+        self.samples += 1
+        self.total_ms += sample.elapsed
+        if sample.profiler is not None:
+            self.add_stats(pstats.Stats(sample.profiler))
+        if sample.sampler is not None:
+            self.stacks.update(sample.sampler.stacks)
+        self.add_queries(sample.timings.queries)
+
+    def add_stats(self, stats):
+        if self.stats is None:
+            self.stats = stats
+        else:
+            self.stats.add(stats)
+
+    def add_queries(self, queries):
+        for sql, (count, total, slowest) in queries.items():
+            old = self.queries.get(sql, (0, 0.0, 0.0))
+            self.queries[sql] = (old[0] + count, old[1] + total, max(old[2], slowest))
+
+    def merge(self, path):
+        """Add one file written by ``write()``."""
+        if path.suffix == ".prof":
+            self.add_stats(pstats.Stats(str(path)))
+        elif path.suffix == ".folded":
+            for line in path.read_text().splitlines():
+                stack, _, count = line.rpartition(" ")
+                self.stacks[stack] += int(count)
+        else:
+            data = json.loads(path.read_text())
+            self.samples += data["samples"]
+            self.total_ms += data["total_ms"]
+            self.add_queries({sql: tuple(row) for sql, row in data["queries"].items()})
+
+    def write(self, prefix):
+        """Write ``<prefix>.json`` and ``.prof`` (pstats, snakeviz) or ``.folded``
+        (collapsed stacks for flamegraph.pl or speedscope)."""
+        data = {"samples": self.samples, "total_ms": self.total_ms, "queries": self.queries}
+        _write_atomic(prefix.with_suffix(".json"), json.dumps(data).encode())
+        if self.stats is not None:
+            _write_atomic(prefix.with_suffix(".prof"), marshal.dumps(self.stats.stats))
+        if self.stacks:
+            lines = "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+            _write_atomic(prefix.with_suffix(".folded"), lines.encode())
+
+
+def _write_atomic(path, data):
+    # Readers (profile_report) never see a half-written file.
+    temporary = path.with_name(f".{path.name}.tmp")
+    temporary.write_bytes(data)
+    os.replace(temporary, path)
+
+
+def view_dir(view):
+    return profile_dir() / re.sub(r"[^\w.-]", "_", view)
+
+
+def _record(sample):
+    # Add the sample to this process's aggregate for its view and time bucket,
+    # then rewrite that aggregate's files.
+    try:
+        seconds = _setting("BLOG_PROFILE_BUCKET_SECONDS", 10 * 60)
+        bucket = time.strftime(
+            BUCKET_FORMAT, time.localtime(sample.started_at // seconds * seconds)
+        )
+        aggregate = _aggregates.get((sample.view, bucket))
+        if aggregate is None:
+            # Earlier buckets of the view are on disk already.
+            for key in [key for key in _aggregates if key[0] == sample.view]:
+                del _aggregates[key]
+            aggregate = _aggregates[sample.view, bucket] = Aggregate()
+        aggregate.add_sample(sample)
+        directory = view_dir(sample.view)
+        directory.mkdir(parents=True, exist_ok=True)
+        aggregate.write(directory / f"{bucket}-{os.getpid()}")
+    except Exception:
+        logger.exception("Writing the profile of a %s request failed", sample.view)
+
+
+# Merge the files of every view (or of ``views``) from buckets starting at or after ``since``.
+def load_aggregates(since, views=None):
+    """Return ``{view: Aggregate}`` for the profiles under BLOG_PROFILE_DIR.
+
+    ``since`` is a Unix time; a bucket counts if it ends after it.
+    """
+    seconds = _setting("BLOG_PROFILE_BUCKET_SECONDS", 10 * 60)
+    first = time.strftime(BUCKET_FORMAT, time.localtime(since // seconds * seconds))
+    aggregates = {}
+    root = profile_dir()
+    if not root.is_dir():
+        return aggregates
+    for directory in sorted(root.iterdir()):
+        if not directory.is_dir() or (views and directory.name not in views):
+            continue
+        aggregate = Aggregate()
+        for path in sorted(directory.iterdir()):
+            match = FILE_RE.match(path.name)
+            if match and match["bucket"] >= first:
+                aggregate.merge(path)
+        if aggregate.samples:
+            aggregates[directory.name] = aggregate
+    return aggregates
+
+
+# Wait for the pending profile writes (tests).
+def flush():
+    get_executor().submit(int).result()
+
+
+# Forget the in-memory aggregates (tests).
+def reset():
+    flush()
+    _aggregates.clear()
@@ -0,0 +1,198 @@
+# Two-level cache for reference data (categories, per-category post counts).
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Category, Post
+
+
+def get_shared_cache():
+    return caches[getattr(settings, "BLOG_REFCACHE_ALIAS", "default")]
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Small thread-safe LRU map; one per process, in front of the shared cache.
+class LocalLRU:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard_prefix(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalLRU(_setting("BLOG_REFCACHE_LOCAL_SIZE", 128))
+
+
+# A named, versioned value computed by ``loader`` and cached on both levels.
+class ReferenceCache:
+    """Cache ``loader(*args)`` in the shared cache and a per-process LRU.
+
+    Shared entries live under ``refcache:<name>:<version>:<args>``; the version
+    is a random token in the shared cache that ``invalidate()`` replaces after
+    commit, so every process stops using old entries at once. A local entry
+    is trusted for ``BLOG_REFCACHE_LOCAL_TTL`` seconds, then its version is
+    checked against the shared one again (one cache read, no query).
+
+    Shared entries carry a soft deadline (``BLOG_REFCACHE_TIMEOUT``). After it
+    one caller takes a short lock (``cache.add``) and reloads while the others
+    keep serving the old value; on a cold miss the others wait for the loader
+    instead of all querying the database at once.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.version_key = f"refcache:{name}:version"
+        self.reload_lock = threading.Lock()
+
+    def get(self, *args):
+        local_key = f"{self.name}:{args!r}"
+        ttl = _setting("BLOG_REFCACHE_LOCAL_TTL", 5)
+        entry = local_cache.get(local_key)
+        if entry and time.time() - entry["checked"] < ttl:
+            return entry["value"]
+        with self.reload_lock:
+            # One thread per process checks the shared cache (and maybe loads).
+            now = time.time()
+            entry = local_cache.get(local_key)
+            if entry and now - entry["checked"] < ttl:
+                return entry["value"]
+            shared = get_shared_cache()
+            version = self._version(shared)
+            if entry and entry["version"] == version and entry["deadline"] > now:
+                entry = {**entry, "checked": now}
+            else:
+                deadline, value = self._shared_get(shared, version, args)
+                entry = {"version": version, "value": value, "deadline": deadline, "checked": now}
+            local_cache.set(local_key, entry)
+        return entry["value"]
+
+    def invalidate(self):
+        """Switch to a new version once the current transaction commits."""
+        transaction.on_commit(self._invalidate_now)
+
+    def _invalidate_now(self):
+        get_shared_cache().set(self.version_key, uuid.uuid4().hex[:12], None)
+        local_cache.discard_prefix(f"{self.name}:")
+
+    def _version(self, shared):
+        version = shared.get(self.version_key)
+        if version is None:
+            shared.add(self.version_key, uuid.uuid4().hex[:12], None)
+            version = shared.get(self.version_key)
+        return version
+
+    def _shared_get(self, shared, version, args):
+        key = f"refcache:{self.name}:{version}:{args!r}"
+        lock_key = f"{key}:lock"
+        timeout = _setting("BLOG_REFCACHE_TIMEOUT", 60 * 60)
+        lock_timeout = _setting("BLOG_REFCACHE_LOCK_TIMEOUT", 10)
+        cached = shared.get(key)
+        if cached is not None and cached[0] > time.time():
+            return cached
+        if not shared.add(lock_key, 1, lock_timeout):
+            if cached is not None:
+                # Someone else is reloading: serve the expired value meanwhile.
+                return cached
+            cached = self._wait_for(shared, key, lock_timeout)
+            if cached is not None:
+                return cached
+        try:
+            cached = (time.time() + timeout, self.loader(*args))
+            # Kept past the soft deadline so there is a stale value to serve.
+            shared.set(key, cached, timeout * 2)
+        finally:
+            shared.delete(lock_key)
+        return cached
+
+    def _wait_for(self, shared, key, lock_timeout):
+        give_up = time.monotonic() + lock_timeout
+        while time.monotonic() < give_up:
+            time.sleep(0.05)
+            cached = shared.get(key)
+            if cached is not None:
+                return cached
+        return None
+
+
+def _load_categories():
+    return list(Category.objects.order_by("pk"))
+
+
+def _load_category_post_counts():
+    rows = Post.objects.order_by().values_list("category_id").annotate(count=Count("pk"))
+    return dict(rows)
+
+
+CATEGORY_CACHE = ReferenceCache("categories", _load_categories)
+CATEGORY_COUNT_CACHE = ReferenceCache("category-post-counts", _load_category_post_counts)
+
+
+# All categories, from the cache (shared instances: don't modify them).
+def cached_categories():
+    return CATEGORY_CACHE.get()
+
+
+# ``{category_id: Category}`` from the cache.
+def cached_category_map():
+    return {category.pk: category for category in CATEGORY_CACHE.get()}
+
+
+# ``{category_id: number of posts}`` from the cache.
+def category_post_counts():
+    return CATEGORY_COUNT_CACHE.get()
+
+
+# Posts in total (or in one category) from the cached counters; None if unknown.
+def estimated_post_count(category_id=None):
+    counts = category_post_counts()
+    if not category_id:
+        return sum(counts.values())
+    try:
+        return counts.get(int(category_id), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+# Categories for the filter dropdown, each with a ``post_count`` attribute.
+def categories_with_counts():
+    counts = category_post_counts()
+    categories = []
+    for category in cached_categories():
+        # Copies: the cached instances are shared between threads.
+        category = copy.copy(category)
+        category.post_count = counts.get(category.pk, 0)
+        categories.append(category)
+    return categories
@@ -0,0 +1,54 @@
+# Primary/replica database routing with read-your-writes pinning.
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+# True while the current request may read from replicas (see DatabaseRoutingMiddleware).
+_replica_reads = contextvars.ContextVar("blog_replica_reads", default=False)
+
+
+def replica_aliases():
+    return getattr(settings, "BLOG_READ_REPLICAS", [])
+
+
+# Let reads in this block (and in threads/tasks it starts) go to replicas.
+@contextmanager
+def replica_reads(enabled=True):
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+# Database router: writes to the primary, reads to a random replica when allowed.
+class PrimaryReplicaRouter:
+    """Route reads to ``BLOG_READ_REPLICAS`` inside ``replica_reads()`` only.
+
+    Everything else (writes, management commands, reads inside a transaction
+    on the primary, requests pinned after a write) uses ``default``, so code
+    that reads what it just wrote keeps seeing it.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if replicas and _replica_reads.get() and not connections["default"].in_atomic_block:
+            return random.choice(replicas)
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas are copies of the primary: objects from any of them may relate.
+        pool = {"default", *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary (copy or replication).
+        return db == "default"
@@ -0,0 +1,193 @@
+# Read-only fast path: serialize list pages straight from values() rows.
+import asyncio
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Field types whose database values already are their JSON representation.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+# Serializer-compatible renderer of values() rows (no model instances).
+class RowSerializer:
+    """Produce the data of ``serializer`` (as a ``many=True`` list) from values() rows.
+
+    The plan is derived from the serializer's readable fields (after ?fields= /
+    ?expand= are applied), so keys, order and value formatting match. Forward
+    relations become joined columns of the single rows query; reverse
+    (to-many) fields cost one extra query each, like a prefetch. Fields that
+    can't be read from a column (e.g. ``StringRelatedField``) must be mapped to
+    a lookup in ``Meta.row_lookups``.
+    """
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.lookups = []
+        self.related = {}
+        self.plan = self._plan(serializer, serializer.Meta.model, "")
+
+    def rows(self, queryset, ordering=()):
+        """Return ``queryset`` as dict rows of the planned columns.
+
+        ``ordering`` adds the columns a keyset paginator needs for its cursors.
+        """
+        extra = [name.lstrip("-") for name in ordering]
+        lookups = self.lookups + [name for name in extra if name not in self.lookups]
+        return queryset.prefetch_related(None).values(*lookups)
+
+    def serialize(self, rows):
+        """Return JSON-ready dicts for ``rows`` (as returned by ``rows()``)."""
+        rows = list(rows)
+        related = {}
+        if rows and self.related:
+            pks = [row["pk"] for row in rows]
+            related = {name: fetch(pks) for name, fetch in self.related.items()}
+        return self._render(rows, related)
+
+    async def aserialize(self, rows):
+        """Async ``serialize()``: rows come from the async ORM, to-many fields concurrently."""
+        if hasattr(rows, "__aiter__"):
+            rows = [row async for row in rows]
+        rows = list(rows)
+        related = {}
+        if rows and self.related:
+            pks = [row["pk"] for row in rows]
+            results = await asyncio.gather(
+                *(sync_to_async(fetch)(pks) for fetch in self.related.values())
+            )
+            related = dict(zip(self.related, results))
+        return self._render(rows, related)
+
+    def _render(self, rows, related):
+        plan = self.plan
+        if related:
+            plan = [
+                (name, _grouped(related[name]) if name in related else get)
+                for name, get in plan
+            ]
+        return [{name: get(row) for name, get in plan} for row in rows]
+
+    def _plan(self, serializer, model, prefix):
+        overrides = getattr(serializer.Meta, "row_lookups", {})
+        plan = []
+        for field in serializer._readable_fields:
+            name = field.field_name
+            if name in overrides:
+                get = self._column(prefix + overrides[name], None)
+            elif isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+                if prefix:
+                    raise ImproperlyConfigured(f"Nested to-many field {name!r} is not supported.")
+                self._add_column("pk")
+                self.related[name] = self._related(field, model)
+                get = None
+            elif isinstance(field, serializers.BaseSerializer):
+                related_model = model._meta.get_field(field.source).related_model
+                get = self._nested(field, related_model, prefix + field.source)
+            elif isinstance(field, serializers.FileField):
+                storage = model._meta.get_field(field.source).storage
+                get = self._column(prefix + field.source, self._file_url(storage))
+            elif isinstance(field, PASSTHROUGH_FIELDS):
+                get = self._column(prefix + field.source, None)
+            elif field.source == "*" or isinstance(
+                field, (serializers.RelatedField, serializers.SerializerMethodField)
+            ):
+                raise ImproperlyConfigured(
+                    f"{type(serializer).__name__}.{name} needs an entry in Meta.row_lookups."
+                )
+            else:
+                get = self._column(prefix + field.source, field.to_representation)
+            plan.append((name, get))
+        return plan
+
+    def _add_column(self, lookup):
+        if lookup not in self.lookups:
+            self.lookups.append(lookup)
+
+    def _column(self, lookup, convert):
+        self._add_column(lookup)
+        if convert is None:
+            return itemgetter(lookup)
+
+        def get(row):
+            value = row[lookup]
+            return None if value is None else convert(value)
+
+        return get
+
+    def _nested(self, serializer, model, path):
+        # The foreign key column tells a missing relation (None) from a present one.
+        self._add_column(path)
+        plan = self._plan(serializer, model, path + "__")
+
+        def get(row):
+            if row[path] is None:
+                return None
+            return {name: child(row) for name, child in plan}
+
+        return get
+
+    def _file_url(self, storage):
+        # Mirrors rest_framework.fields.FileField.to_representation for a stored name.
+        if not api_settings.UPLOADED_FILES_USE_URL:
+            return lambda name: name or None
+        request = self.serializer.context.get("request")
+
+        def convert(name):
+            if not name:
+                return None
+            url = storage.url(name)
+            return request.build_absolute_uri(url) if request is not None else url
+
+        return convert
+
+    def _related(self, field, model):
+        relation = model._meta.get_field(field.source)
+        if not relation.one_to_many:
+            raise ImproperlyConfigured(f"Only reverse foreign keys are supported ({field.source!r}).")
+        # Same base queryset and filter as prefetch_related, hence the same row order.
+        manager = relation.related_model._default_manager
+        parent = relation.field.name
+
+        def fetch(pks):
+            queryset = manager.filter(**{f"{parent}__in": pks})
+            if isinstance(field, serializers.ManyRelatedField):
+                return list(queryset.values_list(parent, "pk"))
+            child = RowSerializer(field.child)
+            child._add_column(parent)
+            rows = list(child.rows(queryset))
+            return list(zip((row[parent] for row in rows), child.serialize(rows)))
+
+        return fetch
+
+
+# {parent pk: [items]} getter for a to-many field.
+def _grouped(pairs):
+    groups = {}
+    for parent, item in pairs:
+        groups.setdefault(parent, []).append(item)
+    return lambda row: groups.get(row["pk"], [])
+
+
+# Viewset mixin serving the list action from values() rows.
+class RowListMixin:
+    """Same response as ``ListModelMixin.list`` without building model instances."""
+
+    def list(self, request, *args, **kwargs):
+        rows = RowSerializer(self.get_serializer())
+        queryset = rows.rows(
+            self.filter_queryset(self.get_queryset()), getattr(self.paginator, "ordering", ())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.serialize(page))
+        return Response(rows.serialize(queryset))
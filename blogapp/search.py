@@ -0,0 +1,151 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Post, PostSearchIndex
+
+# Matches a quoted phrase or a single bare term in the user's query.
+TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+# Turn user input into an FTS5 MATCH expression.
+def parse_query(text):
+    """Build an FTS5 query: quoted phrases stay phrases, ``term*`` is a prefix."""
+    parts = []
+    for phrase, term in TOKEN_RE.findall(text or ""):
+        if phrase:
+            words = phrase.split()
+            if words:
+                parts.append(_quote(" ".join(words)))
+            continue
+        prefix = term.endswith("*")
+        term = term.rstrip("*").strip('"')
+        if not term:
+            continue
+        parts.append(_quote(term) + ("*" if prefix else ""))
+    return " ".join(parts)
+
+
+def _quote(value):
+    # FTS5 strings escape a double quote by doubling it.
+    return '"%s"' % value.replace('"', '""')
+
+
+# Interface every search backend implements.
+class BaseSearchBackend:
+    """Keeps a search index in sync with posts and runs queries against it."""
+
+    def search(self, queryset, query):
+        # Return ``queryset`` narrowed to matches, most relevant first.
+        raise NotImplementedError
+
+    def update(self, post):
+        # Add or refresh a single post in the index.
+        pass
+
+    def update_many(self, posts):
+        # Add or refresh several posts (bulk writes skip the post_save signal).
+        for post in posts:
+            self.update(post)
+
+    def remove(self, post_id):
+        # Drop a single post from the index.
+        pass
+
+    def remove_many(self, post_ids):
+        # Drop several posts (the purge of deleted posts skips post_delete).
+        for post_id in post_ids:
+            self.remove(post_id)
+
+    def rebuild(self):
+        # Recreate the whole index from the posts table; returns rows indexed.
+        return 0
+
+
+# Fallback backend: no index, plain icontains filtering.
+class DatabaseSearchBackend(BaseSearchBackend):
+    """Filters with ``icontains`` on title and content (full table scan)."""
+
+    def search(self, queryset, query):
+        return queryset.filter(Q(title__icontains=query) | Q(content__icontains=query))
+
+
+# SQLite FTS5 backend backed by the blogapp_post_fts virtual table.
+class SQLiteFTSBackend(BaseSearchBackend):
+    """Inverted index on title and content, ranked with bm25."""
+
+    table = PostSearchIndex._meta.db_table
+
+    def search(self, queryset, query):
+        expression = parse_query(query)
+        if not expression:
+            return queryset
+        return queryset.filter(search_index__document__match=expression).order_by(
+            "search_index__rank", "-publication_date", "-id"
+        )
+
+    def update(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)",
+                [post.pk, post.title, post.content],
+            )
+
+    def update_many(self, posts):
+        rows = [(post.pk, post.title, post.content) for post in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [row[:1] for row in rows]
+            )
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+
+    def remove_many(self, post_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"DELETE FROM {self.table} WHERE rowid = %s", [[post_id] for post_id in post_ids]
+            )
+
+    def rebuild(self):
+        post_table = Post._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, content) "
+                f"SELECT id, title, content FROM {post_table} WHERE deleted_at IS NULL"
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {self.table}")
+            return cursor.fetchone()[0]
+
+
+_backend = None
+
+
+# Return the configured search backend (cached per process).
+def get_search_backend():
+    """Load ``BLOG_SEARCH_BACKEND`` or pick a default for the database vendor."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "BLOG_SEARCH_BACKEND", None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == "sqlite":
+            _backend = SQLiteFTSBackend()
+        else:
+            _backend = DatabaseSearchBackend()
+    return _backend
+
+
+# Filter a post queryset by a search string using the active backend.
+def search_posts(queryset, query):
+    return get_search_backend().search(queryset, query)
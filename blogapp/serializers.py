@@ -1,7 +1,91 @@
+import copy
+
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
 from .models import Category, Comment, Post
+from .refcache import cached_category_map
+
+
+# Split a comma-separated query parameter into a set of names.
+def _param_set(request, name):
+    if request is None:
+        return set()
+    value = request.query_params.get(name, "")
+    return {part.strip() for part in value.split(",") if part.strip()}
+
+
+# Mixin adding ?fields= (sparse fieldsets) and ?expand= (optional nested data).
+class SparseFieldsMixin:
+    """Limit output to ``?fields=a,b`` and add ``Meta.expandable_fields`` on ``?expand=``.
+
+    ``Meta.select_related_fields`` / ``Meta.prefetch_related_fields`` map output
+    fields to the relations they need and ``Meta.defer_unless_requested`` lists
+    heavy columns, so ``optimize_queryset`` loads exactly what the requested
+    representation uses.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        for name in self.expanded_fields(request):
+            serializer_class, options = self.Meta.expandable_fields[name]
+            self.fields[name] = serializer_class(**options)
+        requested = _param_set(request, "fields")
+        if requested:
+            for name in list(self.fields):
+                if name not in requested and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
+    @classmethod
+    def expanded_fields(cls, request):
+        expandable = getattr(cls.Meta, "expandable_fields", {})
+        return [name for name in expandable if name in _param_set(request, "expand")]
+
+    @classmethod
+    def output_fields(cls, request):
+        names = set(cls.Meta.fields) | set(cls.expanded_fields(request))
+        requested = _param_set(request, "fields")
+        return names & requested if requested else names
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """Add only the joins and prefetches the requested fields need."""
+        names = cls.output_fields(request)
+        select = getattr(cls.Meta, "select_related_fields", {})
+        prefetch = getattr(cls.Meta, "prefetch_related_fields", {})
+        joins = [select[name] for name in names if name in select]
+        lookups = [prefetch[name] for name in names if name in prefetch]
+        if joins:
+            queryset = queryset.select_related(*joins)
+        if lookups:
+            queryset = queryset.prefetch_related(*lookups)
+        heavy = [
+            name
+            for name in getattr(cls.Meta, "defer_unless_requested", ())
+            if name not in names
+        ]
+        if heavy:
+            queryset = queryset.defer(*heavy)
+        return queryset
+
+
+# Primary key field for categories that resolves ids from the reference cache.
+class CachedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Look the id up in the cached categories; only unknown ids hit the database."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            category = cached_category_map().get(int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if category is not None:
+            # A copy: the cached instance is shared between requests.
+            return copy.copy(category)
+        # Possibly created after the cache was filled (or in another process).
+        return super().to_internal_value(data)
 
 
 # Serializer for Category model objects.
@@ -21,18 +105,20 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 # Serializer for Post model objects, including related comments and category.
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Post model objects, including related comments and category."""
     # Nested serializer for comments (read-only).
     comments = CommentSerializer(many=True, read_only=True)
     # Nested serializer for category (read-only).
     category = CategorySerializer(read_only=True)
     # Field for writing the category by primary key.
-    category_id = serializers.PrimaryKeyRelatedField(
+    category_id = CachedCategoryField(
         queryset=Category.objects.all(), source="category", write_only=True  # type: ignore
     )
     # String representation of the user (read-only).
     user = serializers.StringRelatedField(read_only=True)
+    # Optional image upload; variants are produced asynchronously.
+    image = serializers.ImageField(required=False, allow_null=True)
 
     class Meta:
         model = Post
@@ -45,7 +131,76 @@ class PostSerializer(serializers.ModelSerializer):
             "category_id",
             "comments",
             "user",
+            "image",
+            "image_thumbnail",
+            "image_medium",
+            "image_status",
         ]
+        read_only_fields = ["image_thumbnail", "image_medium", "image_status"]
+        select_related_fields = {"category": "category", "user": "user"}
+        prefetch_related_fields = {"comments": "comments"}
+        defer_unless_requested = ["content"]
+
+
+# Compact list representation of posts: counts instead of nested comments.
+class PostListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Compact post representation for list endpoints (``?expand=comments`` nests them)."""
+    # Nested serializer for category (read-only).
+    category = CategorySerializer(read_only=True)
+    # String representation of the user (read-only).
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = [
+            "id",
+            "title",
+            "excerpt",
+            "word_count",
+            "publication_date",
+            "category",
+            "user",
+            "like_count",
+            "comment_count",
+            "image_thumbnail",
+            "image_status",
+        ]
+        read_only_fields = fields
+        # values() lookups for fields not backed by a column (see blogapp.rows).
+        row_lookups = {"user": "user__username"}
+        expandable_fields = {
+            "comments": (CommentSerializer, {"many": True, "read_only": True}),
+        }
+        select_related_fields = {"category": "category", "user": "user"}
+        prefetch_related_fields = {"comments": "comments"}
+        defer_unless_requested = ["content"]
+
+
+# One item of a comment batch; ``post`` is checked for all items at once.
+class CommentBatchItemSerializer(serializers.ModelSerializer):
+    """Comment creation payload without a per-item post lookup."""
+    post = serializers.IntegerField()
+
+    class Meta:
+        model = Comment
+        fields = ["post", "author", "content"]
+
+
+# One item of a post batch; ``category_id`` is checked for all items at once.
+class PostBatchItemSerializer(serializers.ModelSerializer):
+    """Post creation payload (no image) without a per-item category lookup."""
+    category_id = serializers.IntegerField()
+
+    class Meta:
+        model = Post
+        fields = ["title", "content", "category_id"]
+
+
+# One like/unlike operation of a like batch.
+class LikeOperationSerializer(serializers.Serializer):
+    """``{"post": <id>, "action": "like" | "unlike"}``."""
+    post = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=["like", "unlike"])
 
 
 # Serializer for user registration.
@@ -68,6 +223,9 @@ class RegisterSerializer(serializers.ModelSerializer):
         return user
 
 class BlogSerializer(serializers.ModelSerializer):
+    # Primary keys of the post's comments (read-only; prefetch "comments").
+    comments = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
     class Meta:
         model = Post
         fields = ["id", "title", "content", "publication_date", "category", "comments", "user"]
\ No newline at end of file
@@ -0,0 +1,110 @@
+# Signal handlers keeping derived data (search index, counters, cached
+# fragments) in sync with the models.
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .conditional import CATEGORIES, COMMENTS, POSTS, bump_collections
+from .comments import increment_comment_count, refresh_comment_counts, touch_post
+from .fragments import bump_category_version, bump_post_version
+from .likes import refresh_like_counts
+from .models import Category, Comment, Post, PostLike, TrendingScore
+from .refcache import CATEGORY_CACHE, CATEGORY_COUNT_CACHE
+from .search import get_search_backend
+from .timeline import fan_out
+from . import typeahead
+from .trending import forget_comments, forget_likes, record_comments, record_likes, track_posts
+
+
+# Index a post and invalidate its fragments whenever it is created or edited.
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    get_search_backend().update(instance)
+    if created:
+        track_posts([instance])
+        fan_out([instance])
+    else:
+        # Keep the score's category copy in step (a no-op unless it moved).
+        TrendingScore.objects.filter(post_id=instance.pk).exclude(
+            category_id=instance.category_id
+        ).update(category_id=instance.category_id)
+    if update_fields is None or {"title", "category", "deleted_at"} & set(update_fields):
+        typeahead.index_posts([instance])
+    bump_post_version(instance.pk)
+    bump_collections(POSTS)
+    CATEGORY_COUNT_CACHE.invalidate()
+
+
+# Remove a deleted post from the search index and the fragment cache.
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search_backend().remove(instance.pk)
+    typeahead.remove_posts([instance.pk])
+    bump_post_version(instance.pk)
+    bump_collections(POSTS)
+    CATEGORY_COUNT_CACHE.invalidate()
+
+
+# Keep Post.like_count and the trending scores in step with the likes through table.
+@receiver(m2m_changed, sender=PostLike)
+def update_like_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("pre_remove", "pre_clear"):
+        # Remember the likes about to go: their posts, and their times for trending.
+        likes = PostLike.objects.filter(**{"user_id" if reverse else "post_id": instance.pk})
+        if action == "pre_remove":
+            likes = likes.filter(**{"post_id__in" if reverse else "user_id__in": pk_set})
+        instance._removed_likes = list(likes.values_list("post_id", "created_at"))
+        return
+    if action == "post_add":
+        post_ids = list(pk_set) if reverse else [instance.pk] * len(pk_set)
+        record_likes(post_ids)
+    elif action in ("post_remove", "post_clear"):
+        removed = getattr(instance, "_removed_likes", [])
+        post_ids = [post_id for post_id, _ in removed]
+        forget_likes(removed)
+    else:
+        return
+    refresh_like_counts(set(post_ids))
+    bump_collections(POSTS)
+
+
+# Count a new comment on its post; the post's comment fragment and ETag change.
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        increment_comment_count(instance.post_id)
+        record_comments([(instance.post_id, instance.created_at)])
+    else:
+        touch_post(instance.post_id)
+    bump_post_version(instance.post_id)
+    bump_collections(POSTS, COMMENTS)
+
+
+# Recount the post's comments after one is deleted.
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    refresh_comment_counts([instance.post_id])
+    forget_comments([(instance.post_id, instance.created_at)])
+    bump_post_version(instance.post_id)
+    bump_collections(POSTS, COMMENTS)
+
+
+# Category renames change every card in the category and every nested category.
+@receiver(post_save, sender=Category)
+def invalidate_category_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        typeahead.index_category(instance)
+        bump_category_version(instance.pk)
+        bump_collections(CATEGORIES, POSTS)
+        CATEGORY_CACHE.invalidate()
+
+
+# Deleted categories leave the categories collection.
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    typeahead.remove_categories([instance.pk])
+    bump_collections(CATEGORIES, POSTS)
+    CATEGORY_CACHE.invalidate()
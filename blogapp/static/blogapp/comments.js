@@ -0,0 +1,33 @@
+// Comment list helpers shared by the home and profile pages.
+function commentItem(comment) {
+    var item = document.createElement('li');
+    item.style.marginBottom = '8px';
+    var author = document.createElement('strong');
+    author.textContent = comment.author;
+    item.appendChild(author);
+    item.appendChild(document.createTextNode(': ' + comment.content));
+    return item;
+}
+function loadComments(button) {
+    // Fetch the full thread page by page from the comments endpoint.
+    var list = document.getElementById(button.dataset.target);
+    var url = button.dataset.url + '?page_size=20';
+    if (button.dataset.cursor) {
+        url += '&cursor=' + encodeURIComponent(button.dataset.cursor);
+    } else {
+        list.innerHTML = '';
+    }
+    fetch(url, {headers: {'Accept': 'application/json'}, credentials: 'same-origin'})
+        .then(function (response) { return response.json(); })
+        .then(function (data) {
+            data.comments.forEach(function (comment) {
+                list.appendChild(commentItem(comment));
+            });
+            if (data.next) {
+                button.dataset.cursor = data.next;
+                button.textContent = 'Load more comments';
+            } else {
+                button.remove();
+            }
+        });
+}
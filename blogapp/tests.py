@@ -1,3 +1,1964 @@
-from django.test import TestCase
+import base64
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import QuerySet, prefetch_related_objects
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.template.defaultfilters import truncatewords
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from . import images, profiling, refcache, typeahead
+from .comments import latest_comments_prefetch
+from .conditional import COMMENTS, POSTS, collection_versions
+from .deletion import purge_deleted, soft_delete_categories, soft_delete_posts
+from .fragments import fragment_cache_stats
+from .jobs import Worker, claim, enqueue, requeue_stale, retry_dead
+from .likes import toggle_like
+from .media import serve_media
+from .middleware import (
+    PRIMARY_PIN_COOKIE,
+    SAFE_METHODS,
+    DatabaseRoutingMiddleware,
+    SamplingProfilerMiddleware,
+)
+from .models import (
+    AuthorStats,
+    Category,
+    Comment,
+    Follow,
+    Job,
+    Post,
+    PostLike,
+    PostSearchIndex,
+    TimelineEntry,
+    TrendingScore,
+)
+from .pagination import POST_ORDERING, EstimatedCountPaginator, InvalidCursor, KeysetPaginator
+from .routers import PrimaryReplicaRouter, replica_reads
+from .rows import RowSerializer
+from .search import parse_query, search_posts
+from .timeline import TIMELINE_ORDERING, feed_page, follow
+from .transfer import ImportConflict, Importer, export_lines
+from .trending import recompute_scores, trending_posts
+from .serializers import BlogSerializer, CommentSerializer, PostListSerializer
+
+# Maximum SQL queries per request (session + user lookups included).
+# Raising a budget is a deliberate decision: explain it in the commit.
+QUERY_BUDGETS = {
+    "blog_list": 6,
+    "profile": 5,
+    "post_detail": 6,
+    "post-list": 4,
+    "post-detail": 5,
+    "get_blogs_paginated": 4,
+}
+
+
+# Create a realistic dataset: several authors, categories, posts, comments and likes.
+def seed_blog(posts=12, comments_per_post=3, likers=3):
+    users = [User.objects.create_user(f"user{i}", password="pw") for i in range(4)]
+    categories = [Category.objects.create(name=f"Category {i}") for i in range(3)]
+    created = []
+    for i in range(posts):
+        post = Post.objects.create(
+            title=f"Post {i} about django",
+            content="Lorem ipsum dolor sit amet " * 40,
+            category=categories[i % len(categories)],
+            user=users[i % len(users)],
+        )
+        for j in range(comments_per_post):
+            Comment.objects.create(
+                post=post, author=users[j % len(users)].username, content=f"Comment {j}"
+            )
+        post.likes.add(*users[:likers])
+        created.append(post)
+    return users, categories, created
+
+
+# Per-process cache for the tests: the configured file cache is the developer's ./cache.
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+# Base class for tests that issue requests through the full middleware stack.
+@override_settings(
+    CACHES=TEST_CACHES,
+    # No background purge threads writing to the test database; tests purge explicitly.
+    BLOG_PURGE_MODE="off",
+    BLOG_METRICS_HEADERS=True,
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+)
+class BlogTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        refcache.local_cache.clear()
+        typeahead.reset()
+        self.users, self.categories, self.posts = seed_blog()
+        # Reference data is cached in steady state (see ReferenceCacheTests).
+        refcache.categories_with_counts()
+        self.user = self.users[0]
+        self.client.force_login(self.user)
+
+    def count_queries(self, url, **extra):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200, url)
+        return len(context.captured_queries), context
+
+    def assertQueryBudget(self, name, url, **extra):
+        count, context = self.count_queries(url, **extra)
+        budget = QUERY_BUDGETS[name]
+        queries = "\n".join(query["sql"] for query in context.captured_queries)
+        self.assertLessEqual(
+            count, budget, f"{name} ran {count} queries (budget {budget}):\n{queries}"
+        )
+        return count
+
+
+# Query budgets: every hot view must stay within budget and flat as data grows.
+class QueryBudgetTests(BlogTestCase):
+    def grow(self):
+        # Add a lot more comments and likes; a flat view must not notice.
+        extra = [User.objects.create_user(f"extra{i}", password="pw") for i in range(10)]
+        for post in self.posts:
+            Comment.objects.bulk_create(
+                Comment(post=post, author="extra", content=f"More {i}") for i in range(20)
+            )
+            post.likes.add(*extra)
+
+    def assertFlat(self, name, url, **extra):
+        # Measure the cold path (empty fragment cache) both times.
+        cache.clear()
+        before = self.assertQueryBudget(name, url, **extra)
+        self.grow()
+        cache.clear()
+        after = self.assertQueryBudget(name, url, **extra)
+        self.assertEqual(before, after, f"{name} query count grows with data (N+1)")
+
+    def test_blog_list(self):
+        self.assertFlat("blog_list", reverse("blog_list"))
+
+    def test_blog_list_search_and_category(self):
+        url = reverse("blog_list") + f"?search=django&category={self.categories[0].pk}"
+        self.assertFlat("blog_list", url)
+
+    def test_blog_list_cursor(self):
+        self.assertFlat("blog_list", reverse("blog_list") + "?cursor=")
+
+    def test_profile_view(self):
+        self.assertFlat("profile", reverse("profile"))
+
+    def test_post_detail_view(self):
+        self.assertFlat("post_detail", reverse("post_detail", args=[self.posts[0].pk]))
+
+    def test_post_viewset_list(self):
+        self.assertQueryBudget("post-list", reverse("post-list") + "?page_size=10")
+
+    def test_post_viewset_retrieve(self):
+        self.assertQueryBudget("post-detail", reverse("post-detail", args=[self.posts[0].pk]))
+
+    def test_blogs_paginated_view(self):
+        self.assertFlat("get_blogs_paginated", reverse("get_blogs_paginated") + "?page_size=5")
+
+
+# Full-text search: query parsing, ranking and index upkeep.
+class SearchTests(BlogTestCase):
+    def matches(self, query):
+        return list(search_posts(Post.objects.all(), query).values_list("title", flat=True))
+
+    def create(self, title, content="Nothing to see"):
+        return Post.objects.create(
+            title=title, content=content, category=self.categories[0], user=self.user
+        )
+
+    def test_phrases_and_prefixes(self):
+        self.create("The quick brown fox")
+        self.create("A brown and quick fox")
+        self.assertEqual(self.matches('"quick brown"'), ["The quick brown fox"])
+        self.assertEqual(len(self.matches("quick brown")), 2)
+        self.assertEqual(len(self.matches("djan*")), 12)
+        self.assertEqual(self.matches("djan"), [])
+
+    def test_operators_are_searched_as_words(self):
+        self.assertEqual(
+            parse_query('"hello  world" dja* AND NEAR( a:b -foo ""'),
+            '"hello world" "dja"* "AND" "NEAR(" "a:b" "-foo"',
+        )
+        self.create("Fish AND chips")
+        for query in ("AND", "NEAR(", "a:b", "-foo", "*", '"', 'say "hi'):
+            with self.subTest(query=query):
+                self.assertIsInstance(self.matches(query), list)
+                response = self.client.get(reverse("blog_list"), {"search": query})
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.matches("fish AND"), ["Fish AND chips"])
+
+    def test_most_relevant_first(self):
+        self.create("Zebra facts", "zebra " * 20)
+        self.create("Mostly about horses", "horses and one zebra " + "horse " * 50)
+        expected = ["Zebra facts", "Mostly about horses"]
+        self.assertEqual(self.matches("zebra"), expected)
+        # Also on the home page, whose cursor mode would sort by date.
+        for params in ({"search": "zebra"}, {"search": "zebra", "cursor": ""}):
+            with self.subTest(params=params):
+                response = self.client.get(reverse("blog_list"), params)
+                titles = [post.title for post in response.context["page_obj"].object_list]
+                self.assertEqual(titles, expected)
+
+    def test_index_follows_edits_and_deletes(self):
+        post = self.create("Zebra facts")
+        post.title = "Okapi facts"
+        post.save()
+        self.assertEqual(self.matches("zebra"), [])
+        self.assertEqual(self.matches("okapi"), ["Okapi facts"])
+        Post.objects.filter(pk=post.pk).delete()
+        self.assertEqual(self.matches("okapi"), [])
+        self.assertFalse(PostSearchIndex.objects.filter(pk=post.pk).exists())
+
+
+# Keyset (cursor) pagination and the estimated-count paginator.
+class PaginationTests(BlogTestCase):
+    def walk(self, paginator):
+        # Follow next cursors from the first page; return every page's ids.
+        pages, cursor = [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append([post.pk for post in page])
+            if not page.has_next():
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_next_and_previous_round_trip(self):
+        paginator = KeysetPaginator(Post.objects.all(), 5)
+        pages, last = self.walk(paginator)
+        expected = list(Post.objects.order_by(*POST_ORDERING).values_list("pk", flat=True))
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual(sum(pages, []), expected)
+        self.assertFalse(paginator.get_page().has_previous())
+        backwards, page = [], last
+        while page.has_previous():
+            page = paginator.get_page(page.previous_cursor)
+            backwards.append([post.pk for post in page])
+        self.assertEqual(backwards, pages[-2::-1])
+
+    def test_ties_are_broken_by_id(self):
+        Post.objects.update(publication_date=timezone.now())
+        pages, _ = self.walk(KeysetPaginator(Post.objects.all(), 5))
+        ids = sum(pages, [])
+        self.assertEqual(ids, sorted((post.pk for post in self.posts), reverse=True))
+
+    def test_invalid_and_tampered_cursors(self):
+        paginator = KeysetPaginator(Post.objects.all(), 5)
+        valid = paginator.get_page().next_cursor
+
+        def encode(payload):
+            return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+        bad = [
+            "bogus",
+            "!!!",
+            valid[:-3],
+            encode("[]"),
+            encode('{"v": ["2024-01-01T00:00:00Z"]}'),
+            encode('{"v": ["yesterday", "1"]}'),
+            encode('{"v": ["2024-01-01T00:00:00Z", "one"]}'),
+        ]
+        for cursor in bad:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    paginator.get_page(cursor)
+        response = self.client.get(reverse("post-list"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("get_blogs_paginated"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 400)
+        # The home page starts over from the first page.
+        response = self.client.get(reverse("blog_list"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["page_obj"].has_previous())
+
+    def test_api_links(self):
+        first = self.client.get(reverse("post-list"), {"page_size": 5}).json()
+        self.assertEqual(len(first["results"]), 5)
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(
+            [post["id"] for post in second["results"]],
+            list(Post.objects.order_by(*POST_ORDERING).values_list("pk", flat=True)[5:10]),
+        )
+        back = self.client.get(second["previous"]).json()
+        self.assertEqual(back["results"], first["results"])
+        # Without cursor or page_size the list stays a plain list.
+        self.assertIsInstance(self.client.get(reverse("post-list")).json(), list)
+
+    def test_estimated_count(self):
+        posts = Post.objects.order_by("pk")
+        cases = [
+            ({"estimate": 100}, 100, False, 0),
+            ({"estimate": lambda: 50}, 50, False, 0),
+            ({"estimate": lambda: None}, 12, True, 1),
+            ({"cap": 5}, 5, False, 1),
+            ({"cap": 12}, 12, True, 1),
+            ({}, 12, True, 1),
+        ]
+        for options, count, exact, queries in cases:
+            with self.subTest(options=options):
+                paginator = EstimatedCountPaginator(posts, 5, **options)
+                with CaptureQueriesContext(connection) as context:
+                    self.assertEqual((paginator.count, paginator.exact), (count, exact))
+                self.assertEqual(len(context.captured_queries), queries)
+        self.assertEqual(EstimatedCountPaginator(posts, 5, cap=5).num_pages, 1)
+
+
+# Stored like/comment counters follow every write path; reconcile_counters fixes drift.
+class CounterTests(BlogTestCase):
+    def counts(self, post):
+        return tuple(
+            Post.objects.filter(pk=post.pk).values_list("like_count", "comment_count").get()
+        )
+
+    def test_like_count_follows_likes(self):
+        post, user = self.posts[0], self.users[3]
+        self.assertEqual(self.counts(post), (3, 3))
+        post.likes.add(user)
+        self.assertEqual(self.counts(post)[0], 4)
+        post.likes.remove(self.users[0])
+        self.assertEqual(self.counts(post)[0], 3)
+        # From the user's side too, over several posts at once.
+        user.liked_posts.add(self.posts[1], self.posts[2])
+        self.assertEqual([self.counts(p)[0] for p in self.posts[1:3]], [4, 4])
+        user.liked_posts.clear()
+        self.assertEqual([self.counts(p)[0] for p in self.posts[:3]], [2, 3, 3])
+        self.assertTrue(toggle_like(post, user))
+        self.assertEqual(self.counts(post)[0], 3)
+        self.assertFalse(toggle_like(post, user))
+        self.assertEqual(self.counts(post)[0], 2)
+        post.likes.clear()
+        self.assertEqual(self.counts(post)[0], 0)
+
+    def test_toggle_like_survives_a_concurrent_like(self):
+        post, user = self.posts[0], self.users[3]
+        real_get = QuerySet.get
+        raced = []
+
+        def get(queryset, *args, **kwargs):
+            if not raced:
+                # Another request inserts the same like right after this lookup.
+                raced.append(PostLike.objects.bulk_create([PostLike(post=post, user=user)]))
+                raise PostLike.DoesNotExist
+            return real_get(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "get", get):
+            # Two toggles: the like is gone again, without an IntegrityError.
+            self.assertFalse(toggle_like(post, user))
+        self.assertEqual(self.counts(post)[0], 3)
+        self.assertFalse(PostLike.objects.filter(post=post, user=user).exists())
+
+    def test_comment_count_follows_comments(self):
+        post = self.posts[0]
+        comment = Comment.objects.create(post=post, author="x", content="new")
+        self.assertEqual(self.counts(post)[1], 4)
+        comment.content = "edited"
+        comment.save()
+        self.assertEqual(self.counts(post)[1], 4)
+        comment.delete()
+        self.assertEqual(self.counts(post)[1], 3)
+        post.comments.all().delete()
+        self.assertEqual(self.counts(post)[1], 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        drifted = [post.pk for post in self.posts[:2]]
+        Post.objects.filter(pk__in=drifted).update(like_count=99, comment_count=0)
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("Fixed like_count on 2 posts.", out.getvalue())
+        self.assertIn("Fixed comment_count on 2 posts.", out.getvalue())
+        self.assertEqual({self.counts(post) for post in self.posts}, {(3, 3)})
+        out = io.StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("Fixed like_count on 0 posts.", out.getvalue())
+
+
+# A post's comments endpoint and the bounded latest-comments prefetch.
+class PostCommentsTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.post = self.posts[0]
+        self.url = reverse("post_comments", args=[self.post.pk])
+        # Four more comments created in the same instant: id breaks the tie.
+        for i in range(4):
+            Comment.objects.create(post=self.post, author="x", content=f"Tied {i}")
+        Comment.objects.filter(post=self.post, content__startswith="Tied").update(
+            created_at=timezone.now() + timedelta(hours=1)
+        )
+        self.expected = list(
+            self.post.comments.order_by("-created_at", "-id").values_list("pk", flat=True)
+        )
+
+    def test_pages_newest_first(self):
+        ids, cursor = [], ""
+        while cursor is not None:
+            data = self.client.get(self.url, {"page_size": 3, "cursor": cursor}).json()
+            self.assertEqual(data["count"], 7)
+            self.assertLessEqual(len(data["comments"]), 3)
+            ids += [comment["id"] for comment in data["comments"]]
+            cursor = data["next"]
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(self.client.get(self.url, {"cursor": "bogus"}).status_code, 400)
+        missing = reverse("post_comments", args=[99999])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_post_validation(self):
+        for data in ({}, {"content": ""}, {"content": "   "}):
+            with self.subTest(data=data):
+                response = self.client.post(self.url, data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("content", response.json()["errors"])
+        self.assertEqual(self.post.comments.count(), 7)
+        missing = reverse("post_comments", args=[99999])
+        self.assertEqual(self.client.post(missing, {"content": "Hi"}).status_code, 404)
+        response = self.client.post(self.url, {"content": "Hi", "author": "someone else"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["comment"]["author"], self.user.username)
+
+    def test_latest_comments_prefetch(self):
+        posts = list(Post.objects.order_by("pk"))
+        with self.assertNumQueries(1):
+            prefetch_related_objects(posts, latest_comments_prefetch())
+        self.assertEqual([comment.pk for comment in posts[0].latest_comments], self.expected[:3])
+        self.assertEqual({len(post.latest_comments) for post in posts}, {3})
+        # Same single query with more posts and comments, and with another limit.
+        self.posts.append(self.create_post_with_comments(10))
+        posts = list(Post.objects.order_by("pk"))
+        with self.assertNumQueries(1):
+            prefetch_related_objects(posts, latest_comments_prefetch(limit=5))
+        self.assertEqual([comment.pk for comment in posts[0].latest_comments], self.expected[:5])
+        self.assertEqual(len(posts[-1].latest_comments), 5)
+        self.assertEqual(len(posts[1].latest_comments), 3)
+
+    def create_post_with_comments(self, count):
+        post = Post.objects.create(
+            title="Busy", content="Busy", category=self.categories[0], user=self.user
+        )
+        Comment.objects.bulk_create(
+            Comment(post=post, author="x", content=f"Busy {i}") for i in range(count)
+        )
+        return post
+
+
+# RequestMetricsMiddleware output.
+class RequestMetricsMiddlewareTests(BlogTestCase):
+    def test_headers_report_queries_and_timings(self):
+        self.client.get(reverse("blog_list"))
+        count, _ = self.count_queries(reverse("blog_list"))
+        response = self.client.get(reverse("blog_list"))
+        self.assertEqual(int(response["X-DB-Queries"]), count)
+        timings = dict(
+            part.strip().split(";dur=") for part in response["Server-Timing"].split(",")
+        )
+        self.assertEqual(set(timings), {"db", "render", "total"})
+        self.assertGreater(float(timings["render"]), 0)
+
+    @override_settings(BLOG_METRICS_HEADERS=False)
+    def test_logs_structured_line_without_headers(self):
+        with self.assertLogs("blogapp.metrics", level="INFO") as logs:
+            response = self.client.get(reverse("profile"))
+        self.assertNotIn("X-DB-Queries", response)
+        self.assertIn('"view": "profile"', logs.output[0])
+        self.assertIn('"queries":', logs.output[0])
+
+
+# Shared post-card fragments and their signal-driven invalidation.
+class PostCardFragmentTests(BlogTestCase):
+    def test_second_render_hits_and_skips_comment_prefetch(self):
+        first, _ = self.count_queries(reverse("blog_list"))
+        second, _ = self.count_queries(reverse("blog_list"))
+        self.assertEqual(second, first - 1)
+        stats = fragment_cache_stats()
+        self.assertEqual(stats["misses"], 10)
+        self.assertEqual(stats["hits"], 10)
+
+    def test_post_edit_and_category_rename_invalidate(self):
+        post = self.posts[-1]
+        self.client.get(reverse("blog_list"))
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = "Freshly edited title"
+            post.save()
+            category = post.category
+            category.name = "Renamed category"
+            category.save()
+        content = self.client.get(reverse("blog_list")).content.decode()
+        self.assertIn("Freshly edited title", content)
+        self.assertEqual(content.count("Category: Renamed category"), 4)
+
+    def test_new_comment_invalidates(self):
+        post = self.posts[-1]
+        self.client.get(reverse("blog_list"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(post=post, author="someone", content="Brand new comment")
+        self.assertContains(self.client.get(reverse("blog_list")), "Brand new comment")
+
+    def test_fragments_are_shared_but_like_state_is_per_viewer(self):
+        post = self.posts[-1]
+        post.likes.remove(self.users[1])
+        self.assertContains(self.client.get(reverse("blog_list")), "♥ Liked", count=10)
+        self.client.force_login(self.users[3])
+        self.assertNotContains(self.client.get(reverse("blog_list")), "♥ Liked")
+        self.assertEqual(fragment_cache_stats()["hits"], 10)
+
+
+# ETag / Last-Modified support on the API and the post detail page.
+class ConditionalGetTests(BlogTestCase):
+    def assertRevalidates(self, url, change):
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+        with CaptureQueriesContext(connection) as context:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertLessEqual(len(context.captured_queries), 3)
+        # Collection stamps are written when the change commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        fresh = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, 200)
+        self.assertNotEqual(fresh["ETag"], etag)
+
+    def test_post_retrieve(self):
+        post = self.posts[0]
+        self.assertRevalidates(
+            reverse("post-detail", args=[post.pk]),
+            lambda: Comment.objects.create(post=post, author="x", content="new"),
+        )
+
+    def test_post_retrieve_sees_category_rename(self):
+        post = self.posts[0]
+
+        def rename():
+            post.category.name = "Renamed"
+            post.category.save()
+
+        self.assertRevalidates(reverse("post-detail", args=[post.pk]), rename)
+
+    def test_post_list(self):
+        self.assertRevalidates(
+            reverse("post-list") + "?page_size=5",
+            lambda: self.posts[3].likes.add(self.users[3]),
+        )
+
+    def test_comment_and_category_lists(self):
+        self.assertRevalidates(
+            reverse("comment-list"),
+            lambda: Comment.objects.create(post=self.posts[1], author="x", content="new"),
+        )
+        self.assertRevalidates(
+            reverse("category-list"), lambda: Category.objects.create(name="New one")
+        )
+
+    def test_post_detail_page(self):
+        post = self.posts[0]
+
+        def edit():
+            post.title = "Edited"
+            post.save()
+
+        url = reverse("post_detail", args=[post.pk])
+        self.assertRevalidates(url, edit)
+        # A new CSRF secret must not revalidate a page holding the old token.
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        del self.client.cookies["csrftoken"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_comment_edits_and_deletes_change_the_post(self):
+        post = self.posts[0]
+        comment = Comment.objects.create(post=post, author="x", content="first")
+
+        def edit():
+            comment.content = "Edited"
+            comment.save()
+
+        for url in (reverse("post-detail", args=[post.pk]), reverse("post_detail", args=[post.pk])):
+            self.assertRevalidates(url, edit)
+        self.assertRevalidates(reverse("post-detail", args=[post.pk]), comment.delete)
+
+    def test_stamps_are_bumped_once_per_transaction(self):
+        before = collection_versions(POSTS, COMMENTS)
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in self.posts[:5]:
+                Comment.objects.create(post=post, author="x", content="new")
+            self.assertEqual(collection_versions(POSTS, COMMENTS), before)
+        after = collection_versions(POSTS, COMMENTS)
+        self.assertEqual([after[name][0] - before[name][0] for name in before], [1, 1])
+
+    def test_post_etag_varies_with_the_requested_fields(self):
+        url = reverse("post-detail", args=[self.posts[0].pk])
+        etag = self.client.get(url)["ETag"]
+        sparse = self.client.get(url + "?fields=id,title", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(sparse.status_code, 200)
+        self.assertEqual(set(sparse.json()), {"id", "title"})
+        reordered = self.client.get(url + "?fields=title,id", HTTP_IF_NONE_MATCH=sparse["ETag"])
+        self.assertEqual(reordered.status_code, 304)
+
+
+# Upload processing: EXIF stripped, size capped, WebP variants, placeholder while pending.
+class ImagePipelineTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(
+            MEDIA_ROOT=self.media_root, BLOG_IMAGE_PROCESSING="sync"
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, size=(3000, 2000)):
+        exif = Image.Exif()
+        exif[0x010F] = "Camera maker"
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "teal").save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def create(self, **data):
+        return self.client.post(
+            reverse("create_post"),
+            {"title": "With image", "content": "Body", "category": self.categories[0].pk, **data},
+        )
+
+    def test_upload_is_sanitized_and_gets_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create(image=self.upload())
+        post = Post.objects.get(title="With image")
+        self.assertEqual(post.image_status, "ready")
+        with Image.open(post.image.path) as original:
+            self.assertLessEqual(max(original.size), 2048)
+            self.assertNotIn(0x010F, original.getexif())
+        with Image.open(post.image_thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, "WEBP")
+            self.assertEqual(thumbnail.width, 400)
+        self.assertIn("400w", post.image_srcset)
+        self.assertContains(self.client.get(reverse("blog_list")), "srcset=")
+
+    def test_placeholder_until_processed(self):
+        self.create(image=self.upload(size=(50, 50)))
+        post = Post.objects.get(title="With image")
+        self.assertEqual(post.image_status, "pending")
+        self.assertContains(self.client.get(reverse("blog_list")), "Image is being processed")
+
+    def test_stale_result_is_discarded(self):
+        self.create(image=self.upload(size=(50, 50)))
+        post = Post.objects.get(title="With image")
+        real_widths = images.variant_widths
+
+        def replaced_meanwhile():
+            # A newer upload lands while this job is still encoding.
+            Post.objects.filter(pk=post.pk).update(image="post_images/newer.jpg")
+            return real_widths()
+
+        with mock.patch.object(images, "variant_widths", replaced_meanwhile):
+            self.assertFalse(images.process_post_image(post.pk))
+        post.refresh_from_db()
+        self.assertEqual((post.image.name, post.image_status), ("post_images/newer.jpg", "pending"))
+        self.assertFalse(post.image_thumbnail)
+
+    def test_any_error_marks_failed(self):
+        self.create(image=self.upload(size=(50, 50)))
+        post = Post.objects.get(title="With image")
+        with mock.patch.object(images, "_encode", side_effect=RuntimeError("boom")):
+            with self.assertLogs("blogapp.images", "ERROR"):
+                self.assertFalse(images.process_post_image(post.pk))
+        post.refresh_from_db()
+        self.assertEqual(post.image_status, "failed")
+
+
+# Compact list representation and ?fields= / ?expand= on the posts API.
+class SparseFieldsetTests(BlogTestCase):
+    def test_list_is_compact(self):
+        item = self.client.get(reverse("post-list")).json()[0]
+        self.assertNotIn("comments", item)
+        self.assertEqual(item["comment_count"], 3)
+        self.assertEqual(item["like_count"], 3)
+
+    def test_fields_limits_output_and_columns(self):
+        count, context = self.count_queries(reverse("post-list") + "?fields=id,title")
+        self.assertEqual(count, QUERY_BUDGETS["post-list"])
+        post_query = context.captured_queries[-1]["sql"]
+        self.assertNotIn('"content"', post_query)
+        self.assertNotIn("blogapp_category", post_query)
+        item = self.client.get(reverse("post-list") + "?fields=id,title").json()[0]
+        self.assertEqual(set(item), {"id", "title"})
+
+    def test_expand_comments_is_one_extra_query(self):
+        url = reverse("post-list") + "?expand=comments&page_size=10"
+        count, _ = self.count_queries(url)
+        self.assertEqual(count, QUERY_BUDGETS["post-list"] + 1)
+        results = self.client.get(url).json()["results"]
+        self.assertEqual(len(results[0]["comments"]), 3)
+
+    def test_retrieve_keeps_full_representation(self):
+        item = self.client.get(reverse("post-detail", args=[self.posts[0].pk])).json()
+        self.assertEqual(len(item["comments"]), 3)
+
+
+# The values() read path must render exactly what the DRF serializers render.
+class RowSerializerTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        Post.objects.filter(pk=self.posts[0].pk).update(
+            image_thumbnail="post_images/variants/abc-400w.webp", image_status="ready"
+        )
+        Post.objects.create(
+            title="No comments", content="", category=self.categories[0], user=self.users[1]
+        )
+
+    def render_both(self, serializer_class, queryset, query=""):
+        request = Request(APIRequestFactory().get("/api/" + query))
+        context = {"request": request}
+        if hasattr(serializer_class, "optimize_queryset"):
+            queryset = serializer_class.optimize_queryset(queryset, request)
+        expected = serializer_class(queryset, many=True, context=context).data
+        rows = RowSerializer(serializer_class(context=context))
+        actual = rows.serialize(rows.rows(queryset))
+        return JSONRenderer().render(expected), JSONRenderer().render(actual)
+
+    def assertSameBytes(self, serializer_class, queryset, query=""):
+        expected, actual = self.render_both(serializer_class, queryset, query)
+        self.assertEqual(expected, actual)
+
+    def test_post_list_serializer(self):
+        posts = Post.objects.order_by("-publication_date", "-id")
+        for query in ("", "?fields=id,title,publication_date", "?expand=comments"):
+            with self.subTest(query=query):
+                self.assertSameBytes(PostListSerializer, posts, query)
+
+    def test_comment_serializer(self):
+        self.assertSameBytes(CommentSerializer, Comment.objects.order_by("-created_at"))
+
+    def test_blog_serializer(self):
+        self.assertSameBytes(BlogSerializer, Post.objects.order_by("-publication_date"))
+
+    def test_endpoints_match_serializer_output(self):
+        response = self.client.get(reverse("post-list"))
+        expected, _ = self.render_both(
+            PostListSerializer, Post.objects.order_by("-publication_date")
+        )
+        self.assertEqual(response.content, expected)
+        response = self.client.get(reverse("comment-list"))
+        expected, _ = self.render_both(CommentSerializer, Comment.objects.order_by("-created_at"))
+        self.assertEqual(response.content, expected)
+
+    def test_cursor_pages_from_rows(self):
+        url = reverse("post-list") + "?fields=title&page_size=5"
+        first = self.client.get(url).json()
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(set(first["results"][0]), {"title"})
+        titles = [item["title"] for item in first["results"] + second["results"]]
+        self.assertEqual(len(set(titles)), 10)
+        blogs = self.client.get(reverse("get_blogs_paginated") + "?cursor=&page_size=4").json()
+        self.assertEqual(len(blogs["blogs"]), 4)
+        self.assertEqual(len(blogs["blogs"][1]["comments"]), 3)
+
+
+# Async read views (blogapp.async_urls) answer exactly like the sync ones.
+class AsyncViewTests(BlogTestCase):
+    async def get_both(self, url, **extra):
+        sync_response = await sync_to_async(self.client.get)(url, **extra)
+        await self.async_client.aforce_login(self.user)
+        # Same CSRF secret, so the post page's ETags can match.
+        if "csrftoken" in self.client.cookies:
+            self.async_client.cookies["csrftoken"] = self.client.cookies["csrftoken"].value
+        with self.settings(ROOT_URLCONF="blogapp.async_urls"):
+            async_response = await self.async_client.get(url, **extra)
+        self.assertEqual(sync_response.status_code, async_response.status_code, url)
+        return sync_response, async_response
+
+    async def test_api_lists_match(self):
+        for url in (
+            reverse("post-list"),
+            reverse("post-list") + "?page_size=5&fields=id,title",
+            reverse("comment-list"),
+            reverse("category-list"),
+            reverse("get_blogs_paginated") + "?page=2&page_size=3",
+            reverse("get_blogs_paginated") + "?page=99&page_size=3",
+            reverse("get_blogs_paginated") + "?cursor=&page_size=3",
+        ):
+            with self.subTest(url=url):
+                sync_response, async_response = await self.get_both(url)
+                self.assertEqual(sync_response.content, async_response.content)
+                self.assertEqual(sync_response.get("ETag"), async_response.get("ETag"))
+
+    async def test_api_retrieve_and_not_modified(self):
+        url = reverse("post-detail", args=[self.posts[0].pk])
+        sync_response, async_response = await self.get_both(url)
+        self.assertEqual(sync_response.content, async_response.content)
+        _, async_response = await self.get_both(
+            url, headers={"If-None-Match": sync_response["ETag"]}
+        )
+        self.assertEqual(async_response.status_code, 304)
+        _, async_response = await self.get_both(reverse("post-detail", args=[0]))
+        self.assertEqual(async_response.status_code, 404)
+
+    def assertSamePage(self, sync_response, async_response):
+        # CSRF tokens are masked differently on every response.
+        strip = lambda response: re.sub(rb'value="[\w-]{64}"', b"", response.content)
+        self.assertEqual(strip(sync_response), strip(async_response))
+
+    async def test_blog_list_pages(self):
+        for query in ("", "?page=2", "?page=9", "?cursor=", "?search=django"):
+            with self.subTest(query=query):
+                sync_response, async_response = await self.get_both(
+                    reverse("blog_list") + query
+                )
+                self.assertSamePage(sync_response, async_response)
+                self.assertGreater(int(async_response["X-DB-Queries"]), 0)
+
+    async def test_post_detail_page(self):
+        url = reverse("post_detail", args=[self.posts[0].pk])
+        sync_response, async_response = await self.get_both(url)
+        self.assertSamePage(sync_response, async_response)
+        self.assertContains(async_response, "Comment 2")
+        self.assertEqual(sync_response["ETag"], async_response["ETag"])
+
+
+# NDJSON export/import round trip, resumption and the streaming endpoint.
+class TransferTests(BlogTestCase):
+    def wipe(self):
+        Post.objects.all().delete()
+        Category.objects.all().delete()
+
+    def test_round_trip(self):
+        exported = list(export_lines(chunk_size=5))
+        self.wipe()
+        importer = Importer(batch_size=7)
+        counts = importer.load(exported)
+        importer.finish()
+        self.assertEqual(
+            counts, {"category": 3, "post": 12, "comment": 36, "like": 36, "skipped": 0}
+        )
+        self.assertEqual(list(export_lines()), exported)
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual((post.comment_count, post.like_count), (3, 3))
+        self.assertEqual(self.client.get(reverse("blog_list") + "?search=django").status_code, 200)
+        self.assertEqual(
+            Post.objects.filter(search_index__document__match="django").count(), 12
+        )
+
+    def test_resume_after_interruption(self):
+        exported = list(export_lines())
+        self.wipe()
+        checkpoints = []
+
+        def interrupt(offset):
+            checkpoints.append(offset)
+            if len(checkpoints) == 3:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            Importer(batch_size=5).load(exported, checkpoint=interrupt)
+        data = b"".join(exported)
+        offset = checkpoints[-1]
+        # Replaying from an earlier checkpoint is harmless too (conflicts are skipped).
+        counts = Importer(batch_size=5).load(
+            io.BytesIO(data[checkpoints[0] :]), offset=checkpoints[0]
+        )
+        self.assertEqual(counts["skipped"], 10)
+        self.assertEqual(b"".join(export_lines()), data)
+        self.assertLess(checkpoints[0], offset)
+
+    def test_missing_references_are_created(self):
+        lines = [
+            b'{"type": "post", "id": 500, "title": "T", "content": "C", "image": null,'
+            b' "image_thumbnail": null, "image_medium": null, "image_status": "",'
+            b' "publication_date": "2024-01-02T03:04:05.123456+00:00",'
+            b' "updated_at": "2024-01-02T03:04:05.123456+00:00",'
+            b' "category_name": "Imported", "username": "newcomer"}\n'
+        ]
+        Importer().load(lines)
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.category.name, "Imported")
+        self.assertFalse(post.user.has_usable_password())
+        self.assertEqual(post.publication_date.microsecond, 123456)
+        self.assertEqual(post.updated_at, post.publication_date)
+        # Replayed rows are skipped: the existing post keeps its own timestamps.
+        post.title = "Edited"
+        post.save()
+        Importer().load(lines)
+        self.assertEqual(Post.objects.get(pk=500).updated_at, post.updated_at)
+        self.assertGreater(post.updated_at.year, 2024)
+
+    def test_id_collisions_are_refused(self):
+        exported = list(export_lines(types=("post", "comment", "like")))
+        Post.objects.update(publication_date=timezone.now() - timedelta(days=1))
+        with self.assertRaises(ImportConflict):
+            Importer().load(exported)
+        # Nothing was attached to the unrelated posts that hold those ids.
+        self.assertEqual((Comment.objects.count(), PostLike.objects.count()), (36, 36))
+        path = os.path.join(tempfile.mkdtemp(), "export.ndjson")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path))
+        with open(path, "wb") as file:
+            file.writelines(exported)
+        with self.assertRaisesMessage(CommandError, "already exists with other data"):
+            call_command("import_ndjson", path, stdout=io.StringIO())
+
+    def test_export_endpoint_streams_for_staff(self):
+        self.assertEqual(self.client.get(reverse("export")).status_code, 403)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get(reverse("export") + "?types=category,like")
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 3 + 36)
+        self.assertEqual(self.client.get(reverse("export") + "?types=nope").status_code, 400)
+
+
+# Two-level reference data cache: LRU + shared backend, versions, stampede lock.
+class ReferenceCacheTests(BlogTestCase):
+    def setUp(self):
+        # The file backend shared by worker processes, in a directory of its own.
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = self.settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": cache_dir,
+                }
+            }
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+
+    def queries(self, function, *args):
+        with CaptureQueriesContext(connection) as context:
+            result = function(*args)
+        return len(context.captured_queries), result
+
+    def counting_cache(self, name, delay=0):
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(delay)
+            return len(calls)
+
+        return refcache.ReferenceCache(name, load), calls
+
+    def test_levels(self):
+        cache.clear()
+        refcache.local_cache.clear()
+        self.assertEqual(self.queries(refcache.categories_with_counts)[0], 2)
+        count, categories = self.queries(refcache.categories_with_counts)
+        self.assertEqual(count, 0)
+        counts = {category.name: category.post_count for category in categories}
+        self.assertEqual(counts, {"Category 0": 4, "Category 1": 4, "Category 2": 4})
+        # Another process: empty LRU, same shared cache.
+        refcache.local_cache.clear()
+        self.assertEqual(self.queries(refcache.categories_with_counts)[0], 0)
+
+    def test_signals_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Fresh")
+            Post.objects.create(
+                title="T", content="C", category=self.categories[0], user=self.user
+            )
+        categories = refcache.categories_with_counts()
+        counts = {category.name: category.post_count for category in categories}
+        self.assertEqual((counts["Fresh"], counts["Category 0"]), (0, 5))
+
+    @override_settings(BLOG_REFCACHE_LOCAL_TTL=0)
+    def test_other_processes_see_new_version(self):
+        reference, calls = self.counting_cache("test-version")
+        self.assertEqual(reference.get(), 1)
+        # The bump another process would make: our LRU entry is left alone.
+        cache.set(reference.version_key, "elsewhere", None)
+        self.assertEqual(reference.get(), 2)
+        self.assertEqual(reference.get(), 2)
+
+    def test_concurrent_cold_misses_load_once(self):
+        reference, calls = self.counting_cache("test-stampede", delay=0.2)
+        threads = [threading.Thread(target=reference.get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+    def test_threads_of_one_process_check_the_version_once(self):
+        # Checked outside the reload lock, threads could create different
+        # initial versions and load once per version.
+        reference, calls = self.counting_cache("test-version-race")
+        lookups = []
+        lookup_version = reference._version
+
+        def slow_version(shared):
+            lookups.append(1)
+            time.sleep(0.05)
+            return lookup_version(shared)
+
+        reference._version = slow_version
+        threads = [threading.Thread(target=reference.get) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual((len(lookups), len(calls)), (1, 1))
+
+    @override_settings(BLOG_REFCACHE_LOCAL_TTL=0)
+    def test_expired_value_is_served_while_another_worker_reloads(self):
+        reference, calls = self.counting_cache("test-stale")
+        self.assertEqual(reference.get(), 1)
+        key = f"refcache:test-stale:{cache.get(reference.version_key)}:()"
+        # Past its soft deadline, seen from a process that is reloading it.
+        cache.set(key, (time.time() - 1, 1))
+        cache.add(f"{key}:lock", 1, 10)
+        refcache.local_cache.clear()
+        self.assertEqual(reference.get(), 1)
+        self.assertEqual(len(calls), 1)
+        cache.delete(f"{key}:lock")
+        self.assertEqual(reference.get(), 2)
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = refcache.LocalLRU(2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+
+    def test_post_writes_resolve_category_from_cache(self):
+        data = {"title": "T", "content": "C", "category_id": self.categories[1].pk}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post("/posts/", data)
+        self.assertEqual(response.status_code, 201)
+        sql = [query["sql"] for query in context.captured_queries]
+        self.assertFalse([query for query in sql if 'FROM "blogapp_category"' in query])
+        # Unknown to the cache (created without commit hooks here): falls back to the DB.
+        late = Category.objects.create(name="Late")
+        response = self.client.post("/posts/", {**data, "category_id": late.pk})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post("/posts/", {**data, "category_id": 999})
+        self.assertEqual(response.status_code, 400)
+
+
+# Primary/replica routing and read-your-writes pinning (outside TestCase's transaction).
+class DatabaseRouterTests(TransactionTestCase):
+    def routed(self, method, **cookies):
+        # Run the middleware around a view that reports where reads would go.
+        seen = {}
+
+        def view(request):
+            seen["read"] = PrimaryReplicaRouter().db_for_read(Post)
+            return HttpResponse(status=200 if request.method in SAFE_METHODS else 201)
+
+        request = getattr(RequestFactory(), method.lower())("/")
+        request.COOKIES.update(cookies)
+        response = DatabaseRoutingMiddleware(view)(request)
+        return seen["read"], response
+
+    @override_settings(BLOG_READ_REPLICAS=["replica1", "replica2"])
+    def test_reads_go_to_replicas_writes_pin_to_primary(self):
+        read, response = self.routed("GET")
+        self.assertIn(read, ["replica1", "replica2"])
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        read, response = self.routed("POST")
+        self.assertEqual(read, "default")
+        self.assertEqual(response.cookies[PRIMARY_PIN_COOKIE]["max-age"], 10)
+        read, _ = self.routed("GET", **{PRIMARY_PIN_COOKIE: "1"})
+        self.assertEqual(read, "default")
+
+    @override_settings(BLOG_READ_REPLICAS=["replica1"])
+    def test_transactions_and_code_outside_requests_use_primary(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), "default")
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Post), "replica1")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Post), "default")
+        self.assertEqual(router.db_for_write(Post), "default")
+        self.assertFalse(router.allow_migrate("replica1", "blogapp"))
+
+
+# Pinning through the real middleware stack, and SQLite connection tuning.
+class DatabaseRoutingTests(BlogTestCase):
+    def test_failed_writes_do_not_pin(self):
+        response = self.client.post(reverse("post_comments", args=[self.posts[0].pk]), {})
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(PRIMARY_PIN_COOKIE, response.cookies)
+        response = self.client.post(
+            reverse("post_comments", args=[self.posts[0].pk]), {"content": "Pinned"}
+        )
+        self.assertIn(PRIMARY_PIN_COOKIE, response.cookies)
+
+    def test_sqlite_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20000)
+
+
+# JSON interaction endpoints used by the list pages instead of form posts + redirects.
+class InteractionEndpointTests(BlogTestCase):
+    def test_like_toggles_and_returns_state(self):
+        post = self.posts[-1]
+        stranger = User.objects.create_user("stranger", password="pw")
+        self.client.force_login(stranger)
+        url = reverse("post_like", args=[post.pk])
+        self.assertEqual(self.client.post(url).json(), {"liked": True, "like_count": 4})
+        self.assertEqual(self.client.post(url).json(), {"liked": False, "like_count": 3})
+        self.assertEqual(self.client.post(reverse("post_like", args=[99999])).status_code, 404)
+
+    def test_comment_returns_comment_and_count(self):
+        post = self.posts[-1]
+        url = reverse("post_comments", args=[post.pk])
+        response = self.client.post(url, {"content": "Via fetch"})
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["comment_count"], 4)
+        self.assertEqual(
+            (data["comment"]["author"], data["comment"]["content"]), (self.user.username, "Via fetch")
+        )
+        self.assertIn("content", self.client.post(url, {"content": ""}).json()["errors"])
+
+    def test_much_cheaper_than_form_post_and_reload(self):
+        post = self.posts[-1]
+        self.client.get(reverse("blog_list"))
+
+        def cost(*requests):
+            # (queries, response bytes) of a sequence of requests.
+            queries = size = 0
+            for method, url, data in requests:
+                with CaptureQueriesContext(connection) as context:
+                    response = getattr(self.client, method)(url, data)
+                queries += len(context.captured_queries)
+                size += len(response.content)
+            return queries, size
+
+        home = ("get", reverse("blog_list"), None)
+        like = cost(("post", reverse("post_like", args=[post.pk]), None))
+        like_fallback = cost(("post", reverse("like_post", args=[post.pk]), None), home)
+        comment = {"post_id": post.pk, "content": "Hello"}
+        comment_json = cost(("post", reverse("post_comments", args=[post.pk]), comment))
+        comment_fallback = cost(("post", reverse("blog_list"), comment), home)
+        for fast, slow in ((like, like_fallback), (comment_json, comment_fallback)):
+            self.assertLess(fast[0], slow[0])
+            self.assertLess(fast[1] * 10, slow[1])
+
+    def test_page_wires_json_forms_with_fallback(self):
+        response = self.client.get(reverse("blog_list"))
+        post = self.posts[-1]
+        self.assertContains(response, f'action="{reverse("like_post", args=[post.pk])}"')
+        self.assertContains(response, f'data-json-url="{reverse("post_like", args=[post.pk])}"')
+        self.assertContains(response, f'id="comment-count-{post.pk}"')
+
+    def test_anonymous_is_rejected(self):
+        self.client.logout()
+        post = self.posts[-1]
+        for url in (reverse("post_like", args=[post.pk]), reverse("post_comments", args=[post.pk])):
+            self.assertIn(self.client.post(url, {"content": "x"}).status_code, (401, 403))
+
+
+# Batch write endpoints: per-item results, one write per table, counters once.
+class BatchWriteTests(BlogTestCase):
+    def post_json(self, url, data):
+        return self.client.post(url, data, content_type="application/json")
+
+    def batch_queries(self, url, data):
+        with CaptureQueriesContext(connection) as context:
+            response = self.post_json(url, data)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_comment_batch(self):
+        post = self.posts[0]
+        response = self.post_json(
+            "/comments/batch/",
+            [
+                {"post": post.pk, "author": "a", "content": "one"},
+                {"post": 99999, "author": "b", "content": "two"},
+                {"post": post.pk, "author": "c"},
+                {"post": post.pk, "author": "d", "content": "three"},
+            ],
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [201, 400, 400, 201])
+        self.assertIn("post", results[1]["errors"])
+        self.assertIn("content", results[2]["errors"])
+        self.assertEqual(results[3]["comment"]["content"], "three")
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 5)
+
+    def test_like_batch(self):
+        liked, unliked = self.posts[0], self.posts[1]
+        stranger = User.objects.create_user("stranger", password="pw")
+        self.client.force_login(stranger)
+        response = self.post_json(
+            reverse("like_batch"),
+            [
+                {"post": liked.pk, "action": "like"},
+                {"post": unliked.pk, "action": "like"},
+                {"post": unliked.pk, "action": "unlike"},
+                {"post": liked.pk, "action": "love"},
+            ],
+        )
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [200, 200, 200, 400])
+        self.assertEqual((results[0]["liked"], results[0]["like_count"]), (True, 4))
+        self.assertEqual((results[1]["liked"], results[1]["like_count"]), (False, 3))
+        liked.refresh_from_db()
+        self.assertEqual(liked.like_count, 4)
+        self.assertTrue(liked.likes.filter(pk=stranger.pk).exists())
+        self.post_json(reverse("like_batch"), [{"post": liked.pk, "action": "unlike"}])
+        liked.refresh_from_db()
+        self.assertEqual(liked.like_count, 3)
+
+    def test_post_batch(self):
+        category = self.categories[0]
+        response = self.post_json(
+            "/posts/batch/",
+            [
+                {"title": "Batched zebra", "content": "Body", "category_id": category.pk},
+                {"title": "Orphan", "content": "Body", "category_id": 99999},
+            ],
+        )
+        results = response.json()["results"]
+        self.assertEqual([result["status"] for result in results], [201, 400])
+        post = Post.objects.get(pk=results[0]["post"]["id"])
+        self.assertEqual((post.user, post.category), (self.user, category))
+        self.assertEqual(Post.objects.filter(search_index__document__match="zebra").count(), 1)
+
+    def test_queries_do_not_grow_with_batch_size(self):
+        def comments(count):
+            return [
+                {"post": post.pk, "author": "bulk", "content": "x"} for post in self.posts[:count]
+            ]
+
+        def likes(count):
+            return [{"post": post.pk, "action": "like"} for post in self.posts[:count]]
+
+        self.client.force_login(User.objects.create_user("bulk", password="pw"))
+        for url, build in (("/comments/batch/", comments), (reverse("like_batch"), likes)):
+            small = self.batch_queries(url, build(2))
+            self.assertEqual(self.batch_queries(url, build(12)), small, url)
+
+    def test_limits_and_permissions(self):
+        with self.settings(BLOG_BATCH_MAX_ITEMS=2):
+            self.assertEqual(self.post_json(reverse("like_batch"), [{}] * 3).status_code, 400)
+        self.assertEqual(self.post_json(reverse("like_batch"), []).status_code, 400)
+        self.assertEqual(self.post_json(reverse("like_batch"), {"post": 1}).status_code, 400)
+        self.client.logout()
+        for url in ("/comments/batch/", "/posts/batch/", reverse("like_batch")):
+            self.assertIn(self.post_json(url, [{}]).status_code, (401, 403), url)
+
+
+# Trending scores: incremental updates match a rebuild; top-N reads use the index.
+class TrendingTests(BlogTestCase):
+    def scores(self):
+        return dict(TrendingScore.objects.values_list("post_id", "score"))
+
+    def test_incremental_scores_match_recompute(self):
+        stranger = User.objects.create_user("stranger", password="pw")
+        self.posts[0].likes.add(stranger)
+        self.posts[1].likes.remove(self.users[0])
+        Comment.objects.filter(post=self.posts[2]).first().delete()
+        self.client.post(
+            "/comments/batch/",
+            [{"post": self.posts[3].pk, "author": "a", "content": "x"}],
+            content_type="application/json",
+        )
+        incremental = self.scores()
+        self.assertEqual(recompute_scores(chunk_size=5), len(self.posts))
+        for post_id, score in self.scores().items():
+            self.assertAlmostEqual(incremental[post_id], score, places=6)
+
+    def test_newer_engagement_ranks_higher(self):
+        old, new = self.posts[0], self.posts[1]
+        PostLike.objects.filter(post=old).update(created_at=timezone.now() - timedelta(days=3))
+        recompute_scores()
+        self.assertGreater(
+            TrendingScore.objects.get(pk=new.pk).score, TrendingScore.objects.get(pk=old.pk).score
+        )
+
+    def test_unlike_restores_score(self):
+        post = self.posts[0]
+        before = self.scores()[post.pk]
+        stranger = User.objects.create_user("stranger", password="pw")
+        self.client.force_login(stranger)
+        self.client.post(reverse("post_like", args=[post.pk]))
+        self.assertGreater(self.scores()[post.pk], before)
+        self.client.post(reverse("post_like", args=[post.pk]))
+        self.assertAlmostEqual(self.scores()[post.pk], before, places=6)
+
+    def test_top_posts_per_category(self):
+        category = self.categories[1]
+        hot = self.posts[1]
+        for user in self.users[3:]:
+            hot.likes.add(user)
+        for _ in range(5):
+            self.client.post(reverse("post_comments", args=[hot.pk]), {"content": "Hot"})
+        response = self.client.get("/posts/trending/", {"category": category.pk, "limit": 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]["id"], hot.pk)
+        self.assertTrue(all(row["category"]["id"] == category.pk for row in data))
+        page = self.client.get(reverse("blog_list"), {"sort": "trending", "category": category.pk})
+        self.assertEqual(page.context["posts"][0].pk, hot.pk)
+
+    def test_top_n_reads_the_score_index(self):
+        cases = (
+            (None, "trending_score_idx"),
+            (self.categories[0].pk, "trending_category_score_idx"),
+        )
+        for category_id, index in cases:
+            queryset = trending_posts(category_id=category_id)[:10]
+            with connection.cursor() as cursor:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+            self.assertIn(index, plan)
+            self.assertNotIn("TEMP B-TREE", plan)
+
+
+# Stored excerpts: computed on save, list pages and the list API skip the content column.
+class ExcerptTests(BlogTestCase):
+    def test_excerpt_matches_truncatewords(self):
+        post = self.posts[0]
+        self.assertEqual(post.excerpt, truncatewords(post.content, 40))
+        self.assertEqual(post.word_count, 200)
+        post.content = "Short and sweet"
+        post.save(update_fields=["content"])
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.word_count), ("Short and sweet", 3))
+
+    def test_list_views_do_not_load_content(self):
+        column = '"blogapp_post"."content"'
+        for url in (reverse("blog_list"), reverse("profile"), "/posts/"):
+            _, context = self.count_queries(url)
+            for query in context.captured_queries:
+                self.assertNotIn(column, query["sql"], url)
+        self.assertContains(self.client.get(reverse("blog_list")), self.posts[-1].excerpt)
+        rows = {row["id"]: row for row in self.client.get("/posts/").json()}
+        row = rows[self.posts[-1].pk]
+        self.assertNotIn("content", row)
+        self.assertEqual((row["excerpt"], row["word_count"]), (self.posts[-1].excerpt, 200))
+
+    def test_backfill_command(self):
+        Post.objects.filter(pk=self.posts[0].pk).update(content="Changed behind save", word_count=0)
+        call_command("backfill_excerpts", stdout=io.StringIO())
+        post = Post.objects.get(pk=self.posts[0].pk)
+        self.assertEqual((post.excerpt, post.word_count), ("Changed behind save", 3))
+
+
+# Page counts: cached counters or capped counts instead of COUNT(*) over the table.
+class ApproximateCountTests(BlogTestCase):
+    def count_sql(self, context):
+        return [query["sql"] for query in context.captured_queries if "COUNT(" in query["sql"]]
+
+    def test_list_page_counts_from_cache(self):
+        for params in ("", f"?category={self.categories[0].pk}", "?sort=trending"):
+            _, context = self.count_queries(reverse("blog_list") + params)
+            self.assertEqual(self.count_sql(context), [], params)
+        response = self.client.get(reverse("blog_list"))
+        self.assertContains(response, "Page 1 of about 2")
+        self.assertEqual(len(response.context["posts"]), 10)
+
+    @override_settings(BLOG_SEARCH_COUNT_CAP=5)
+    def test_search_count_is_capped(self):
+        _, context = self.count_queries(reverse("blog_list") + "?search=django")
+        [sql] = self.count_sql(context)
+        self.assertIn("LIMIT 6", sql)
+        response = self.client.get(reverse("blog_list"), {"search": "django"})
+        self.assertEqual(response.context["page_obj"].paginator.count, 5)
+        self.assertFalse(response.context["page_obj"].paginator.exact)
+        response = self.client.get(reverse("blog_list"), {"search": "django", "category": self.categories[1].pk})
+        self.assertTrue(response.context["page_obj"].paginator.exact)
+
+    def test_api_total_and_exact_mode(self):
+        data = self.client.get(reverse("get_blogs_paginated")).json()
+        self.assertEqual((data["total"], data["total_exact"]), (12, False))
+        _, context = self.count_queries(reverse("get_blogs_paginated") + "?count=exact")
+        self.assertEqual(len(self.count_sql(context)), 1)
+        data = self.client.get(reverse("get_blogs_paginated"), {"count": "exact"}).json()
+        self.assertEqual((data["total"], data["total_exact"]), (12, True))
+
+    def test_stale_estimate_does_not_hide_rows(self):
+        paginator = EstimatedCountPaginator(Post.objects.order_by("pk"), 10, estimate=0)
+        self.assertEqual(len(paginator.page(1)), 10)
+
+    def test_admin_changelists_count_capped(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        for name in ("admin:blogapp_post_changelist", "admin:blogapp_comment_changelist"):
+            _, context = self.count_queries(reverse(name))
+            counts = self.count_sql(context)
+            self.assertEqual(len(counts), 1, name)
+            self.assertIn("LIMIT", counts[0])
+
+
+# Soft delete hides posts and categories at once; the purge removes their rows in batches.
+class SoftDeleteTests(BlogTestCase):
+    def test_deleted_post_is_hidden_everywhere(self):
+        post = self.posts[0]
+        comment = post.comments.first()
+        response = self.client.post(reverse("delete_post", args=[post.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Post.all_objects.filter(pk=post.pk).exists())
+        self.assertNotIn(post, self.client.get(reverse("blog_list")).context["posts"])
+        self.assertEqual(self.client.get(reverse("post_detail", args=[post.pk])).status_code, 404)
+        self.assertEqual(self.client.get(f"/posts/{post.pk}/").status_code, 404)
+        self.assertNotIn(post.pk, [row["id"] for row in self.client.get("/posts/").json()])
+        comment_ids = [row["id"] for row in self.client.get("/comments/").json()]
+        self.assertNotIn(comment.pk, comment_ids)
+        self.assertEqual(self.client.post(reverse("post_like", args=[post.pk])).status_code, 404)
+
+    def test_deleted_category_hides_its_posts(self):
+        category = self.categories[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/categories/{category.pk}/")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Category.objects.filter(pk=category.pk).exists())
+        self.assertFalse(Post.objects.filter(category_id=category.pk).exists())
+        self.assertEqual(refcache.estimated_post_count(), 8)
+        listed = self.client.get(reverse("blog_list")).context["posts"]
+        self.assertFalse([post for post in listed if post.category_id == category.pk])
+
+    def test_admin_confirmation_counts_instead_of_listing(self):
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        category = self.categories[0]
+        url = reverse("admin:blogapp_category_delete", args=[category.pk])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertContains(response, "<li>Posts: 4</li>", html=True)
+        self.assertContains(response, "<li>Comments: 12</li>", html=True)
+        self.assertNotContains(response, "Comment 0")
+        # The posts, comments and likes are counted, never loaded.
+        loads = [
+            query["sql"]
+            for query in context.captured_queries
+            if 'FROM "blogapp_comment"' in query["sql"] and "COUNT" not in query["sql"]
+        ]
+        self.assertEqual(loads, [])
+        response = self.client.post(url, {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Category.objects.filter(pk=category.pk).exists())
+
+    def test_purge_removes_rows_in_batches(self):
+        category = self.categories[0]
+        post_ids = list(category.posts.values_list("pk", flat=True))
+        soft_delete_categories([category.pk])
+        soft_delete_posts([self.posts[1].pk])
+        with CaptureQueriesContext(connection) as context:
+            deleted = purge_deleted(batch_size=2)
+        self.assertEqual(deleted["post"], 5)
+        self.assertEqual(deleted["comment"], 15)
+        self.assertEqual(deleted["postlike"], 15)
+        self.assertEqual(deleted["category"], 1)
+        for query in context.captured_queries:
+            match = re.search(r"^DELETE .* IN \(([^)]*)\)", query["sql"])
+            if match:
+                self.assertLessEqual(len(match.group(1).split(",")), 2, query["sql"])
+        for model in (Comment, PostLike, TrendingScore):
+            self.assertFalse(model.objects.filter(post_id__in=post_ids).exists())
+        self.assertFalse(Post.all_objects.filter(deleted_at__isnull=False).exists())
+        self.assertFalse(Category.all_objects.filter(pk=category.pk).exists())
+        self.assertEqual(Post.objects.filter(search_index__document__match="django").count(), 7)
+        self.assertEqual(sum(purge_deleted().values()), 0)
+
+
+# Following feeds: timelines filled on write, celebrity authors merged in on read.
+@override_settings(BLOG_TIMELINE_FANOUT_LIMIT=3)
+class TimelineTests(BlogTestCase):
+    def feed(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse("feed"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def all_feed_ids(self, user, page_size=2):
+        ids, cursor = [], None
+        while True:
+            page = feed_page(user.pk, cursor, page_size)
+            ids.extend(page.object_list)
+            cursor = page.next_cursor
+            if not cursor:
+                return ids
+
+    def newest_first(self, author_ids):
+        posts = Post.objects.filter(user_id__in=author_ids).order_by(*POST_ORDERING)
+        return list(posts.values_list("pk", flat=True))
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        reader, author = self.users[0], self.users[1]
+        response = self.client.post(reverse("user_follow", args=[author.pk]))
+        self.assertEqual(response.json(), {"following": True, "follower_count": 1})
+        self.assertEqual(TimelineEntry.objects.filter(user=reader).count(), 3)
+        post = Post.objects.create(
+            title="Fresh", content="New", category=self.categories[0], user=author
+        )
+        self.assertTrue(TimelineEntry.objects.filter(user=reader, post=post).exists())
+        data = self.feed(reader)
+        self.assertEqual([row["id"] for row in data["results"]], self.newest_first([author.pk]))
+        self.assertEqual(data["results"][0]["title"], "Fresh")
+        self.assertIsNone(data["next"])
+
+    def test_celebrity_posts_are_merged_on_read(self):
+        celebrity, author = self.users[1], self.users[2]
+        for user in self.users[:1] + self.users[2:]:
+            follow(user.pk, celebrity.pk)
+        follow(self.users[0].pk, author.pk)
+        self.assertTrue(AuthorStats.objects.get(user=celebrity).fanout_on_read)
+        Post.objects.create(
+            title="Big", content="News", category=self.categories[0], user=celebrity
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post__title="Big").exists())
+        ids = self.all_feed_ids(self.users[0])
+        self.assertEqual(ids, self.newest_first([celebrity.pk, author.pk]))
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_unfollow_removes_entries(self):
+        reader, author = self.users[0], self.users[1]
+        follow(reader.pk, author.pk)
+        response = self.client.delete(reverse("user_follow", args=[author.pk]))
+        self.assertEqual(response.json(), {"following": False, "follower_count": 0})
+        self.assertFalse(Follow.objects.filter(follower=reader).exists())
+        self.assertFalse(TimelineEntry.objects.filter(user=reader).exists())
+        self.assertEqual(self.feed(reader)["results"], [])
+
+    def test_follow_errors(self):
+        self.assertEqual(self.client.post(reverse("user_follow", args=[999])).status_code, 404)
+        response = self.client.post(reverse("user_follow", args=[self.user.pk]))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("feed"), {"cursor": "bogus"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleted_posts_leave_the_feed(self):
+        reader, author = self.users[0], self.users[1]
+        follow(reader.pk, author.pk)
+        post = self.posts[1]
+        soft_delete_posts([post.pk])
+        self.assertNotIn(post.pk, [row["id"] for row in self.feed(reader)["results"]])
+        purge_deleted()
+        self.assertFalse(TimelineEntry.objects.filter(post_id=post.pk).exists())
+
+    def test_html_feed_pages_with_cursor(self):
+        reader = self.users[0]
+        for author in self.users[1:]:
+            follow(reader.pk, author.pk)
+        with self.settings(BLOG_TIMELINE_PAGE_SIZE=4):
+            first = self.client.get(reverse("following_feed"))
+            self.assertEqual(first.status_code, 200)
+            cursor = first.context["next_cursor"]
+            older = self.client.get(reverse("following_feed"), {"cursor": cursor})
+        seen = [post.pk for page in (first, older) for post in page.context["posts"]]
+        self.assertEqual(seen, self.newest_first([user.pk for user in self.users[1:]])[:8])
+
+    def test_timeline_page_reads_the_timeline_index(self):
+        queryset = TimelineEntry.objects.filter(user_id=self.user.pk).order_by(*TIMELINE_ORDERING)
+        with connection.cursor() as cursor:
+            sql, params = queryset[:10].query.sql_with_params()
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn("timeline_user_pubdate_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+# Typeahead: suggestions come from the in-memory index, kept current by writes.
+class TypeaheadTests(BlogTestCase):
+    def labels(self, query, **params):
+        response = self.client.get(reverse("typeahead"), {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row["label"] for row in response.json()["suggestions"]]
+
+    def test_suggests_popular_titles_and_categories_by_word_prefix(self):
+        popular = self.posts[7]
+        popular.likes.add(*self.users[3:])
+        Comment.objects.create(post=popular, author="a", content="More")
+        self.assertEqual(self.labels("dj", limit=3)[0], popular.title)
+        self.assertEqual(self.labels("ABOUT DJANGO", limit=1), [popular.title])
+        self.assertEqual(self.labels("categ")[:3], ["Category 0", "Category 1", "Category 2"])
+        suggestion = self.client.get(reverse("typeahead"), {"q": "post 7"}).json()["suggestions"]
+        self.assertEqual(
+            suggestion[0],
+            {
+                "type": "post",
+                "id": popular.pk,
+                "label": popular.title,
+                "url": reverse("post_detail", args=[popular.pk]),
+            },
+        )
+        self.assertEqual(self.labels("nothing like this"), [])
+        self.assertEqual(self.labels(""), [])
+
+    def test_answers_without_queries(self):
+        self.labels("post")
+        with self.assertNumQueries(0):
+            self.labels("p")
+            self.labels("post 1")
+
+    def test_writes_update_the_index(self):
+        category = self.categories[0]
+        self.labels("x")
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title="Café culture", content="x", category=category, user=self.user
+            )
+        self.assertEqual(self.labels("cafe"), ["Café culture"])
+        with self.captureOnCommitCallbacks(execute=True):
+            post.title = "Tea culture"
+            post.save()
+        self.assertEqual(self.labels("cafe"), [])
+        self.assertEqual(self.labels("cult"), ["Tea culture"])
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_posts([post.pk])
+        self.assertEqual(self.labels("tea"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Travel")
+            soft_delete_categories([category.pk])
+        self.assertEqual(self.labels("travel"), ["Travel"])
+        self.assertNotIn("Category 0", self.labels("category"))
+        self.assertNotIn(self.posts[0].title, self.labels("post 0"))
+
+    def test_other_processes_writes_trigger_a_rebuild(self):
+        self.labels("post")
+        Post.objects.filter(pk=self.posts[0].pk).update(title="Renamed elsewhere")
+        refcache.get_shared_cache().incr(typeahead.VERSION_KEY)
+        typeahead._check_in_worker()
+        self.assertEqual(self.labels("renamed"), ["Renamed elsewhere"])
+
+    def test_local_writes_do_not_hide_other_processes_writes(self):
+        self.labels("post")
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title="Local", content="x", category=self.categories[0], user=self.user
+            )
+        self.assertEqual(typeahead._version, typeahead._shared_version())
+        # Another process renames a post, then this one writes before its next check.
+        Post.objects.filter(pk=self.posts[0].pk).update(title="Renamed elsewhere")
+        refcache.get_shared_cache().incr(typeahead.VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title="Local 2", content="x", category=self.categories[0], user=self.user
+            )
+        self.assertNotEqual(typeahead._version, typeahead._shared_version())
+        typeahead._check_in_worker()
+        self.assertEqual(self.labels("renamed"), ["Renamed elsewhere"])
+        self.assertEqual(self.labels("local 2"), ["Local 2"])
+
+    def test_removing_a_top_entry_refills_the_prefix(self):
+        entries = [typeahead.Entry("post", pk, f"Django {pk}", pk) for pk in range(1, 5)]
+        index = typeahead.PrefixIndex.build(entries, depth=2, top_k=2)
+        self.assertEqual([row["id"] for row in index.suggest("dj")], [4, 3])
+        index.remove(("post", 4))
+        self.assertEqual([row["id"] for row in index.suggest("dj")], [3, 2])
+        index.add(typeahead.Entry("post", 9, "Django 9", 9))
+        self.assertEqual([row["id"] for row in index.suggest("d")], [9, 3])
+        self.assertEqual([row["id"] for row in index.suggest("django")], [9, 3])
+        # A reader racing a removal may find a key whose entry is already gone.
+        del index.entries[("post", 3)]
+        self.assertEqual([entry.ident[1] for entry in index._best("dj", 5)], [9, 2, 1])
+
+
+# Media: strong validators for hashed names, byte ranges and proxy offload.
+class MediaServingTests(BlogTestCase):
+    body = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        variants = f"{self.media_root}/post_images/variants"
+        os.makedirs(variants)
+        with open(f"{variants}/0123456789abcdef-400w.webp", "wb") as file:
+            file.write(self.body)
+        with open(f"{self.media_root}/post_images/photo.jpg", "wb") as file:
+            file.write(self.body)
+        self.url = "/media/post_images/variants/0123456789abcdef-400w.webp"
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_hashed_file_is_immutable_and_revalidates(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.body)
+        self.assertEqual(response["ETag"], '"0123456789abcdef-400w"')
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["Content-Length"], str(len(self.body)))
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("immutable", response["Cache-Control"])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"0123456789abcdef-400w"')
+        self.assertEqual(response.status_code, 304)
+        photo = self.client.get("/media/post_images/photo.jpg")
+        self.assertTrue(photo["ETag"].startswith('W/"'))
+        self.assertEqual(photo["Cache-Control"], "public, max-age=3600")
+        # A hashed-looking name outside the pipeline's paths is not immutable.
+        with open(f"{self.media_root}/0123456789abcdef.jpg", "wb") as file:
+            file.write(self.body)
+        other = self.client.get("/media/0123456789abcdef.jpg")
+        self.assertTrue(other["ETag"].startswith('W/"'))
+        self.assertNotIn("immutable", other["Cache-Control"])
+        response = self.client.get(
+            "/media/post_images/photo.jpg", HTTP_IF_MODIFIED_SINCE=photo["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_byte_ranges(self):
+        cases = {
+            "bytes=10-19": (10, 19),
+            "bytes=1000-": (1000, 1023),
+            "bytes=-24": (1000, 1023),
+            "bytes=1020-5000": (1020, 1023),
+        }
+        for header, (start, end) in cases.items():
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/1024")
+            self.assertEqual(response["Content-Length"], str(end - start + 1))
+            self.assertEqual(self.content(response), self.body[start : end + 1])
+        # Ranges are never handed to sendfile(), which may not stop at Content-Length.
+        path = "post_images/variants/0123456789abcdef-400w.webp"
+        for headers, ranged in (({}, False), ({"HTTP_RANGE": "bytes=10-19"}, True)):
+            response = serve_media(RequestFactory().get(self.url, **headers), path)
+            self.addCleanup(response.close)
+            if ranged:
+                self.assertRaises(io.UnsupportedOperation, response.file_to_stream.fileno)
+            else:
+                self.assertIsInstance(response.file_to_stream.fileno(), int)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+        # Several ranges, or a stale If-Range: the whole file.
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1,5-6")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"other"')
+        self.assertEqual(self.content(response), self.body)
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"0123456789abcdef-400w"'
+        )
+        self.assertEqual(response.status_code, 206)
+
+    def test_ranges_of_an_empty_file_are_unsatisfiable(self):
+        open(f"{self.media_root}/post_images/empty.txt", "wb").close()
+        for header in ("bytes=-5", "bytes=0-", "bytes=0-0"):
+            response = self.client.get("/media/post_images/empty.txt", HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response["Content-Range"], "bytes */0")
+        response = self.client.get("/media/post_images/empty.txt")
+        self.assertEqual((response.status_code, response["Content-Length"]), (200, "0"))
+
+    def test_head_and_missing_files(self):
+        response = self.client.head(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Length"], "1024")
+        self.assertEqual(response.content, b"")
+        for path in ("missing.webp", "post_images", "../../etc/passwd", "%2e%2e/settings.py"):
+            self.assertEqual(self.client.get(f"/media/{path}").status_code, 404, path)
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    def test_offload_to_the_proxy(self):
+        with self.settings(BLOG_MEDIA_OFFLOAD="x-accel-redirect"):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/post_images/variants/0123456789abcdef-400w.webp",
+        )
+        self.assertEqual(response.content, b"")
+        self.assertIn("immutable", response["Cache-Control"])
+        with self.settings(BLOG_MEDIA_OFFLOAD="x-sendfile"):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Sendfile"],
+            f"{self.media_root}/post_images/variants/0123456789abcdef-400w.webp",
+        )
+
+
+# Tasks of the job queue tests.
+JOB_CALLS = []
+
+
+def record_job(**payload):
+    JOB_CALLS.append(payload)
+
+
+def failing_job(**payload):
+    raise RuntimeError("boom")
+
+
+# Background jobs: enqueued after commit, claimed once, retried, dead-lettered.
+@override_settings(
+    BLOG_JOB_TASKS={"record": "blogapp.tests.record_job", "fail": "blogapp.tests.failing_job"}
+)
+class JobQueueTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        JOB_CALLS.clear()
+
+    def run_worker(self):
+        return Worker(concurrency=2, pool="inline", poll=0).run(burst=True)
+
+    def test_jobs_are_enqueued_on_commit_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue("record", {"n": 1}, priority=3)
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    enqueue("record", {"n": 2})
+                    raise RuntimeError("rolled back")
+            self.assertFalse(Job.objects.exists())
+        job = Job.objects.get()
+        self.assertEqual((job.payload, job.priority, job.status), ({"n": 1}, 3, Job.QUEUED))
+        with self.assertRaises(ValueError):
+            enqueue("missing")
+        with self.assertRaises(TypeError):
+            enqueue("record", {"when": timezone.now()})
+
+    def test_worker_runs_due_jobs_by_priority(self):
+        Job.objects.create(name="record", payload={"n": 1})
+        Job.objects.create(name="record", payload={"n": 2}, priority=5)
+        Job.objects.create(name="record", payload={"n": 3}, priority=-5)
+        Job.objects.create(
+            name="record", payload={"n": 4}, run_at=timezone.now() + timedelta(hours=1)
+        )
+        out = io.StringIO()
+        call_command("run_worker", "--pool", "inline", "--concurrency", "1", "--burst", stdout=out)
+        self.assertEqual(JOB_CALLS, [{"n": 2}, {"n": 1}, {"n": 3}])
+        self.assertIn("3 done", out.getvalue())
+        self.assertEqual(list(Job.objects.values_list("payload", flat=True)), [{"n": 4}])
+
+    def test_claims_do_not_overlap(self):
+        for n in range(3):
+            Job.objects.create(name="record", payload={"n": n})
+        first, second = claim(2, "a"), claim(2, "b")
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+        self.assertEqual(claim(2, "c"), [])
+        self.assertEqual(first[0].attempts, 1)
+        self.assertEqual(first[0].status, Job.RUNNING)
+
+    def test_failures_back_off_then_go_dead(self):
+        job = Job.objects.create(name="fail", max_attempts=3)
+        with self.assertLogs("blogapp.jobs", "ERROR"):
+            self.assertEqual(self.run_worker(), {"retry": 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError: boom", job.last_error)
+        with self.settings(BLOG_JOB_BACKOFF_BASE=0), self.assertLogs("blogapp.jobs", "ERROR"):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            self.assertEqual(self.run_worker(), {"retry": 1, "dead": 1})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 3))
+        self.assertEqual(retry_dead(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 0))
+
+    def test_lost_jobs_are_requeued(self):
+        Job.objects.create(name="record")
+        [job] = claim(1, "crashed")
+        self.assertEqual(requeue_stale(timeout=60), 0)
+        Job.objects.filter(pk=job.pk).update(claimed_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(requeue_stale(timeout=60), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.claimed_by), (Job.QUEUED, ""))
+        self.assertIn("crashed", job.last_error)
+
+    @override_settings(BLOG_PURGE_MODE="queue")
+    def test_purge_runs_as_one_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_posts([self.posts[0].pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            soft_delete_posts([self.posts[1].pk])
+        self.assertEqual(Job.objects.filter(name="purge_deleted").count(), 1)
+        self.assertEqual(Post.all_objects.count(), 12)
+        self.assertEqual(self.run_worker(), {"done": 1})
+        self.assertEqual(Post.all_objects.count(), 10)
+
+
+# Sampled profiles: aggregated per view on disk, summarized by profile_report.
+class SamplingProfilerTests(BlogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        settings_override = self.settings(
+            BLOG_PROFILE_DIR=self.profile_dir,
+            BLOG_PROFILE_SAMPLE_RATES={"blog_list": 1, "*": 0},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(profiling.reset)
+
+    def report(self, *args):
+        out = io.StringIO()
+        call_command("profile_report", *args, stdout=out)
+        return out.getvalue()
+
+    def test_off_without_sample_rates(self):
+        with self.settings(BLOG_PROFILE_SAMPLE_RATES={}):
+            with self.assertRaises(MiddlewareNotUsed):
+                SamplingProfilerMiddleware(lambda request: HttpResponse())
+        with self.settings(BLOG_PROFILE_SAMPLE_RATES={"blog_list": 0}):
+            self.client.get(reverse("blog_list"))
+        profiling.flush()
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_sampled_views_are_aggregated_and_reported(self):
+        self.client.get(reverse("blog_list"))
+        self.client.get(reverse("blog_list"))
+        self.client.get("/posts/")
+        profiling.flush()
+        self.assertEqual(os.listdir(self.profile_dir), ["blog_list"])
+        names = os.listdir(f"{self.profile_dir}/blog_list")
+        self.assertEqual(sorted(name.rsplit(".", 1)[1] for name in names), ["json", "prof"])
+        # Enough rows for the view under Django's handlers and slow ORM internals.
+        report = self.report(
+            "--since", "1h", "--limit", "50", "--output", f"{self.profile_dir}/merged"
+        )
+        self.assertIn("blog_list: 2 sampled requests", report)
+        self.assertIn("blogapp/views.py", report)
+        self.assertIn('SELECT "blogapp_post"."id"', report)
+        self.assertTrue(os.path.exists(f"{self.profile_dir}/merged/blog_list.prof"))
+        self.assertIn("No profiles", self.report("--view", "post-list"))
+        with self.assertRaises(CommandError):
+            self.report("--since", "yesterday")
+
+    @override_settings(BLOG_PROFILE_MODE="stack", BLOG_PROFILE_STACK_INTERVAL=0.0001)
+    def test_stack_sampling_writes_collapsed_stacks(self):
+        self.client.get(reverse("blog_list"))
+        profiling.flush()
+        [folded] = [
+            name for name in os.listdir(f"{self.profile_dir}/blog_list") if name.endswith(".folded")
+        ]
+        with open(f"{self.profile_dir}/blog_list/{folded}") as file:
+            stack, count = file.readline().rsplit(" ", 1)
+        self.assertIn("blogapp.middleware.SamplingProfilerMiddleware.__call__", stack)
+        self.assertGreater(int(count), 0)
+        self.assertIn("stack samples", self.report())
@@ -0,0 +1,177 @@
+# Following feeds: per-user timelines filled on write, big authors merged in on read.
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .pagination import POST_ORDERING, InvalidCursor, KeysetPaginator
+
+# Keyset of a timeline; its cursors are interchangeable with POST_ORDERING ones.
+TIMELINE_ORDERING = ("-publication_date", "-post_id")
+
+INSERT_BATCH_SIZE = 1000
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Start following ``followee``; their recent posts join the follower's timeline.
+def follow(follower_id, followee_id):
+    """Return True if a new follow was created (following oneself is refused)."""
+    if follower_id == followee_id:
+        return False
+    with transaction.atomic():
+        _, created = Follow.objects.get_or_create(follower_id=follower_id, followee_id=followee_id)
+        if not created:
+            return False
+        stats = _add_followers(followee_id, 1)
+        if not stats.fanout_on_read:
+            backfill(follower_id, followee_id)
+    return True
+
+
+# Stop following ``followee`` and drop their posts from the follower's timeline.
+def unfollow(follower_id, followee_id):
+    """Return True if there was a follow to remove."""
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(
+            follower_id=follower_id, followee_id=followee_id
+        ).delete()
+        if not deleted:
+            return False
+        _add_followers(followee_id, -1)
+        TimelineEntry.objects.filter(user_id=follower_id, author_id=followee_id).delete()
+    return True
+
+
+def _add_followers(author_id, amount):
+    # Authors switch to fan-out on read for good once they pass the limit, so
+    # posts from either regime are never missing from a feed.
+    AuthorStats.objects.get_or_create(user_id=author_id)
+    AuthorStats.objects.filter(user_id=author_id).update(
+        follower_count=F("follower_count") + amount
+    )
+    AuthorStats.objects.filter(
+        user_id=author_id,
+        fanout_on_read=False,
+        follower_count__gte=_setting("BLOG_TIMELINE_FANOUT_LIMIT", 1000),
+    ).update(fanout_on_read=True)
+    return AuthorStats.objects.get(user_id=author_id)
+
+
+# Copy an author's latest posts into one follower's timeline (on follow).
+def backfill(follower_id, author_id):
+    limit = _setting("BLOG_TIMELINE_BACKFILL", 100)
+    posts = (
+        Post.objects.filter(user_id=author_id)
+        .order_by(*POST_ORDERING)
+        .values_list("pk", "publication_date")[:limit]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=follower_id, post_id=pk, author_id=author_id, publication_date=published
+            )
+            for pk, published in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+# Push new posts into their authors' followers' timelines (fan-out on write).
+def fan_out(posts):
+    """Return the number of timeline rows written.
+
+    Authors with ``fanout_on_read`` are skipped: their followers pull their
+    posts when reading, so one post never costs millions of inserts.
+    """
+    posts = [post for post in posts if post.pk is not None]
+    author_ids = {post.user_id for post in posts}
+    on_read = set(
+        AuthorStats.objects.filter(user_id__in=author_ids, fanout_on_read=True).values_list(
+            "user_id", flat=True
+        )
+    )
+    written = 0
+    for post in posts:
+        if post.user_id in on_read:
+            continue
+        followers = Follow.objects.filter(followee_id=post.user_id).values_list(
+            "follower_id", flat=True
+        )
+        entries = [
+            TimelineEntry(
+                user_id=follower_id,
+                post_id=post.pk,
+                author_id=post.user_id,
+                publication_date=post.publication_date,
+            )
+            for follower_id in followers.iterator(chunk_size=INSERT_BATCH_SIZE)
+        ]
+        TimelineEntry.objects.bulk_create(
+            entries, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True
+        )
+        written += len(entries)
+    return written
+
+
+# One page of ``user``'s following feed: materialized entries merged with pulled posts.
+def feed_page(user_id, cursor=None, per_page=None):
+    """Return a KeysetPage whose ``object_list`` is post ids, newest first.
+
+    The timeline page is one range scan of ``timeline_user_pubdate_idx``; each
+    followed fan-out-on-read author adds a range scan of
+    ``post_user_pubdate_id_idx`` from the same position. Both sources are
+    merged on (publication_date, id) and the last row becomes the next cursor.
+    Raise InvalidCursor for bad or backwards cursors.
+    """
+    per_page = per_page or _setting("BLOG_TIMELINE_PAGE_SIZE", 10)
+    entries = KeysetPaginator(
+        TimelineEntry.objects.filter(user_id=user_id).values("post_id", "publication_date"),
+        per_page,
+        TIMELINE_ORDERING,
+    )
+    if cursor and entries.decode_cursor(cursor)[1]:
+        raise InvalidCursor(cursor)
+    pages = [entries.get_page(cursor)]
+    pulled_authors = Follow.objects.filter(
+        follower_id=user_id, followee__author_stats__fanout_on_read=True
+    ).values_list("followee_id", flat=True)
+    for author_id in pulled_authors:
+        # Per author, so each scan stops after one page however much they posted.
+        posts = Post.objects.filter(user_id=author_id).values("id", "publication_date")
+        page = KeysetPaginator(posts, per_page, POST_ORDERING).get_page(cursor)
+        page.object_list = [
+            {"post_id": row["id"], "publication_date": row["publication_date"]} for row in page
+        ]
+        pages.append(page)
+    rows = []
+    seen = set()
+    merged = heapq.merge(
+        *[page.object_list for page in pages],
+        key=lambda row: (row["publication_date"], row["post_id"]),
+        reverse=True,
+    )
+    for row in merged:
+        if row["post_id"] not in seen:
+            seen.add(row["post_id"])
+            rows.append(row)
+            if len(rows) > per_page:
+                break
+    has_next = len(rows) > per_page or any(page.has_next() for page in pages)
+    rows = rows[:per_page]
+    next_cursor = entries.encode_cursor(rows[-1]) if rows and has_next else None
+    pages[0].object_list = [row["post_id"] for row in rows]
+    pages[0].next_cursor, pages[0].previous_cursor = next_cursor, None
+    return pages[0]
+
+
+# Posts (instances or values() rows) of ``queryset`` in ``post_ids`` order; deleted ones drop out.
+def posts_in_order(queryset, post_ids):
+    found = {}
+    for post in queryset.filter(pk__in=post_ids):
+        found[post["id"] if isinstance(post, dict) else post.pk] = post
+    return [found[post_id] for post_id in post_ids if post_id in found]
@@ -0,0 +1,295 @@
+# Streaming NDJSON export and batched, resumable import of blog data.
+import datetime
+import json
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .comments import comment_count_subquery
+from .conditional import CATEGORIES, COMMENTS, POSTS, bump_collections
+from .fragments import bump_post_versions
+from .likes import like_count_subquery
+from .models import Category, Comment, Post, PostLike
+from .refcache import CATEGORY_CACHE, CATEGORY_COUNT_CACHE
+from .search import get_search_backend
+from .trending import recompute_scores
+from . import typeahead
+
+# Record types in dependency order; exports are written (and read back) in it.
+RECORD_TYPES = ("category", "post", "comment", "like")
+
+# Post columns copied verbatim (references and timestamps are handled apart).
+POST_FIELDS = ("title", "content", "image", "image_thumbnail", "image_medium", "image_status")
+
+
+# Records of one type as dicts, streamed from the database in chunks.
+def export_records(record_type, chunk_size=2000):
+    """Yield export records of ``record_type`` in primary key order.
+
+    Rows are read with ``values()`` + ``iterator(chunk_size=...)``, so memory
+    use is bounded by one chunk whatever the table size. Categories and users
+    are referenced by name, posts and comments keep their ids.
+    """
+    if record_type == "category":
+        rows = Category.objects.order_by("pk").values("name")
+    elif record_type == "post":
+        rows = Post.objects.order_by("pk").values(
+            "id",
+            *POST_FIELDS,
+            "publication_date",
+            "updated_at",
+            category_name=F("category__name"),
+            username=F("user__username"),
+        )
+    elif record_type == "comment":
+        rows = Comment.objects.filter(post__deleted_at__isnull=True).order_by("pk").values(
+            "id", "post_id", "author", "content", "created_at"
+        )
+    elif record_type == "like":
+        rows = PostLike.objects.filter(post__deleted_at__isnull=True).order_by("pk").values(
+            "post_id", "created_at", username=F("user__username")
+        )
+    else:
+        raise ValueError(f"Unknown record type {record_type!r}")
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {"type": record_type, **row}
+
+
+# The whole export as NDJSON lines (bytes), for files and streaming responses.
+def export_lines(types=RECORD_TYPES, chunk_size=2000):
+    for record_type in RECORD_TYPES:
+        if record_type in types:
+            for record in export_records(record_type, chunk_size):
+                yield (json.dumps(record, default=_json_default) + "\n").encode()
+
+
+def _json_default(value):
+    # Full precision (DjangoJSONEncoder would cut microseconds to milliseconds).
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Raised when an exported id is taken by an unrelated row of the database.
+class ImportConflict(ValueError):
+    pass
+
+
+# Insert ``objs`` with their ids, keeping their exported ``timestamps`` fields.
+def create_with_timestamps(manager, objs, timestamps, identity):
+    """``bulk_create`` applies auto_now/auto_now_add, so the new rows get their
+    timestamps back with a ``bulk_update`` (which leaves fields as they are).
+
+    A row whose id already exists with the same ``identity`` fields was
+    imported before (a replayed batch): it is skipped and keeps its own
+    timestamps. Any other id collision raises ``ImportConflict``, since
+    references to that id would attach to the wrong row. Returns the number
+    of skipped rows.
+    """
+    existing = {
+        row[0]: row[1:]
+        for row in manager.filter(pk__in=[obj.pk for obj in objs]).values_list("pk", *identity)
+    }
+    for obj in objs:
+        if obj.pk in existing and existing[obj.pk] != tuple(getattr(obj, f) for f in identity):
+            raise ImportConflict(
+                f"{manager.model._meta.verbose_name} {obj.pk} already exists with other data; "
+                "import into an empty database"
+            )
+    new = [obj for obj in objs if obj.pk not in existing]
+    values = [[getattr(obj, name) for name in timestamps] for obj in new]
+    manager.bulk_create(new, ignore_conflicts=True)
+    for obj, row in zip(new, values):
+        for name, value in zip(timestamps, row):
+            setattr(obj, name, value)
+    manager.bulk_update(new, timestamps)
+    return len(objs) - len(new)
+
+
+# Batched NDJSON importer with name resolution and derived-data upkeep.
+class Importer:
+    """Load records produced by ``export_lines`` with ``bulk_create``.
+
+    Each batch is one transaction; posts and comments keep their exported ids
+    and rows that were already imported are skipped (and counted under
+    ``"skipped"``), so replaying a batch is harmless and an interrupted import
+    can resume from its last checkpoint. An id taken by an unrelated row
+    raises ``ImportConflict`` and rolls the batch back. Missing
+    categories are created, missing users get an unusable password. Counters,
+    fragment versions and collection stamps are refreshed per batch; the
+    search index and the trending scores are rebuilt by ``finish()``.
+    """
+
+    def __init__(self, batch_size=2000):
+        self.batch_size = batch_size
+        self.category_ids = {}
+        self.user_ids = {}
+        self.counts = dict.fromkeys((*RECORD_TYPES, "skipped"), 0)
+        self.importers = {
+            "category": self.import_categories,
+            "post": self.import_posts,
+            "comment": self.import_comments,
+            "like": self.import_likes,
+        }
+
+    def load(self, lines, offset=0, checkpoint=None):
+        """Import NDJSON ``lines`` (bytes); call ``checkpoint(offset)`` after each batch.
+
+        ``offset`` is the byte position of the first line, so the offsets passed
+        to ``checkpoint`` can be used to resume from a file.
+        """
+        batch, batch_type = [], None
+        for line in lines:
+            if line.strip():
+                record = json.loads(line)
+                if batch and (record["type"] != batch_type or len(batch) >= self.batch_size):
+                    self.flush(batch_type, batch)
+                    batch = []
+                    if checkpoint:
+                        # Everything before this line is committed.
+                        checkpoint(offset)
+                batch_type = record["type"]
+                batch.append(record)
+            offset += len(line)
+        self.flush(batch_type, batch)
+        if checkpoint:
+            checkpoint(offset)
+        return self.counts
+
+    def flush(self, record_type, records):
+        if not records:
+            return
+        with transaction.atomic():
+            skipped = self.importers[record_type](records) or 0
+        self.counts[record_type] += len(records) - skipped
+        self.counts["skipped"] += skipped
+
+    def import_categories(self, records):
+        self.resolve_categories(record["name"] for record in records)
+        bump_collections(CATEGORIES)
+
+    def import_posts(self, records):
+        category_ids = self.resolve_categories(record["category_name"] for record in records)
+        user_ids = self.resolve_users(record["username"] for record in records)
+        posts = [
+            Post(
+                id=record["id"],
+                category_id=category_ids[record["category_name"]],
+                user_id=user_ids[record["username"]],
+                publication_date=parse_datetime(record["publication_date"]),
+                updated_at=parse_datetime(record["updated_at"]),
+                **{name: record[name] or "" for name in POST_FIELDS},
+            )
+            for record in records
+        ]
+        for post in posts:
+            # Derived columns are not exported: compute them like save() does.
+            post.refresh_excerpt()
+        skipped = create_with_timestamps(
+            Post.all_objects,
+            posts,
+            ["publication_date", "updated_at"],
+            identity=("publication_date", "user_id"),
+        )
+        bump_collections(POSTS)
+        CATEGORY_COUNT_CACHE.invalidate()
+        return skipped
+
+    def import_comments(self, records):
+        comments = [
+            Comment(
+                id=record["id"],
+                post_id=record["post_id"],
+                author=record["author"],
+                content=record["content"],
+                created_at=parse_datetime(record["created_at"]),
+            )
+            for record in records
+        ]
+        skipped = create_with_timestamps(
+            Comment.objects, comments, ["created_at"], identity=("post_id", "created_at")
+        )
+        post_ids = {record["post_id"] for record in records}
+        # Counters only: updated_at keeps its exported value.
+        Post.objects.filter(pk__in=post_ids).update(comment_count=comment_count_subquery())
+        bump_post_versions(post_ids)
+        bump_collections(POSTS, COMMENTS)
+        return skipped
+
+    def import_likes(self, records):
+        user_ids = self.resolve_users(record["username"] for record in records)
+        likes = [
+            PostLike(
+                post_id=record["post_id"],
+                user_id=user_ids[record["username"]],
+                # Exports made before likes had a time get the import time.
+                created_at=parse_datetime(record.get("created_at") or "") or timezone.now(),
+            )
+            for record in records
+        ]
+        post_ids = {like.post_id for like in likes}
+        existing = set(
+            PostLike.objects.filter(
+                post_id__in=post_ids, user_id__in={like.user_id for like in likes}
+            ).values_list("post_id", "user_id")
+        )
+        PostLike.objects.bulk_create(likes, ignore_conflicts=True)
+        Post.objects.filter(pk__in=post_ids).update(like_count=like_count_subquery())
+        bump_collections(POSTS)
+        return sum((like.post_id, like.user_id) in existing for like in likes)
+
+    def resolve_categories(self, names):
+        """Return ``{name: id}``, creating categories that don't exist yet."""
+        known = len(self.category_ids)
+        self._resolve(
+            Category, "name", self.category_ids, names, lambda name: Category(name=name)
+        )
+        if len(self.category_ids) > known:
+            CATEGORY_CACHE.invalidate()
+        return self.category_ids
+
+    def resolve_users(self, usernames):
+        """Return ``{username: id}``, creating users (unusable password) that don't exist."""
+        User = get_user_model()
+        return self._resolve(
+            User,
+            User.USERNAME_FIELD,
+            self.user_ids,
+            usernames,
+            lambda username: User(
+                **{User.USERNAME_FIELD: username}, password=make_password(None)
+            ),
+        )
+
+    def _resolve(self, model, field, cache, names, build):
+        # In first-seen order, so new rows get ids in export order.
+        missing = [name for name in dict.fromkeys(names) if name not in cache]
+        if missing:
+            lookup = {f"{field}__in": missing}
+            cache.update(model.objects.filter(**lookup).values_list(field, "pk"))
+            new = [name for name in missing if name not in cache]
+            if new:
+                model.objects.bulk_create([build(name) for name in new], ignore_conflicts=True)
+                cache.update(model.objects.filter(**lookup).values_list(field, "pk"))
+        return cache
+
+    def finish(self):
+        """Reset id sequences, rebuild the search index and trending scores.
+
+        Returns the number of posts indexed.
+        """
+        if not any(self.counts[name] for name in ("post", "comment", "like")):
+            return 0
+        # Rows were inserted with explicit ids: move sequences past them.
+        statements = connection.ops.sequence_reset_sql(no_style(), [Post, Comment])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+        recompute_scores()
+        typeahead.invalidate()
+        return get_search_backend().rebuild()
@@ -0,0 +1,194 @@
+# Time-decayed trending scores, maintained incrementally in TrendingScore.
+import datetime
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Exp, Greatest, Least, Ln
+from django.utils import timezone
+
+from .models import Comment, Post, PostLike, TrendingScore
+
+# Scores are relative to a fixed epoch, so they never need rescaling over time.
+EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Posts per UPDATE when applying many terms: each CASE branch takes 2 parameters
+# and the CASE appears 3 times, which keeps a batch under SQLite's 999.
+UPDATE_BATCH_SIZE = 100
+
+# Engagement "mass" left after a removal that overshoots (drift); ~ e**-27.
+MIN_REMAINING = 1e-12
+
+
+def _tau():
+    # Decay constant in seconds: exp(-age / tau) halves every half-life.
+    return getattr(settings, "BLOG_TRENDING_HALF_LIFE_HOURS", 24) * 3600 / math.log(2)
+
+
+def _weight(kind):
+    weights = {"post": 1.0, "like": 1.0, "comment": 2.0}
+    weights.update(getattr(settings, "BLOG_TRENDING_WEIGHTS", {}))
+    return weights[kind]
+
+
+# The log-space contribution of ``count`` events of ``kind`` at ``when``.
+def event_term(kind, when=None, count=1):
+    """Return ``ln(count * weight * exp((when - EPOCH) / tau))``.
+
+    A post's score is the log of the sum of its event terms' exponentials:
+    newer events weigh exponentially more, which is the same ranking as
+    decaying every older event, without ever touching old scores.
+    """
+    when = when or timezone.now()
+    return math.log(count * _weight(kind)) + (when - EPOCH).total_seconds() / _tau()
+
+
+# ln(e**a + e**b) without overflow (scores are in the thousands).
+def _logaddexp(a, b):
+    high, low = Greatest(a, b), Least(a, b)
+    return high + Ln(1 + Exp(low - high))
+
+
+# ln(e**a - e**b), floored so that drift can't take the log of a negative number.
+def _logsubexp(a, b):
+    return a + Ln(Greatest(1 - Exp(b - a), Value(MIN_REMAINING)))
+
+
+def _apply(terms, combine):
+    terms = list(terms.items())
+    for start in range(0, len(terms), UPDATE_BATCH_SIZE):
+        batch = terms[start : start + UPDATE_BATCH_SIZE]
+        term = Case(
+            *[When(post_id=post_id, then=Value(value)) for post_id, value in batch],
+            output_field=FloatField(),
+        )
+        TrendingScore.objects.filter(post_id__in=[post_id for post_id, _ in batch]).update(
+            score=combine(F("score"), term)
+        )
+
+
+# Add event terms to scores: ``{post_id: term}``, one UPDATE per batch of posts.
+def add_terms(terms):
+    _apply(terms, _logaddexp)
+
+
+# Remove event terms (unlike, deleted comment) from scores.
+def remove_terms(terms):
+    _apply(terms, _logsubexp)
+
+
+# Sum terms per post in log space: ``[(post_id, term), ...] -> {post_id: term}``.
+def combine_terms(pairs):
+    grouped = {}
+    for post_id, term in pairs:
+        grouped.setdefault(post_id, []).append(term)
+    return {post_id: _logsumexp(values) for post_id, values in grouped.items()}
+
+
+def _logsumexp(values):
+    high = max(values)
+    return high + math.log(sum(math.exp(value - high) for value in values))
+
+
+# Start scoring new posts (their publication is their first event).
+def track_posts(posts):
+    TrendingScore.objects.bulk_create(
+        [
+            TrendingScore(
+                post_id=post.pk,
+                category_id=post.category_id,
+                score=event_term("post", post.publication_date),
+            )
+            for post in posts
+        ],
+        ignore_conflicts=True,
+    )
+
+
+# Likes given just now, one per item of ``post_ids`` (ids may repeat).
+def record_likes(post_ids):
+    counts = Counter(post_ids)
+    add_terms({post_id: event_term("like", count=count) for post_id, count in counts.items()})
+
+
+# Likes ``[(post_id, created_at), ...]`` that were taken back.
+def forget_likes(likes):
+    remove_terms(_terms("like", likes))
+
+
+# New comments ``[(post_id, created_at), ...]``.
+def record_comments(comments):
+    add_terms(_terms("comment", comments))
+
+
+# Deleted comments ``[(post_id, created_at), ...]``.
+def forget_comments(comments):
+    remove_terms(_terms("comment", comments))
+
+
+def _terms(kind, events):
+    return combine_terms((post_id, event_term(kind, when)) for post_id, when in events)
+
+
+# Rebuild every score from posts, likes and comments (corrects drift).
+def recompute_scores(chunk_size=2000):
+    """Recompute all scores exactly; return the number of posts scored.
+
+    Streams posts, likes and comments once each in post order and writes the
+    scores back with upserts, so memory stays bounded by one chunk.
+    """
+    total = 0
+    posts = Post.objects.order_by("pk").values_list("pk", "category_id", "publication_date")
+    likes = _events("like", PostLike.objects, chunk_size)
+    comments = _events("comment", Comment.objects, chunk_size)
+    pending = {"like": next(likes, None), "comment": next(comments, None)}
+    streams = {"like": likes, "comment": comments}
+    batch = []
+    for post_id, category_id, published in posts.iterator(chunk_size=chunk_size):
+        terms = [event_term("post", published)]
+        for kind, stream in streams.items():
+            # Skip events of posts that no longer exist, then take this post's.
+            while pending[kind] is not None and pending[kind][0] <= post_id:
+                if pending[kind][0] == post_id:
+                    terms.append(pending[kind][1])
+                pending[kind] = next(stream, None)
+        batch.append(
+            TrendingScore(post_id=post_id, category_id=category_id, score=_logsumexp(terms))
+        )
+        if len(batch) >= chunk_size:
+            total += _upsert(batch)
+            batch = []
+    total += _upsert(batch)
+    return total
+
+
+def _events(kind, manager, chunk_size):
+    rows = manager.order_by("post_id").values_list("post_id", "created_at")
+    for post_id, when in rows.iterator(chunk_size=chunk_size):
+        yield post_id, event_term(kind, when)
+
+
+def _upsert(scores):
+    TrendingScore.objects.bulk_create(
+        scores,
+        update_conflicts=True,
+        unique_fields=["post"],
+        update_fields=["category", "score"],
+    )
+    return len(scores)
+
+
+# Top ``limit`` posts by trending score, optionally in one category.
+def trending_posts(queryset=None, category_id=None):
+    """Order ``queryset`` (default: all posts) by trending score, best first.
+
+    Filters on the score table's own category column, so with a LIMIT this is
+    one range scan of ``trending_category_score_idx`` (or ``trending_score_idx``).
+    """
+    queryset = Post.objects.all() if queryset is None else queryset
+    if category_id:
+        queryset = queryset.filter(trending__category_id=category_id)
+    else:
+        queryset = queryset.filter(trending__isnull=False)
+    return queryset.order_by("-trending__score")
@@ -0,0 +1,402 @@
+# In-memory prefix index answering search-box suggestions without queries.
+import bisect
+import functools
+import heapq
+import logging
+import random
+import threading
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F
+from django.urls import reverse
+
+from .models import Category, Post
+from .refcache import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Counter bumped by every write; random start, so a re-created key never
+# repeats a version a process already holds.
+VERSION_KEY = "typeahead:version"
+# Keys start at each of the first words: "Intro to Django" is found by "dj" too.
+MAX_KEY_WORDS = 8
+# Sorts after every character a normalized key can contain.
+KEY_END = "\U0010ffff"
+BUILD_CHUNK_SIZE = 5000
+# Longer prefixes matching more keys than this get a ready top-k list too...
+HEAVY_PREFIX_KEYS = 200
+# ...up to this length (beyond it ranking scans at most ``scan_limit`` keys).
+MAX_READY_LENGTH = 10
+# Stands for the pk in reversed URLs, see _url_template().
+PK_PLACEHOLDER = 2147483647
+
+_index = None
+_version = None
+_built = 0.0
+_next_check = 0.0
+_lock = threading.Lock()
+_executor = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+# Case-, accent- and punctuation-insensitive form of a label or query.
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text.casefold())
+    chars = [
+        char if char.isalnum() else " " for char in text if not unicodedata.combining(char)
+    ]
+    return " ".join("".join(chars).split())
+
+
+# One suggestion: a post title or a category name with its popularity.
+class Entry:
+    __slots__ = ("ident", "label", "keys", "rank", "category_id", "_suggestion")
+
+    def __init__(self, kind, pk, label, popularity, category_id=None):
+        self.ident = (kind, pk)
+        self.label = label
+        words = normalize(label).split()
+        self.keys = {" ".join(words[i:]) for i in range(min(len(words), MAX_KEY_WORDS))}
+        # Most popular first, then alphabetical: ties are ordered the same everywhere.
+        self.rank = (-popularity, " ".join(words), kind, pk)
+        self.category_id = category_id
+
+    @property
+    def suggestion(self):
+        # Built on first use, so building the index formats no URLs.
+        try:
+            return self._suggestion
+        except AttributeError:
+            kind, pk = self.ident
+            url = _url_template(kind).format(pk)
+            self._suggestion = {"type": kind, "id": pk, "label": self.label, "url": url}
+            return self._suggestion
+
+
+# "/post/{}/" for posts, "/home/?category={}" for categories (reverse() is slow).
+@functools.cache
+def _url_template(kind):
+    if kind == "post":
+        return reverse("post_detail", args=[PK_PLACEHOLDER]).replace(str(PK_PLACEHOLDER), "{}")
+    return reverse("blog_list") + "?category={}"
+
+
+def _rank(entry):
+    return entry.rank
+
+
+# Sorted keys plus precomputed top-k lists for the short prefixes.
+class PrefixIndex:
+    """Answer "most popular labels starting with ``prefix``" from memory.
+
+    ``keys`` is a sorted list of ``(key, ident)``, so the keys starting with a
+    prefix are one slice found by two bisections. ``top`` keeps the ``top_k``
+    best entries ready for every prefix of up to ``depth`` characters and for
+    longer prefixes matching over HEAVY_PREFIX_KEYS keys at build time: a trie
+    with top-k lists, pruned to the nodes where ranking the slice would be
+    slow. Other prefixes rank their short slice, looking at no more than
+    ``scan_limit`` keys.
+
+    Not thread-safe for writers: the module functions serialize them.
+    """
+
+    def __init__(self, depth=3, top_k=10, scan_limit=2000):
+        self.depth = depth
+        self.top_k = top_k
+        self.scan_limit = scan_limit
+        self.entries = {}
+        self.keys = []
+        self.top = {}
+
+    @classmethod
+    def build(cls, entries, **options):
+        """Index ``entries`` with one sort instead of one insertion each."""
+        index = cls(**options)
+        entries = sorted(entries, key=_rank)
+        index.entries = {entry.ident: entry for entry in entries}
+        index.keys = sorted((key, entry.ident) for entry in entries for key in entry.keys)
+        heavy = Counter(key[: index.depth] for key, _ in index.keys)
+        for length in range(index.depth + 1, MAX_READY_LENGTH + 1):
+            # Only the slices of heavy prefixes can hold longer heavy prefixes.
+            counts = Counter()
+            for parent, count in heavy.items():
+                if count > HEAVY_PREFIX_KEYS:
+                    start, end = index._slice(parent)
+                    counts.update(key[:length] for key, _ in index.keys[start:end])
+            heavy = {prefix: count for prefix, count in counts.items() if len(prefix) == length}
+            ready = [prefix for prefix, count in heavy.items() if count > HEAVY_PREFIX_KEYS]
+            if not ready:
+                break
+            index.top.update((prefix, []) for prefix in ready)
+        for entry in entries:
+            for prefix in index._prefixes(entry):
+                top = index.top.setdefault(prefix, [])
+                if len(top) < index.top_k and entry not in top:
+                    top.append(entry)
+        return index
+
+    def suggest(self, query, limit=None):
+        """Return up to ``limit`` suggestion dicts for ``query``, best first."""
+        prefix = normalize(query)
+        limit = min(limit or self.top_k, self.top_k)
+        if not prefix:
+            return []
+        found = self.top.get(prefix)
+        if found is None:
+            # Every short prefix with a match has a list.
+            found = self._best(prefix, limit, self.scan_limit) if len(prefix) > self.depth else []
+        return [entry.suggestion for entry in found[:limit]]
+
+    def add(self, entry):
+        """Insert ``entry``, replacing any entry with the same ident."""
+        self.remove(entry.ident)
+        self.entries[entry.ident] = entry
+        for key in entry.keys:
+            bisect.insort(self.keys, (key, entry.ident))
+        for prefix in self._prefixes(entry):
+            top = self.top.setdefault(prefix, [])
+            if entry in top or (len(top) >= self.top_k and top[-1].rank < entry.rank):
+                continue
+            bisect.insort(top, entry, key=_rank)
+            del top[self.top_k :]
+
+    def remove(self, ident):
+        # Readers don't lock: drop the keys before the entry they point to.
+        entry = self.entries.get(ident)
+        if entry is None:
+            return
+        for key in entry.keys:
+            position = bisect.bisect_left(self.keys, (key, ident))
+            if position < len(self.keys) and self.keys[position] == (key, ident):
+                del self.keys[position]
+        for prefix in self._prefixes(entry):
+            top = self.top.get(prefix)
+            if top and entry in top:
+                # Refill from the keys: the next best entry was not kept.
+                top = self._best(prefix, self.top_k)
+                if top:
+                    self.top[prefix] = top
+                else:
+                    del self.top[prefix]
+        self.entries.pop(ident, None)
+
+    def remove_category(self, category_id):
+        """Drop a category and every post in it."""
+        for ident, entry in list(self.entries.items()):
+            if entry.category_id == category_id:
+                self.remove(ident)
+        self.remove(("category", category_id))
+
+    def _prefixes(self, entry):
+        # The prefixes of ``entry`` with a top-k list (or that always get one).
+        prefixes = set()
+        for key in entry.keys:
+            for length in range(1, min(len(key), MAX_READY_LENGTH) + 1):
+                prefix = key[:length]
+                if length > self.depth and prefix not in self.top:
+                    break  # Longer prefixes match fewer keys: no list either.
+                prefixes.add(prefix)
+        return prefixes
+
+    def _slice(self, prefix):
+        start = bisect.bisect_left(self.keys, (prefix,))
+        return start, bisect.bisect_left(self.keys, (prefix + KEY_END,), start)
+
+    def _best(self, prefix, limit, scan_limit=None):
+        start, end = self._slice(prefix)
+        if scan_limit:
+            end = min(end, start + scan_limit)
+        idents = {ident for _, ident in self.keys[start:end]}
+        # An entry removed by a concurrent writer may still have a key here.
+        found = filter(None, map(self.entries.get, idents))
+        return heapq.nsmallest(limit, found, key=_rank)
+
+
+# Load every live post title and category name (popularity: likes + comments, posts).
+def load_entries():
+    posts = Post.objects.values_list(
+        "pk", "title", "category_id", F("like_count") + F("comment_count")
+    )
+    for pk, title, category_id, popularity in posts.iterator(chunk_size=BUILD_CHUNK_SIZE):
+        yield Entry("post", pk, title, popularity, category_id)
+    categories = Category.objects.annotate(popularity=Count("posts")).values_list(
+        "pk", "name", "popularity"
+    )
+    for pk, name, popularity in categories:
+        yield Entry("category", pk, name, popularity)
+
+
+def build_index():
+    return PrefixIndex.build(
+        load_entries(),
+        depth=_setting("BLOG_TYPEAHEAD_DEPTH", 3),
+        top_k=_setting("BLOG_TYPEAHEAD_TOP_K", 10),
+        scan_limit=_setting("BLOG_TYPEAHEAD_SCAN_LIMIT", 2000),
+    )
+
+
+def get_executor():
+    """One background rebuild at a time per process (created on first use)."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="typeahead")
+    return _executor
+
+
+# The process's index: built on first use, then refreshed off the request path.
+def get_index():
+    """Return the index; at most every ``BLOG_TYPEAHEAD_CHECK_SECONDS`` a
+    background thread compares it with the shared version (bumped by writes
+    in other processes) and rebuilds it if it is stale or older than
+    ``BLOG_TYPEAHEAD_MAX_AGE`` (popularity drifts as likes come in).
+    """
+    global _next_check
+    index = _index
+    if index is None:
+        with _lock:
+            if _index is None:
+                _rebuild()
+            return _index
+    if time.monotonic() >= _next_check:
+        _next_check = time.monotonic() + _setting("BLOG_TYPEAHEAD_CHECK_SECONDS", 5)
+        get_executor().submit(_check_in_worker)
+    return index
+
+
+# Suggestions for the search box: a list of ``{type, id, label, url}``.
+def suggest(query, limit=None):
+    return get_index().suggest(query, limit)
+
+
+def _rebuild():
+    global _index, _version, _built, _next_check
+    version = _shared_version()
+    index = build_index()
+    _index, _version, _built = index, version, time.monotonic()
+    _next_check = _built + _setting("BLOG_TYPEAHEAD_CHECK_SECONDS", 5)
+
+
+def _check_in_worker():
+    try:
+        max_age = _setting("BLOG_TYPEAHEAD_MAX_AGE", 60 * 60)
+        if _shared_version() != _version or time.monotonic() - _built > max_age:
+            with _lock:
+                _rebuild()
+    except Exception:
+        logger.exception("Rebuilding the typeahead index failed")
+    finally:
+        close_old_connections()
+
+
+def _shared_version():
+    shared = get_shared_cache()
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        shared.add(VERSION_KEY, random.getrandbits(48), None)
+        version = shared.get(VERSION_KEY)
+    return version
+
+
+def _bump_version():
+    shared = get_shared_cache()
+    try:
+        return shared.incr(VERSION_KEY)
+    except ValueError:  # Missing (evicted or cleared).
+        _shared_version()
+        return shared.incr(VERSION_KEY)
+
+
+# Apply ``change(index)`` here after commit and tell other processes to rebuild.
+def _update(change):
+    def apply():
+        global _version, _next_check
+        with _lock:
+            version = _bump_version()
+            if _index is not None:
+                change(_index)
+                if _version is not None and version == _version + 1:
+                    _version = version
+                else:
+                    # Other processes changed data this index has not seen yet:
+                    # rebuild at the next request instead of taking their version.
+                    _version, _next_check = None, 0.0
+
+    transaction.on_commit(apply)
+
+
+# Add or refresh posts (created, edited or bulk-created); deleted ones are dropped.
+def index_posts(posts):
+    entries = [
+        Entry("post", post.pk, post.title, post.like_count + post.comment_count, post.category_id)
+        for post in posts
+        if post.deleted_at is None
+    ]
+    gone = [post.pk for post in posts if post.deleted_at is not None]
+
+    def change(index):
+        for entry in entries:
+            index.add(entry)
+        for pk in gone:
+            index.remove(("post", pk))
+
+    _update(change)
+
+
+def remove_posts(post_ids):
+    post_ids = list(post_ids)
+
+    def change(index):
+        for pk in post_ids:
+            index.remove(("post", pk))
+
+    _update(change)
+
+
+# Add or rename a category (its popularity is refreshed by the next rebuild).
+def index_category(category):
+    if category.deleted_at is not None:
+        remove_categories([category.pk])
+        return
+
+    def change(index):
+        old = index.entries.get(("category", category.pk))
+        popularity = -old.rank[0] if old else 0
+        index.add(Entry("category", category.pk, category.name, popularity))
+
+    _update(change)
+
+
+def remove_categories(category_ids):
+    category_ids = list(category_ids)
+
+    def change(index):
+        for pk in category_ids:
+            index.remove_category(pk)
+
+    _update(change)
+
+
+# Rebuild everywhere, this process included, after writes that bypass the
+# helpers above (imports).
+def invalidate():
+    def apply():
+        global _version
+        _bump_version()
+        _version = None
+
+    transaction.on_commit(apply)
+
+
+# Forget the index (tests); the next call builds it again.
+def reset():
+    global _index, _version, _next_check
+    with _lock:
+        _index, _version, _next_check = None, None, 0.0
@@ -4,10 +4,10 @@ from rest_framework_simplejwt.views import (TokenObtainPairView,
                                             TokenRefreshView)
 
 from .views import (BlogsPaginatedView, CategoryViewSet, ChangePasswordView, CommentViewSet,
-                    CreatePostView, LoginFormView, PostDetailView, PostViewSet,
-                    RegisterFormView, RegisterView, blog_list, delete_post,
-                    like_post, logout_view, profile_view, root_redirect,
-                    update_post)
+                    CreatePostView, ExportView, FeedView, FollowView, LikeBatchView, LoginFormView,
+                    PostCommentsView, PostDetailView, PostLikeView, PostViewSet, RegisterFormView,
+                    RegisterView, blog_list, delete_post, following_feed, like_post, logout_view,
+                    profile_view, root_redirect, typeahead, update_post)
 
 router = DefaultRouter()
 router.register(r"posts", PostViewSet)
@@ -17,20 +17,28 @@ router.register(r"comments", CommentViewSet)
 urlpatterns = [
     path("", root_redirect, name="root_redirect"),
     path("home/", blog_list, name="blog_list"),
+    path("typeahead/", typeahead, name="typeahead"),
     path("create/", CreatePostView.as_view(), name="create_post"),
     path("register/", RegisterView.as_view(), name="register"),  # API registration
     path("register-form/", RegisterFormView.as_view(), name="register_form"),
     path("login/", LoginFormView.as_view(), name="login"),
     path("logout/", logout_view, name="logout"),
     path("profile/", profile_view, name="profile"),
+    path("following/", following_feed, name="following_feed"),
     path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("change-password/", ChangePasswordView.as_view(), name="change_password"),
     path("post/<int:pk>/", PostDetailView.as_view(), name="post_detail"),
+    path("post/<int:pk>/comments/", PostCommentsView.as_view(), name="post_comments"),
+    path("post/<int:pk>/like/", PostLikeView.as_view(), name="post_like"),
     path("delete-post/<int:pk>/", delete_post, name="delete_post"),
     path("update-post/<int:pk>/", update_post, name="update_post"),
     path("like-post/<int:pk>/", like_post, name="like_post"),
+    path("users/<int:pk>/follow/", FollowView.as_view(), name="user_follow"),
+    path("feed/", FeedView.as_view(), name="feed"),
+    path("likes/batch/", LikeBatchView.as_view(), name="like_batch"),
     path("get-blogs-paginated/", BlogsPaginatedView.as_view(), name="get_blogs_paginated"),
+    path("export/", ExportView.as_view(), name="export"),
 ]
 
 urlpatterns += router.urls
@@ -1,14 +1,15 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.contrib.auth import login as auth_login
 from django.contrib.auth import logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.core import paginator
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.response import TemplateResponse
 from rest_framework import permissions, status, viewsets
-from rest_framework.decorators import api_view
+from rest_framework.decorators import action, api_view
 from rest_framework.generics import CreateAPIView, RetrieveAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.renderers import TemplateHTMLRenderer
@@ -17,62 +18,165 @@ from rest_framework.views import APIView
 from django.views.generic import ListView
 
 from .forms import CommentForm, LoginForm, PostForm, RegisterForm
-from .models import Category, Comment, Post
+from .batch import apply_likes, check_batch, create_comments, create_posts
+from .comments import COMMENT_ORDERING
+from .conditional import (
+    CATEGORIES,
+    COMMENTS,
+    POSTS,
+    ConditionalGetMixin,
+    not_modified,
+    post_page_validators,
+    post_validators,
+    set_validators,
+)
+from .deletion import soft_delete_categories, soft_delete_posts
+from .fragments import attach_post_fragments
+from .images import queue_image_processing
+from .likes import liked_post_ids, toggle_like
+from .models import AuthorStats, Category, Comment, Post
+from .pagination import (
+    POST_ORDERING,
+    InvalidCursor,
+    KeysetPaginator,
+    EstimatedCountPaginator,
+    PostCursorPagination,
+    get_page_size,
+)
+from .refcache import categories_with_counts, estimated_post_count
+from .rows import RowListMixin, RowSerializer
+from .search import search_posts
+from .timeline import feed_page, follow, posts_in_order, unfollow
+from .typeahead import suggest
 from .serializers import (
     BlogSerializer,
     CategorySerializer,
     CommentSerializer,
+    PostListSerializer,
     PostSerializer,
     RegisterSerializer,
 )
+from .transfer import RECORD_TYPES, export_lines
+from .trending import trending_posts
 
 
-# Blog list view: displays posts, handles category filter, search, pagination, and comment submission.
-@login_required
-def blog_list(request):
+# Posts of the blog list, filtered by ?category= and ?search= (sync and async views).
+def filtered_posts(request):
+    """Return ``(posts, category_id, search_query)`` for the list page."""
     # Get filter and search parameters from the request.
     category_id = request.GET.get("category")
     search_query = request.GET.get("search", "")
     # Query all posts, order by publication date descending.
-    posts = Post.objects.all().order_by("-publication_date")  # type: ignore[attr-defined]
-    if category_id:
+    # Cards show the stored excerpt: never load the (long) content column.
+    posts = (
+        Post.objects.select_related("category")  # type: ignore[attr-defined]
+        .defer("content")
+        .order_by("-publication_date")
+    )
+    if request.GET.get("sort") == "trending":
+        # Best trending score first, per category through the score table's index.
+        posts = trending_posts(posts, category_id)
+    elif category_id:
         # Filter posts by selected category.
         posts = posts.filter(category_id=category_id)
     if search_query:
-        # Filter posts by search query in title or content.
-        posts = posts.filter(
-            Q(title__icontains=search_query) | Q(content__icontains=search_query)
-        )
-    # Get all categories for the filter dropdown.
-    categories = Category.objects.all()  # type: ignore[attr-defined]
-    # Paginate posts (10 per page).
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    comment_form = CommentForm()
+        # Filter posts through the search index, most relevant first.
+        posts = search_posts(posts, search_query)
+    return posts, category_id, search_query
+
+
+# Page-number paginator for a filtered post list (sync and async views).
+def post_list_paginator(request, posts, per_page):
+    """Count from the cached per-category counters; search results are counted
+    up to ``BLOG_SEARCH_COUNT_CAP``. ``?count=exact`` runs the full COUNT(*).
+    """
+    if request.GET.get("count") == "exact":
+        return EstimatedCountPaginator(posts, per_page)
+    if request.GET.get("search"):
+        cap = getattr(settings, "BLOG_SEARCH_COUNT_CAP", 1000)
+        return EstimatedCountPaginator(posts, per_page, cap=cap)
+    category_id = request.GET.get("category")
+    return EstimatedCountPaginator(
+        posts, per_page, estimate=lambda: estimated_post_count(category_id)
+    )
+
+
+# Whether the list page uses keyset pagination (?cursor= or BLOG_LIST_PAGINATION).
+def uses_cursor_pagination(request):
+    if request.GET.get("sort") == "trending":
+        # Scores move all the time: number the pages instead.
+        return False
+    if request.GET.get("search"):
+        # Relevance is computed per query, not a column a cursor can seek on:
+        # number the pages so results stay most relevant first.
+        return False
+    return (
+        "cursor" in request.GET
+        or getattr(settings, "BLOG_LIST_PAGINATION", "offset") == "cursor"
+    )
+
+
+# Blog list view: displays posts, handles category filter, search, pagination, and comment submission.
+@login_required
+def blog_list(request):
     if request.method == "POST":
-        # Handle new comment submission.
+        # Handle new comment submission (before any of the page is loaded).
         post_id = request.POST.get("post_id")
         content = request.POST.get("content")
         if post_id and content:
-            post = get_object_or_404(Post, pk=post_id)
+            post = get_object_or_404(Post.objects.only("pk"), pk=post_id)
             Comment.objects.create(post=post, author=request.user.username, content=content)  # type: ignore[attr-defined]
             return redirect("blog_list")
-    # Render the blog list template with context.
-    return render(
+    posts, category_id, search_query = filtered_posts(request)
+    # Categories (with post counts) for the filter dropdown, from the reference cache.
+    categories = categories_with_counts()
+    per_page = getattr(settings, "BLOG_LIST_PAGE_SIZE", 10)
+    cursor = request.GET.get("cursor")
+    cursor_pagination = uses_cursor_pagination(request)
+    if cursor_pagination:
+        # Keyset pagination on (publication_date, id): no COUNT(*), no OFFSET.
+        keyset = KeysetPaginator(posts, per_page)
+        try:
+            page_obj = keyset.get_page(cursor or None)
+        except InvalidCursor:
+            page_obj = keyset.get_page()
+    else:
+        # Paginate posts by page number.
+        paginator = post_list_paginator(request, posts, per_page)
+        page_number = request.GET.get("page")
+        page_obj = paginator.get_page(page_number)
+    # Shared card fragments come from the cache; only misses are rendered.
+    page_posts = attach_post_fragments(page_obj.object_list)
+    comment_form = CommentForm()
+    # Render the blog list template with context (lazily, so render time is measurable).
+    return TemplateResponse(
         request,
         "blogapp/blog_list.html",
         {
-            "posts": page_obj.object_list,
+            "posts": page_posts,
+            "liked_post_ids": liked_post_ids(request.user, page_posts),
             "page_obj": page_obj,
+            "cursor_pagination": cursor_pagination,
             "comment_form": comment_form,
             "categories": categories,
             "selected_category": category_id,
             "search_query": search_query,
+            "sort": request.GET.get("sort", ""),
         },
     )
 
 
+# Search-box suggestions (post titles, category names) from the in-memory index.
+def typeahead(request):
+    """``GET /typeahead/?q=dja&limit=8`` answers ``{"suggestions": [...]}`` without queries."""
+    try:
+        limit = int(request.GET.get("limit", ""))
+    except ValueError:
+        limit = getattr(settings, "BLOG_TYPEAHEAD_LIMIT", 8)
+    query = request.GET.get("q", "")[:100]
+    return JsonResponse({"suggestions": suggest(query, max(limit, 1))})
+
+
 # View for creating a new blog post (HTML and API).
 class CreatePostView(CreateAPIView):
     """View for creating a new blog post (HTML and API)."""
@@ -93,6 +197,9 @@ class CreatePostView(CreateAPIView):
             post = form.save(commit=False)
             post.user = request.user
             post.save()
+            if post.image:
+                # Resize and build variants in the background.
+                queue_image_processing(post)
             return redirect("blog_list")
         return Response({"form": form}, template_name=self.template_name)
 
@@ -150,11 +257,43 @@ def logout_view(request):
 # View for displaying the user's profile and their posts.
 @login_required
 def profile_view(request):
-    user_posts = Post.objects.filter(user=request.user).order_by("-publication_date")  # type: ignore[attr-defined]
-    return render(
+    user_posts = attach_post_fragments(
+        Post.objects.filter(user=request.user)  # type: ignore[attr-defined]
+        .select_related("category")
+        .defer("content")
+        .order_by("-publication_date")
+    )
+    return TemplateResponse(
         request,
         "blogapp/profile.html",
-        {"user": request.user, "user_posts": user_posts},
+        {
+            "user": request.user,
+            "user_posts": user_posts,
+            "liked_post_ids": liked_post_ids(request.user, user_posts),
+        },
+    )
+
+
+# Posts of the authors the user follows, newest first, one keyset page at a time.
+@login_required
+def following_feed(request):
+    try:
+        page = feed_page(request.user.pk, request.GET.get("cursor") or None)
+    except InvalidCursor:
+        return redirect("following_feed")
+    posts = attach_post_fragments(
+        posts_in_order(
+            Post.objects.select_related("category").defer("content"), page.object_list
+        )
+    )
+    return TemplateResponse(
+        request,
+        "blogapp/following.html",
+        {
+            "posts": posts,
+            "next_cursor": page.next_cursor,
+            "liked_post_ids": liked_post_ids(request.user, posts),
+        },
     )
 
 
@@ -190,13 +329,21 @@ class PostDetailView(RetrieveAPIView):
     template_name = "blogapp/post_detail.html"
 
     def get(self, request, *args, **kwargs):
+        # Answer 304 from the post's version stamp before loading anything else.
+        validators = post_page_validators(request, kwargs["pk"])
+        response = not_modified(request, *validators)
+        if response is not None:
+            return response
         # Display the post detail page with comments and comment form.
         post = self.get_object()
         comments = post.comments.all().order_by("-created_at")
         form = CommentForm()
-        return Response(
-            {"post": post, "comments": comments, "form": form},
-            template_name=self.template_name,
+        return set_validators(
+            Response(
+                {"post": post, "comments": comments, "form": form},
+                template_name=self.template_name,
+            ),
+            *validators,
         )
 
     def post(self, request, *args, **kwargs):
@@ -218,31 +365,201 @@ class PostDetailView(RetrieveAPIView):
 # --- API (DRF) ---
 
 
+# API view for one post's comments, newest first, loaded on demand by the list pages.
+class PostCommentsView(APIView):
+    """Keyset-paginated comments of a post (``?cursor=``, ``?page_size=``)."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        post = get_object_or_404(Post.objects.only("pk", "comment_count"), pk=pk)
+        page_size = get_page_size(
+            request.GET.get("page_size"), getattr(settings, "BLOG_API_PAGE_SIZE", 10)
+        )
+        page_paginator = KeysetPaginator(
+            Comment.objects.filter(post_id=post.pk), page_size, COMMENT_ORDERING  # type: ignore[attr-defined]
+        )
+        try:
+            page = page_paginator.get_page(request.GET.get("cursor") or None)
+        except InvalidCursor:
+            return Response({"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "count": post.comment_count,
+            "comments": CommentSerializer(page.object_list, many=True).data,
+            "next": page.next_cursor,
+        })
+
+    def post(self, request, pk):
+        # Add a comment; answers with the comment and the new count, not a page.
+        post = get_object_or_404(Post.objects.only("pk"), pk=pk)
+        form = CommentForm(request.data)
+        if not form.is_valid():
+            return Response({"errors": form.errors}, status=status.HTTP_400_BAD_REQUEST)
+        comment = form.save(commit=False)
+        comment.post = post
+        comment.author = request.user.username
+        comment.save()
+        return Response(
+            {
+                "comment": CommentSerializer(comment).data,
+                "comment_count": Post.objects.values_list("comment_count", flat=True).get(pk=pk),
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+# API view following (POST) or unfollowing (DELETE) another user.
+class FollowView(APIView):
+    """``/users/<id>/follow/`` answers ``{"following": ..., "follower_count": ...}``."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        return self.respond(request, pk, follow)
+
+    def delete(self, request, pk):
+        return self.respond(request, pk, unfollow)
+
+    def respond(self, request, pk, change):
+        get_object_or_404(get_user_model().objects.only("pk"), pk=pk)
+        if pk == request.user.pk:
+            return Response(
+                {"detail": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        change(request.user.pk, pk)
+        counts = AuthorStats.objects.filter(user_id=pk).values_list("follower_count", flat=True)
+        return Response({"following": change is follow, "follower_count": counts.first() or 0})
+
+
+# API view for the current user's following feed (``?cursor=``, ``?page_size=``).
+class FeedView(APIView):
+    """Posts of followed authors, newest first: ``{"results": [...], "next": cursor}``."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        page_size = get_page_size(
+            request.GET.get("page_size"), getattr(settings, "BLOG_TIMELINE_PAGE_SIZE", 10)
+        )
+        try:
+            page = feed_page(request.user.pk, request.GET.get("cursor") or None, page_size)
+        except InvalidCursor:
+            return Response({"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+        rows = RowSerializer(PostListSerializer())
+        posts = posts_in_order(rows.rows(Post.objects.all()), page.object_list)
+        return Response({"results": rows.serialize(posts), "next": page.next_cursor})
+
+
+# API view toggling the current user's like, for the list pages' like buttons.
+class PostLikeView(APIView):
+    """``POST /post/<id>/like/`` answers ``{"liked": ..., "like_count": ...}``."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        post = get_object_or_404(Post.objects.only("pk"), pk=pk)
+        liked = toggle_like(post, request.user)
+        return Response({
+            "liked": liked,
+            "like_count": Post.objects.values_list("like_count", flat=True).get(pk=pk),
+        })
+
+
 # API viewset for CRUD operations on blog posts.
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, RowListMixin, viewsets.ModelViewSet):
     """API viewset for CRUD operations on blog posts."""
+    collections = (POSTS,)
     queryset = Post.objects.all().order_by("-publication_date")  # type: ignore[attr-defined]
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PostCursorPagination
+
+    def get_serializer_class(self):
+        # Lists use the compact representation (counts instead of nested comments).
+        if self.action == "list":
+            return PostListSerializer
+        return PostSerializer
+
+    def get_queryset(self):
+        # Join/prefetch only what the requested fields need (?fields=, ?expand=).
+        queryset = self.get_serializer_class().optimize_queryset(
+            super().get_queryset(), self.request
+        )
+        # Apply the same category and search filters as the HTML list.
+        category_id = self.request.query_params.get("category")
+        search_query = self.request.query_params.get("search", "")
+        if category_id:
+            queryset = queryset.filter(category_id=category_id)
+        if search_query:
+            queryset = search_posts(queryset, search_query)
+        return queryset
+
+    def get_object_validators(self, request):
+        # One indexed lookup of the post's updated_at instead of serializing it;
+        # ?fields=/?expand= change the representation, so they are in the ETag.
+        fields = sorted(self.get_serializer_class().output_fields(request))
+        return post_validators(
+            self.kwargs[self.lookup_field], request.accepted_media_type, ",".join(fields)
+        )
 
     def perform_create(self, serializer):
         # Set the user as the creator of the post.
-        serializer.save(user=self.request.user)
+        post = serializer.save(user=self.request.user)
+        if post.image:
+            queue_image_processing(post)
+
+    def perform_update(self, serializer):
+        post = serializer.save()
+        if "image" in serializer.validated_data:
+            queue_image_processing(post)
+
+    def perform_destroy(self, instance):
+        soft_delete_posts([instance.pk])
+
+    @action(detail=False, methods=["get"])
+    def trending(self, request):
+        # GET /posts/trending/?category=&limit=: top posts by trending score.
+        rows = RowSerializer(PostListSerializer(context=self.get_serializer_context()))
+        queryset = PostListSerializer.optimize_queryset(
+            trending_posts(category_id=request.query_params.get("category")), request
+        )
+        limit = get_page_size(
+            request.query_params.get("limit"), getattr(settings, "BLOG_API_PAGE_SIZE", 10)
+        )
+        return Response(rows.serialize(rows.rows(queryset)[:limit]))
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        # POST /posts/batch/: create many posts (no images) in one transaction.
+        items = check_batch(request.data)
+        results = create_posts(request.user, items, self.get_serializer_context())
+        return Response({"results": results})
 
 
 # API viewset for CRUD operations on categories.
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """API viewset for CRUD operations on categories."""
+    collections = (CATEGORIES,)
     queryset = Category.objects.all()  # type: ignore[attr-defined]
     serializer_class = CategorySerializer
 
+    def perform_destroy(self, instance):
+        # Hides the category and its posts now; the rows are purged in batches.
+        soft_delete_categories([instance.pk])
+
 
 # API viewset for CRUD operations on comments.
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ConditionalGetMixin, RowListMixin, viewsets.ModelViewSet):
     """API viewset for CRUD operations on comments."""
-    queryset = Comment.objects.all().order_by("-created_at")  # type: ignore[attr-defined]
+    collections = (COMMENTS,)
+    # Comments of deleted posts are hidden until the purge removes them.
+    queryset = (
+        Comment.objects.filter(post__deleted_at__isnull=True)  # type: ignore[attr-defined]
+        .order_by("-created_at")
+    )
     serializer_class = CommentSerializer
 
+    @action(detail=False, methods=["post"], permission_classes=[IsAuthenticated])
+    def batch(self, request):
+        # POST /comments/batch/: create many comments in one transaction.
+        return Response({"results": create_comments(check_batch(request.data))})
+
 
 # API view for user registration.
 class RegisterView(APIView):
@@ -266,7 +583,8 @@ def delete_post(request, pk):
     post = get_object_or_404(Post, pk=pk)
     if post.user != request.user:
         return HttpResponseForbidden(b"You are not allowed to delete this post.")
-    post.delete()
+    # Hidden at once; its comments, likes and files are purged in the background.
+    soft_delete_posts([post.pk])
     return redirect("profile")
 
 
@@ -279,7 +597,9 @@ def update_post(request, pk):
     if request.method == "POST":
         form = PostForm(request.POST, request.FILES, instance=post)
         if form.is_valid():
-            form.save()
+            post = form.save()
+            if "image" in form.changed_data:
+                queue_image_processing(post)
             return redirect("profile")
     else:
         form = PostForm(instance=post)
@@ -298,31 +618,94 @@ def root_redirect(request):
         return redirect("login")
 
 
-# View for liking or unliking a post by the current user.
+# View for liking or unliking a post by the current user (no-JS fallback of PostLikeView).
 @login_required
 def like_post(request, pk):
-    post = get_object_or_404(Post, pk=pk)
-    if request.user in post.likes.all():
-        post.likes.remove(request.user)
-    else:
-        post.likes.add(request.user)
+    post = get_object_or_404(Post.objects.only("pk"), pk=pk)
+    toggle_like(post, request.user)
     return redirect(request.META.get("HTTP_REFERER", "blog_list"))
 
 
 # API view for paginated list of blogs.
 class BlogsPaginatedView(APIView):
-    
+    """Paginated list of blogs: ``?page=`` (with total) or ``?cursor=`` (keyset)."""
+
+    def get_page_size(self, request):
+        return get_page_size(
+            request.GET.get("page_size"),
+            getattr(settings, "BLOGS_PAGINATED_PAGE_SIZE", 1),
+        )
+
+    def get_queryset(self, request):
+        all_blogs = Post.objects.order_by("-publication_date")  # type: ignore[attr-defined]
+        category_id = request.GET.get("category")
+        search_query = request.GET.get("search", "")
+        if category_id:
+            all_blogs = all_blogs.filter(category_id=category_id)
+        if search_query:
+            all_blogs = search_posts(all_blogs, search_query)
+        return all_blogs
+
     def get(self, request):
-        
+        page_size = self.get_page_size(request)
+        all_blogs = self.get_queryset(request)
+        # Serialized from values() rows; same output as BlogSerializer(many=True).
+        rows = RowSerializer(BlogSerializer())
+
+        if "cursor" in request.GET:
+            # Keyset mode: constant cost per page, no total count.
+            try:
+                page_blogs = KeysetPaginator(
+                    rows.rows(all_blogs, POST_ORDERING), page_size
+                ).get_page(request.GET.get("cursor") or None)
+            except InvalidCursor:
+                return Response(
+                    {"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response({
+                'blogs': rows.serialize(page_blogs.object_list),
+                'next': page_blogs.next_cursor,
+                'previous': page_blogs.previous_cursor,
+                'page_size': page_size,
+            })
+
         page_number = request.GET.get("page")
-        all_blogs = Post.objects.all().order_by("-publication_date")  # type: ignore[attr-defined]
-        paginator = Paginator(all_blogs, 1)
-        page_blogs = paginator.get_page(page_number)
-        serializer = BlogSerializer(page_blogs, many=True)
-        
+        page_paginator = post_list_paginator(request, rows.rows(all_blogs), page_size)
+        page_blogs = page_paginator.get_page(page_number)
+
         return Response({
-            'total': paginator.count,
-            'blogs': serializer.data,
+            'total': page_paginator.count,
+            'total_exact': page_paginator.exact,
+            'blogs': rows.serialize(page_blogs),
             'current_page': page_blogs.number,
+            'page_size': page_size,
         })
-        
\ No newline at end of file
+
+
+# Batch like/unlike operations for the current user.
+class LikeBatchView(APIView):
+    """``POST /likes/batch/`` with ``[{"post": 1, "action": "like"}, ...]``."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({"results": apply_likes(request.user, check_batch(request.data))})
+
+
+# Streaming NDJSON export of categories, posts, comments and likes (staff only).
+class ExportView(APIView):
+    """``GET /export/?types=post,comment`` streams the export; nothing is buffered."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        types = [name for name in request.query_params.get("types", "").split(",") if name]
+        unknown = set(types) - set(RECORD_TYPES)
+        if unknown:
+            return Response(
+                {"detail": f"Unknown types: {', '.join(sorted(unknown))}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        response = StreamingHttpResponse(
+            export_lines(types or RECORD_TYPES), content_type="application/x-ndjson"
+        )
+        response["Content-Disposition"] = 'attachment; filename="blog-export.ndjson"'
+        return response